@@ -0,0 +1,231 @@
+# benchmarks/fakes.py
+
+"""
+Substitutos locais dos serviços externos usados pelo benchmark: o SmartScraperGraph (eventos
+sintéticos), o modelo do Gemini (latência, falhas e chamadas de função configuráveis) e a
+Brasil API (servidor HTTP local). Nenhum deles acessa a rede nem consome créditos de API.
+"""
+
+import asyncio
+import datetime
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Sequence
+from urllib.parse import parse_qs, urlparse
+
+_CNPJ_WEIGHTS_1 = (5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2)
+_CNPJ_WEIGHTS_2 = (6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2)
+
+# Marcador que precede o JSON dos eventos nos prompts do GeminiEnricher.
+_PROMPT_PAYLOAD_MARKER = "(brutos do Scrapegraph AI):**"
+
+
+def _check_digit(digits: str, weights: Sequence[int]) -> str:
+    remainder = sum(int(d) * w for d, w in zip(digits, weights)) % 11
+    return str(0 if remainder < 2 else 11 - remainder)
+
+
+def make_cnpj(index: int) -> str:
+    """Gera um CNPJ sintético válido (14 dígitos, com dígitos verificadores) a partir de um índice."""
+    base = f"{(index * 7919 + 11) % 10 ** 8:08d}0001"
+    base += _check_digit(base, _CNPJ_WEIGHTS_1)
+    return base + _check_digit(base, _CNPJ_WEIGHTS_2)
+
+
+class SyntheticEvents:
+    """
+    Gerador determinístico de eventos no formato retornado pelo SmartScraperGraph.
+
+    Cada evento cai em um de três perfis: sem CNPJ (resolvido pelas regras, sem rede), com CNPJ
+    válido (regras + Brasil API) ou com indício de CNPJ sem número válido (segue para o Gemini).
+    """
+    def __init__(self, cnpjs: Sequence[str], cnpj_fraction: float = 0.3, gemini_fraction: float = 0.3):
+        self.cnpjs = list(cnpjs)
+        self.cnpj_fraction = cnpj_fraction
+        self.gemini_fraction = gemini_fraction
+        self.today = datetime.date.today()
+
+    def event(self, index: int) -> Dict[str, Any]:
+        profile = random.Random(index).random()
+        promotor: Dict[str, Any] = {"nome": f"Produtora {index % 313}"}
+        if profile < self.cnpj_fraction and self.cnpjs:
+            promotor["cnpj"] = self.cnpjs[index % len(self.cnpjs)]
+        elif profile < self.cnpj_fraction + self.gemini_fraction:
+            promotor["nome"] += " (CNPJ não informado)"
+        return {
+            "nome_do_evento": f"Show Sintético {index}",
+            "tipo_do_evento": "Show",
+            "interpretes": [f"Artista {index % 997}", f"Convidado {index % 101}"],
+            "promotor": promotor,
+            "datas_do_evento": (self.today + datetime.timedelta(days=index % 30)).strftime("%d/%m/%Y"),
+            "horario_do_evento": "21h",
+            "local_do_evento": {"nome": f"Casa de Shows {index % 211}"},
+            "local_de_realizacao": {"endereco_completo": f"Rua Exemplo, {index % 1000} - São Paulo/SP"},
+            "capacidade_do_local": "1500",
+            "ingressos": [
+                {"setor": "Pista", "lote": "1º lote", "valor": f"R$ {50 + index % 200},00"},
+                {"setor": "Camarote", "lote": "Único", "valor": f"R$ {300 + index % 500},00"},
+            ],
+            "flyers_e_materiais_promocionais": [f"https://bench.local/flyers/{index}.jpg"],
+        }
+
+    def events(self, start: int, count: int) -> List[Dict[str, Any]]:
+        return [self.event(index) for index in range(start, start + count)]
+
+
+def listing_url(page: int, start: int, count: int, domains: int = 50) -> str:
+    """URL fictícia de uma página de agenda com `count` eventos a partir do índice `start`."""
+    return f"http://site{page % domains}.bench.local/agenda/{page}?start={start}&count={count}"
+
+
+class StubSmartScraperGraph:
+    """
+    Substituto do `scrapegraphai.graphs.SmartScraperGraph`: `run` dorme `latency` segundos (o
+    tempo de navegador + LLM) e devolve os eventos sintéticos indicados na URL fictícia.
+    """
+    factory: Optional[SyntheticEvents] = None
+    latency: float = 0.0
+
+    def __init__(self, prompt: str, source: str, schema: Any = None, config: Optional[dict] = None):
+        self.prompt = prompt
+        self.source = source
+
+    def run(self) -> Dict[str, Any]:
+        if self.latency:
+            time.sleep(self.latency)
+        query = parse_qs(urlparse(self.source).query)
+        start, count = int(query["start"][0]), int(query["count"][0])
+        return {"eventos": self.factory.events(start, count)}
+
+
+class FakeGeminiError(Exception):
+    """Erro simulado do Gemini, classificado pelo limitador de taxa como limitação (429)."""
+
+
+def _response(parts: List[Any], text: str = "") -> Any:
+    return SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=parts))], text=text)
+
+
+class FakeGeminiModel:
+    """
+    Substituto de `genai.GenerativeModel` com a mesma interface usada pelo GeminiEnricher
+    (`generate_content_async`).
+
+    Cada chamada dorme uma latência (com variação de ±50%), falha com probabilidade
+    `failure_rate` (como um 429) e, na primeira rodada, pede a ferramenta `get_cnpj_info` com
+    probabilidade `function_call_rate`. A resposta final devolve os eventos do prompt como JSON.
+    """
+    def __init__(self, latency: float = 0.01, failure_rate: float = 0.0, function_call_rate: float = 0.3,
+                 cnpjs: Sequence[str] = (), seed: int = 0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.function_call_rate = function_call_rate
+        self.cnpjs = list(cnpjs)
+        self.calls = 0
+        self.failures = 0
+        self.function_calls = 0
+        self._random = random.Random(seed)
+
+    async def generate_content_async(self, contents: List[Any], **kwargs: Any) -> Any:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency * self._random.uniform(0.5, 1.5))
+        if self._random.random() < self.failure_rate:
+            self.failures += 1
+            raise FakeGeminiError("429 Resource has been exhausted (fake)")
+
+        prompt = contents[0]
+        start = prompt.index(_PROMPT_PAYLOAD_MARKER) + len(_PROMPT_PAYLOAD_MARKER)
+        payload, _ = json.JSONDecoder().raw_decode(prompt[start:].lstrip())
+
+        if len(contents) == 1 and self.cnpjs and self._random.random() < self.function_call_rate:
+            count = len(payload) if isinstance(payload, list) else 1
+            self.function_calls += count
+            parts = [
+                SimpleNamespace(function_call=SimpleNamespace(
+                    name="get_cnpj_info", args={"cnpj": self._random.choice(self.cnpjs)},
+                ))
+                for _ in range(count)
+            ]
+            return _response(parts)
+
+        text = "```json\n" + json.dumps(payload, ensure_ascii=False) + "\n```"
+        return _response([SimpleNamespace(function_call=None, text=text)], text)
+
+
+class LocalBrasilAPI:
+    """
+    Servidor HTTP local que imita `GET /api/cnpj/v1/<cnpj>` da Brasil API, com latência fixa.
+    Uma fração determinística dos CNPJs (`not_found_rate`) responde 404.
+    """
+    def __init__(self, latency: float = 0.005, not_found_rate: float = 0.1):
+        self.latency = latency
+        self.not_found_rate = not_found_rate
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler_class(self) -> type:
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Sem o algoritmo de Nagle, cabeçalhos e corpo enviados separadamente não esperam o ACK atrasado.
+            disable_nagle_algorithm = True
+
+            def do_GET(self) -> None:
+                with api._lock:
+                    api.requests += 1
+                if api.latency:
+                    time.sleep(api.latency)
+                cnpj = self.path.rstrip("/").rsplit("/", 1)[-1]
+                if not self.path.startswith("/api/cnpj/v1/") or not cnpj.isdigit():
+                    self._send(400, {"message": "CNPJ inválido"})
+                elif int(cnpj) % 100 < api.not_found_rate * 100:
+                    self._send(404, {"message": "CNPJ não encontrado"})
+                else:
+                    self._send(200, {
+                        "cnpj": cnpj,
+                        "razao_social": f"EMPRESA SINTETICA {cnpj} LTDA",
+                        "nome_fantasia": f"Empresa {cnpj[:4]}",
+                        "ddd_telefone_1": "1130000000",
+                        "email": f"contato{cnpj[:4]}@example.com",
+                    })
+
+            def _send(self, status: int, body: Dict[str, Any]) -> None:
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        return Handler
+
+    def start(self) -> "LocalBrasilAPI":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "LocalBrasilAPI":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
@@ -0,0 +1,313 @@
+# benchmarks/run_pipeline.py
+
+"""
+Benchmark offline do pipeline de raspagem, enriquecimento e exportação.
+
+Executa `main_scraper_loop` (com o SmartScraperGraph substituído por eventos sintéticos),
+`GeminiEnricher.enrich_event_data` (com um modelo falso), `get_cnpj_info` (contra uma Brasil API
+local) e `ExcelGenerator.generate_excel`, e informa eventos/s, latências p50/p95 de cada estágio e o
+pico de memória. Nenhuma chamada sai da máquina.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.run_pipeline --sizes 100 10000 100000
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+from dataclasses import asdict, dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional
+
+from benchmarks.fakes import (
+    FakeGeminiModel, LocalBrasilAPI, StubSmartScraperGraph, SyntheticEvents, listing_url, make_cnpj,
+)
+
+
+@dataclass
+class StageResult:
+    """Medidas de um estágio: itens processados, tempo total, latências individuais e pico de memória."""
+    stage: str
+    size: int
+    items: int
+    seconds: float
+    latencies: List[float] = field(default_factory=list)
+    peak_memory_bytes: Optional[int] = None
+
+    @property
+    def items_per_second(self) -> float:
+        return self.items / self.seconds if self.seconds else 0.0
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data.pop("latencies")
+        data.update(
+            calls=len(self.latencies),
+            items_per_second=self.items_per_second,
+            p50_ms=None if self.percentile(0.5) is None else self.percentile(0.5) * 1000,
+            p95_ms=None if self.percentile(0.95) is None else self.percentile(0.95) * 1000,
+        )
+        return data
+
+
+class _Measure:
+    """Mede o tempo e (opcionalmente) o pico de memória alocada por Python dentro do bloco."""
+    def __init__(self, track_memory: bool):
+        self.track_memory = track_memory
+        self.seconds = 0.0
+        self.peak_memory_bytes: Optional[int] = None
+
+    def __enter__(self) -> "_Measure":
+        if self.track_memory:
+            tracemalloc.start()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.seconds = time.perf_counter() - self._start
+        if self.track_memory:
+            self.peak_memory_bytes = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+
+def _timed(func: Callable[..., Awaitable[Any]], latencies: List[float]) -> Callable[..., Awaitable[Any]]:
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - start)
+    return wrapper
+
+
+def _timed_records(records: Iterable[dict], every: int, latencies: List[float]) -> Iterator[dict]:
+    """Repassa os registros, medindo o tempo gasto a cada `every` registros consumidos."""
+    last = time.perf_counter()
+    for count, record in enumerate(records, start=1):
+        yield record
+        if count % every == 0:
+            now = time.perf_counter()
+            latencies.append(now - last)
+            last = now
+
+
+def _import_main(brasil_api_url: str) -> types.ModuleType:
+    """
+    Importa `main` com credenciais fictícias, a Brasil API local e o SmartScraperGraph substituído,
+    para que nenhuma chamada saia da máquina.
+    """
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark-fake-key")
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark-fake-key")
+    os.environ["BRASIL_API_BASE_URL"] = brasil_api_url
+    graphs = types.ModuleType("scrapegraphai.graphs")
+    graphs.SmartScraperGraph = StubSmartScraperGraph
+    sys.modules.setdefault("scrapegraphai", types.ModuleType("scrapegraphai"))
+    # `main` importa o SmartScraperGraph só ao raspar, então o módulo substituto é usado a partir daqui.
+    sys.modules["scrapegraphai.graphs"] = graphs
+    import main
+    return main
+
+
+def _configure_services(main: types.ModuleType, args: argparse.Namespace, brasil_api_url: str) -> None:
+    from src.services.cnpj_lookup import CNPJCache, CNPJLookupService, configure_cnpj_service
+    from src.services.rate_limiter import ProviderLimiter, configure_rate_limiters
+
+    # Limites altos: o benchmark mede o pipeline, não as cotas. Backoff curto para as falhas simuladas.
+    limits = dict(requests_per_minute=1e9, base_delay=0.01, max_delay=0.1)
+    configure_rate_limiters(
+        openai=ProviderLimiter("openai", max_concurrency=args.scrape_concurrency, **limits),
+        gemini=ProviderLimiter("gemini", max_concurrency=args.workers, **limits),
+        brasilapi=ProviderLimiter("brasilapi", max_concurrency=16, **limits),
+    )
+    configure_cnpj_service(CNPJLookupService(cache=CNPJCache(":memory:"), base_url=brasil_api_url))
+
+
+async def _run_pipeline(main: types.ModuleType, args: argparse.Namespace, size: int, cnpjs: List[str],
+                        output_path: str, stats: Dict[str, Any]) -> Dict[str, List[float]]:
+    from src.services.cnpj_lookup import get_cnpj_service
+    from src.services.deduplicator import EventDeduplicator
+    from src.services.enrichment_pipeline import EnrichmentPipeline
+    from src.services.event_stream import JsonlEventWriter
+    from src.services.gemini_enricher import GeminiEnricher
+    from src.services.url_scheduler import UrlScheduler
+
+    latencies: Dict[str, List[float]] = {"scrape": [], "enrich": [], "brasilapi": []}
+    enricher = GeminiEnricher(gemini_api_key="benchmark-fake-key")
+    fake_model = FakeGeminiModel(
+        latency=args.gemini_latency,
+        failure_rate=args.gemini_failure_rate,
+        function_call_rate=args.gemini_function_call_rate,
+        cnpjs=cnpjs,
+    )
+    enricher.model = fake_model
+    enricher.enrich_event_data = _timed(enricher.enrich_event_data, latencies["enrich"])
+    enricher.enrich_events_batch = _timed(enricher.enrich_events_batch, latencies["enrich"])
+    service = get_cnpj_service()
+    service.lookup_async = _timed(service.lookup_async, latencies["brasilapi"])
+    scrape = _timed(main.main_scraper_loop, latencies["scrape"])
+
+    urls = [
+        listing_url(page, start, min(args.events_per_url, size - start))
+        for page, start in enumerate(range(0, size, args.events_per_url))
+    ]
+    writer = JsonlEventWriter(output_path)
+    deduplicator = EventDeduplicator() if args.dedup else None
+    # As mensagens de progresso impressas por main_scraper_loop não fazem parte do relatório.
+    with contextlib.redirect_stdout(io.StringIO()):
+        async with EnrichmentPipeline(
+            enricher,
+            num_workers=args.workers,
+            queue_size=args.queue_size,
+            batch_size=args.batch_size,
+            deduplicator=deduplicator,
+            writer=writer,
+        ) as pipeline:
+            scheduler = UrlScheduler(max_concurrency=args.scrape_concurrency, max_per_domain=1)
+            await scheduler.run(urls, lambda url: scrape(url, pipeline))
+    writer.close()
+
+    stats.update(
+        written=writer.count,
+        gemini_calls=fake_model.calls,
+        gemini_failures=fake_model.failures,
+        gemini_function_calls=fake_model.function_calls,
+        rules=enricher.rules.stats(),
+    )
+    return latencies
+
+
+def run_size(main: types.ModuleType, args: argparse.Namespace, size: int, api: LocalBrasilAPI,
+             workdir: str) -> List[StageResult]:
+    """Executa todos os estágios para `size` eventos e retorna as medidas."""
+    from src.services.cnpj_lookup import get_cnpj_service
+    from src.services.event_stream import iter_jsonl
+    from src.services.excel_generator import ExcelGenerator
+    from src.services.gemini_enricher import get_cnpj_info
+
+    cnpjs = [make_cnpj(i) for i in range(args.distinct_cnpjs)]
+    StubSmartScraperGraph.factory = SyntheticEvents(cnpjs, args.cnpj_fraction, args.gemini_fraction)
+    StubSmartScraperGraph.latency = args.scrape_latency
+    results: List[StageResult] = []
+
+    # 1. Raspagem + enriquecimento (main_scraper_loop alimentando o EnrichmentPipeline).
+    _configure_services(main, args, api.base_url)
+    output_path = os.path.join(workdir, f"events_{size}.jsonl")
+    stats: Dict[str, Any] = {}
+    requests_before = api.requests
+    with _Measure(args.memory) as measure:
+        latencies = asyncio.run(_run_pipeline(main, args, size, cnpjs, output_path, stats))
+    results.append(StageResult("pipeline", size, stats["written"], measure.seconds, [], measure.peak_memory_bytes))
+    results.append(StageResult("  main_scraper_loop (por URL)", size, len(latencies["scrape"]), measure.seconds, latencies["scrape"]))
+    results.append(StageResult("  enrich_event_data (por chamada)", size, size, measure.seconds, latencies["enrich"]))
+    results.append(StageResult("  Brasil API (lookup_async)", size, len(latencies["brasilapi"]), measure.seconds,
+                               latencies["brasilapi"]))
+    print(
+        f"[{size}] Gemini (falso): {stats['gemini_calls']} chamadas, {stats['gemini_failures']} falhas simuladas, "
+        f"{stats['gemini_function_calls']} chamadas de função; regras: {stats['rules']}; "
+        f"requisições à Brasil API local: {api.requests - requests_before}."
+    )
+
+    # 2. get_cnpj_info síncrono, com cache frio, sobre CNPJs distintos.
+    _configure_services(main, args, api.base_url)
+    lookup_cnpjs = cnpjs[:min(size, len(cnpjs))]
+    cnpj_latencies: List[float] = []
+    with _Measure(args.memory) as measure:
+        for cnpj in lookup_cnpjs:
+            start = time.perf_counter()
+            get_cnpj_info(cnpj)
+            cnpj_latencies.append(time.perf_counter() - start)
+    get_cnpj_service().session.close()
+    results.append(StageResult("get_cnpj_info", size, len(lookup_cnpjs), measure.seconds, cnpj_latencies,
+                               measure.peak_memory_bytes))
+
+    # 3. Excel em streaming a partir do JSONL gravado pelo pipeline.
+    excel_latencies: List[float] = []
+    generator = ExcelGenerator(output_dir=workdir, chunk_size=args.excel_chunk_size)
+    with _Measure(args.memory) as measure:
+        generator.generate_excel(
+            _timed_records(iter_jsonl(output_path), args.excel_chunk_size, excel_latencies),
+            filename=f"events_{size}.xlsx",
+        )
+    results.append(StageResult(f"generate_excel (por bloco de {args.excel_chunk_size})", size, stats["written"],
+                               measure.seconds, excel_latencies, measure.peak_memory_bytes))
+    return results
+
+
+def _format_ms(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value * 1000:.1f}"
+
+
+def print_report(results: List[StageResult]) -> None:
+    header = f"{'eventos':>8}  {'estágio':<40} {'itens':>8} {'tempo (s)':>10} {'itens/s':>10} {'p50 (ms)':>9} {'p95 (ms)':>9} {'pico (MB)':>10}"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        memory = "-" if result.peak_memory_bytes is None else f"{result.peak_memory_bytes / 2 ** 20:.1f}"
+        print(
+            f"{result.size:>8}  {result.stage:<40} {result.items:>8} {result.seconds:>10.2f} "
+            f"{result.items_per_second:>10.1f} {_format_ms(result.percentile(0.5)):>9} "
+            f"{_format_ms(result.percentile(0.95)):>9} {memory:>10}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark offline do pipeline (sem chamadas a APIs externas).")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10_000, 100_000], help="Quantidades de eventos.")
+    parser.add_argument("--events-per-url", type=int, default=100, help="Eventos devolvidos por página sintética.")
+    parser.add_argument("--scrape-latency", type=float, default=0.05, help="Latência (s) do SmartScraperGraph falso.")
+    parser.add_argument("--scrape-concurrency", type=int, default=4, help="URLs raspadas em paralelo.")
+    parser.add_argument("--workers", type=int, default=16, help="Workers de enriquecimento.")
+    parser.add_argument("--queue-size", type=int, default=100, help="Capacidade da fila de enriquecimento.")
+    parser.add_argument("--batch-size", type=int, default=1, help="Eventos por requisição ao Gemini.")
+    parser.add_argument("--dedup", action="store_true", help="Ativa a deduplicação entre fontes.")
+    parser.add_argument("--gemini-latency", type=float, default=0.01, help="Latência média (s) do Gemini falso.")
+    parser.add_argument("--gemini-failure-rate", type=float, default=0.01, help="Fração de chamadas que falham (429).")
+    parser.add_argument("--gemini-function-call-rate", type=float, default=0.3,
+                        help="Fração de respostas que pedem get_cnpj_info.")
+    parser.add_argument("--cnpj-fraction", type=float, default=0.3, help="Fração de eventos com CNPJ válido.")
+    parser.add_argument("--gemini-fraction", type=float, default=0.3,
+                        help="Fração de eventos que as regras não resolvem (vão ao Gemini).")
+    parser.add_argument("--distinct-cnpjs", type=int, default=500, help="Quantidade de CNPJs distintos.")
+    parser.add_argument("--brasilapi-latency", type=float, default=0.005, help="Latência (s) da Brasil API local.")
+    parser.add_argument("--excel-chunk-size", type=int, default=1_000, help="Eventos por bloco do Excel.")
+    parser.add_argument("--no-memory", dest="memory", action="store_false",
+                        help="Não mede o pico de memória (tracemalloc deixa a execução mais lenta).")
+    parser.add_argument("--json", help="Grava os resultados também em um arquivo JSON.")
+    parser.add_argument("--verbose", action="store_true", help="Mostra os logs do pipeline.")
+    args = parser.parse_args(argv)
+
+    api = LocalBrasilAPI(latency=args.brasilapi_latency).start()
+    try:
+        main_module = _import_main(api.base_url)
+        # `main` configura o logging na importação; o benchmark só mostra erros, salvo com --verbose.
+        logging.getLogger().setLevel(logging.INFO if args.verbose else logging.ERROR)
+        results: List[StageResult] = []
+        with tempfile.TemporaryDirectory(prefix="benchmark_") as workdir:
+            for size in args.sizes:
+                results.extend(run_size(main_module, args, size, api, workdir))
+    finally:
+        api.stop()
+
+    print()
+    print_report(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump([result.to_dict() for result in results], f, ensure_ascii=False, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+# benchmarks/run_validation.py
+
+"""
+Benchmark offline da validação e da serialização de lotes de eventos.
+
+Compara o caminho por registro (`Evento(**registro)` e `json.dumps(evento.model_dump(...))`) com o
+caminho de `src.services.event_batch`: a validação passa a lista inteira, em uma única chamada, a
+um `TypeAdapter` de lista criado uma única vez, em que cada item inválido é devolvido com os seus
+erros em vez de invalidar o lote (nenhum registro é validado duas vezes); a serialização usa
+`dump_json` direto para bytes (com o `TypeAdapter(List[Evento])` no array do prompt). Os dados são
+eventos sintéticos com uma fração de registros inválidos. Nenhuma chamada sai da máquina.
+
+Antes das medições, os dois caminhos rodam uma vez sobre uma amostra (aquecimento). Cada operação é
+medida `--repeats` vezes, alternando qual caminho roda primeiro e com o coletor de lixo desligado
+durante cada medição (como no `timeit`), e o relatório traz a mediana.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.run_validation --size 100000 --repeats 5
+"""
+
+import argparse
+import gc
+import json
+import logging
+import statistics
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from benchmarks.fakes import SyntheticEvents, make_cnpj
+from src.models.Evento import Evento
+from src.services.event_batch import dump_events_json, dump_events_jsonl, validate_events
+
+
+@dataclass
+class ComparisonResult:
+    """Tempo do caminho por registro e do caminho em lote para uma mesma operação."""
+    operation: str
+    items: int
+    baseline_seconds: float
+    batch_seconds: float
+
+    @property
+    def speedup(self) -> float:
+        return self.baseline_seconds / self.batch_seconds if self.batch_seconds else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "speedup": self.speedup}
+
+
+def make_records(size: int, invalid_fraction: float) -> List[Dict[str, Any]]:
+    """Gera `size` registros sintéticos, dos quais cerca de `invalid_fraction` são inválidos."""
+    generator = SyntheticEvents([make_cnpj(index) for index in range(100)])
+    records = generator.events(0, size)
+    step = max(1, round(1 / invalid_fraction)) if invalid_fraction > 0 else 0
+    if step:
+        for index in range(0, size, step):
+            # Um campo obrigatório com tipo errado: o registro inteiro deve ser rejeitado.
+            records[index]["ingressos"] = "esgotado"
+    return records
+
+
+def _timed(func: Callable[[], Any]) -> tuple:
+    # Como no `timeit`: o coletor de lixo fica desligado durante a medição, para que o tempo não
+    # dependa de quantos objetos a medição anterior deixou vivos.
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        result = func()
+        return result, time.perf_counter() - start
+    finally:
+        gc.enable()
+
+
+def validate_per_record(records: List[Dict[str, Any]]) -> List[Evento]:
+    events = []
+    for record in records:
+        try:
+            events.append(Evento(**record))
+        except Exception:
+            continue
+    return events
+
+
+def validate_batch(records: List[Dict[str, Any]]) -> List[Evento]:
+    events, _ = validate_events(records)
+    return [event for event in events if event is not None]
+
+
+def dump_jsonl_per_record(events: List[Evento]) -> bytes:
+    return "".join(
+        json.dumps(event.model_dump(mode='json', exclude_none=True), ensure_ascii=False) + "\n" for event in events
+    ).encode("utf-8")
+
+
+def dump_json_per_record(events: List[Evento]) -> bytes:
+    return json.dumps([event.model_dump(mode='json') for event in events], ensure_ascii=False).encode("utf-8")
+
+
+def _compare(operation: str, items: int, baseline: Callable[[], Any], batch: Callable[[], Any],
+             repeats: int) -> Tuple[ComparisonResult, Any, Any]:
+    """Mede os dois caminhos `repeats` vezes, alternando a ordem, e guarda a mediana de cada um."""
+    baseline_times, batch_times = [], []
+    for repeat in range(repeats):
+        # Descarta os resultados da rodada anterior antes de medir a próxima.
+        baseline_result = batch_result = None
+        if repeat % 2 == 0:
+            baseline_result, baseline_seconds = _timed(baseline)
+            batch_result, batch_seconds = _timed(batch)
+        else:
+            batch_result, batch_seconds = _timed(batch)
+            baseline_result, baseline_seconds = _timed(baseline)
+        baseline_times.append(baseline_seconds)
+        batch_times.append(batch_seconds)
+    result = ComparisonResult(operation, items, statistics.median(baseline_times), statistics.median(batch_times))
+    return result, baseline_result, batch_result
+
+
+def _warm_up(records: List[Dict[str, Any]], sample_size: int = 1000) -> None:
+    """Roda os dois caminhos uma vez sobre uma amostra, para que nenhum pague sozinho o custo da primeira execução."""
+    sample = records[:sample_size]
+    events = validate_batch(sample)
+    validate_per_record(sample)
+    dump_jsonl_per_record(events)
+    dump_events_jsonl(events)
+    dump_json_per_record(events)
+    dump_events_json(events, exclude_none=False)
+
+
+def run(size: int, invalid_fraction: float, repeats: int = 3) -> List[ComparisonResult]:
+    records = make_records(size, invalid_fraction)
+    _warm_up(records)
+    results = []
+
+    result, baseline_events, events = _compare(
+        "validação", len(records), lambda: validate_per_record(records), lambda: validate_batch(records), repeats,
+    )
+    if len(events) != len(baseline_events):
+        raise RuntimeError(f"Validação divergente: {len(baseline_events)} eventos por registro, {len(events)} em lote.")
+    results.append(result)
+
+    result, baseline_jsonl, jsonl = _compare(
+        "serialização JSONL", len(events), lambda: dump_jsonl_per_record(events), lambda: dump_events_jsonl(events),
+        repeats,
+    )
+    if [json.loads(line) for line in baseline_jsonl.splitlines()] != [json.loads(line) for line in jsonl.splitlines()]:
+        raise RuntimeError("Serialização JSONL divergente entre os dois caminhos.")
+    results.append(result)
+
+    result, baseline_json, batch_json = _compare(
+        "serialização do lote (prompt)", len(events), lambda: dump_json_per_record(events),
+        lambda: dump_events_json(events, exclude_none=False), repeats,
+    )
+    if json.loads(baseline_json) != json.loads(batch_json):
+        raise RuntimeError("Serialização do lote (prompt do Gemini) divergente entre os dois caminhos.")
+    results.append(result)
+    return results
+
+
+def print_report(results: List[ComparisonResult]) -> None:
+    header = f"{'operação':<32} {'itens':>8} {'por registro (s)':>17} {'em lote (s)':>12} {'itens/s (lote)':>15} {'ganho':>7}"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        rate = result.items / result.batch_seconds if result.batch_seconds else 0.0
+        print(
+            f"{result.operation:<32} {result.items:>8} {result.baseline_seconds:>17.2f} "
+            f"{result.batch_seconds:>12.2f} {rate:>15.0f} {result.speedup:>6.1f}x"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark offline da validação e serialização de eventos em lote.")
+    parser.add_argument("--size", type=int, default=100_000, help="Quantidade de eventos.")
+    parser.add_argument("--invalid-fraction", type=float, default=0.01, help="Fração de registros inválidos.")
+    parser.add_argument("--repeats", type=int, default=3,
+                        help="Medições de cada operação, alternando a ordem dos caminhos (o relatório traz a mediana).")
+    parser.add_argument("--json", help="Grava os resultados também em um arquivo JSON.")
+    args = parser.parse_args(argv)
+
+    # Os registros inválidos são esperados; o benchmark não mostra os erros de validação.
+    logging.getLogger().setLevel(logging.CRITICAL)
+    results = run(args.size, args.invalid_fraction, args.repeats)
+
+    print_report(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump([result.to_dict() for result in results], f, ensure_ascii=False, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,36 @@
+import argparse
 import asyncio
+import multiprocessing
 import os
-import json
 import logging
 import datetime # Importe para obter a data atual
+import json
+from typing import TYPE_CHECKING, Iterable, List, Optional, Tuple, Union
 from dotenv import load_dotenv
 from urllib.parse import urlparse
 from src.models.Evento import Evento
-from src.services.gemini_enricher import GeminiEnricher
-from src.services.excel_generator import ExcelGenerator
-from scrapegraphai.graphs import SmartScraperGraph
+from src.services.url_scheduler import UrlScheduler
+from src.services.rate_limiter import ProviderLimiter, configure_rate_limiters, estimate_tokens, get_rate_limiter
+from src.services.event_stream import (
+    JsonlEventWriter, RawEventSink, RunCheckpoint, jsonl_to_json_array, load_records,
+)
+from src.services.metrics import MetricsRegistry, add_to_current_span, configure_metrics, get_metrics
+from src.services.event_batch import iter_validated_events, validate_events
+from src.services.event_store import EventStore
+from src.services.job_queue import (
+    DONE, ENRICH_EVENT, FAILED, JOB_TYPES, SCRAPE_URL, Job, JobQueue, JobQueueSink, make_worker_id,
+)
+
+# As dependências pesadas (scrapegraphai/langchain, google.generativeai, playwright, pandas, bs4) são
+# importadas só dentro dos estágios que as usam; aqui, apenas para as anotações de tipo.
+if TYPE_CHECKING:
+    from src.services.browser_pool import BrowserPool
+    from src.services.deduplicator import EventDeduplicator
+    from src.services.enrichment_cache import EnrichmentCache
+    from src.services.enrichment_pipeline import EnrichmentPipeline
+    from src.services.gemini_enricher import GeminiEnricher
+    from src.services.page_cache import PageCache
+    from src.services.page_chunker import ChunkedPage
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -18,10 +40,22 @@ load_dotenv()
 openai_key = os.getenv("OPENAI_API_KEY") 
 gemini_api_key = os.getenv("GEMINI_API_KEY") 
 
-if not openai_key:
-    raise ValueError("Variável de ambiente OPENAI_API_KEY não encontrada. Certifique-se de que está no seu arquivo .env")
-if not gemini_api_key:
-    raise ValueError("Variável de ambiente GEMINI_API_KEY não encontrada. Certifique-se de que está no seu arquivo .env")
+# Credenciais exigidas por estágio: só as do estágio executado são verificadas (exportar não exige nenhuma).
+STAGE_CREDENTIALS = {
+    "scrape": ("OPENAI_API_KEY",),
+    "enrich": ("GEMINI_API_KEY",),
+    "export": (),
+    "all": ("OPENAI_API_KEY", "GEMINI_API_KEY"),
+    "enqueue": (),
+    "collect": (),
+    "query": (),
+}
+
+def check_credentials(stage: str) -> None:
+    """Verifica as variáveis de ambiente com as chaves de API exigidas pelo estágio."""
+    for name in STAGE_CREDENTIALS[stage]:
+        if not os.getenv(name):
+            raise ValueError(f"Variável de ambiente {name} não encontrada. Certifique-se de que está no seu arquivo .env")
 
 graph_config = {
     "llm": {
@@ -38,103 +72,1000 @@ TARGET_URLS = [
     #... suas outras URLs ...
 ]
 
+# Agendamento das URLs: com CONCURRENT_SCRAPING ativo, as URLs são raspadas em paralelo,
+# limitadas globalmente e por domínio para não sobrecarregar os sites nem as APIs.
+CONCURRENT_SCRAPING = os.getenv("CONCURRENT_SCRAPING", "true").lower() in ("1", "true", "yes")
+MAX_CONCURRENT_SCRAPES = int(os.getenv("MAX_CONCURRENT_SCRAPES", "4"))
+MAX_CONCURRENT_PER_DOMAIN = int(os.getenv("MAX_CONCURRENT_PER_DOMAIN", "1"))
+
+# Pipeline de enriquecimento: a raspagem alimenta uma fila limitada consumida por N workers do Gemini.
+ENRICHMENT_WORKERS = int(os.getenv("ENRICHMENT_WORKERS", "4"))
+ENRICHMENT_QUEUE_SIZE = int(os.getenv("ENRICHMENT_QUEUE_SIZE", "100"))
+ENRICHMENT_BATCH_SIZE = int(os.getenv("ENRICHMENT_BATCH_SIZE", "5"))
+
+# Deduplicação entre fontes antes do enriquecimento (mesmo evento listado em vários sites).
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() in ("1", "true", "yes")
+DEDUP_NAME_THRESHOLD = float(os.getenv("DEDUP_NAME_THRESHOLD", "0.85"))
+
+# Cache persistente das consultas de CNPJ na Brasil API.
+CNPJ_CACHE_PATH = os.getenv("CNPJ_CACHE_PATH", "cache/cnpj_cache.sqlite3")
+CNPJ_CACHE_TTL_DAYS = float(os.getenv("CNPJ_CACHE_TTL_DAYS", "30"))
+CNPJ_CACHE_NEGATIVE_TTL_HOURS = float(os.getenv("CNPJ_CACHE_NEGATIVE_TTL_HOURS", "24"))
+
+# Cache de eventos enriquecidos: eventos idênticos aos de execuções anteriores não voltam ao Gemini.
+ENRICHMENT_CACHE_ENABLED = os.getenv("ENRICHMENT_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+ENRICHMENT_CACHE_PATH = os.getenv("ENRICHMENT_CACHE_PATH", "cache/enrichment_cache.sqlite3")
+ENRICHMENT_CACHE_MAX_ENTRIES = int(os.getenv("ENRICHMENT_CACHE_MAX_ENTRIES", "100000"))
+ENRICHMENT_CACHE_MAX_AGE_DAYS = float(os.getenv("ENRICHMENT_CACHE_MAX_AGE_DAYS", "30"))
+
+# Cache de páginas: páginas de agenda inalteradas (304 ou mesmo conteúdo normalizado) reaproveitam
+# os eventos extraídos na execução anterior. FORCE_REFRESH=true ignora o cache e raspa tudo de novo.
+PAGE_CACHE_ENABLED = os.getenv("PAGE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+PAGE_CACHE_PATH = os.getenv("PAGE_CACHE_PATH", "cache/page_cache.sqlite3")
+PAGE_CACHE_MAX_AGE_HOURS = float(os.getenv("PAGE_CACHE_MAX_AGE_HOURS", "72"))
+FORCE_REFRESH = os.getenv("FORCE_REFRESH", "false").lower() in ("1", "true", "yes")
+
+# Formatos gerados ao final da execução (xlsx, csv, parquet) e se cada ingresso vira uma linha.
+EXPORT_FORMATS = [fmt.strip() for fmt in os.getenv("EXPORT_FORMATS", "xlsx").split(",") if fmt.strip()]
+EXPORT_EXPLODE_INGRESSOS = os.getenv("EXPORT_EXPLODE_INGRESSOS", "false").lower() in ("1", "true", "yes")
+
+# Base de eventos: a cada exportação, os eventos são gravados (por identidade estável) em uma base SQLite
+# com datas, horário e preços em colunas indexadas (ver `main.py query`). Com EXPORT_ONLY_CHANGES, as
+# planilhas trazem só os eventos novos ou alterados desde a exportação anterior.
+EVENT_STORE_ENABLED = os.getenv("EVENT_STORE_ENABLED", "true").lower() in ("1", "true", "yes")
+EVENT_STORE_PATH = os.getenv("EVENT_STORE_PATH", "cache/event_store.sqlite3")
+EXPORT_ONLY_CHANGES = os.getenv("EXPORT_ONLY_CHANGES", "false").lower() in ("1", "true", "yes")
+# Cursor da base de eventos usado para saber o que já foi exportado.
+EXPORT_CURSOR = "export"
+
+# Limites de taxa por provedor (requisições e tokens por minuto), ajustados conforme a cota de cada conta.
+# Chamadas limitadas (429) são repetidas com backoff exponencial e reduzem a concorrência do provedor.
+OPENAI_REQUESTS_PER_MINUTE = float(os.getenv("OPENAI_REQUESTS_PER_MINUTE", "60"))
+OPENAI_TOKENS_PER_MINUTE = float(os.getenv("OPENAI_TOKENS_PER_MINUTE", "200000"))
+OPENAI_TOKENS_PER_SCRAPE = int(os.getenv("OPENAI_TOKENS_PER_SCRAPE", "20000"))
+GEMINI_REQUESTS_PER_MINUTE = float(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "60"))
+GEMINI_TOKENS_PER_MINUTE = float(os.getenv("GEMINI_TOKENS_PER_MINUTE", "1000000"))
+BRASILAPI_REQUESTS_PER_MINUTE = float(os.getenv("BRASILAPI_REQUESTS_PER_MINUTE", "180"))
+RATE_LIMIT_MAX_RETRIES = int(os.getenv("RATE_LIMIT_MAX_RETRIES", "5"))
+
+# Navegador headless compartilhado: as páginas são renderizadas por um pool de BROWSER_POOL_SIZE contextos
+# (imagens, fontes e mídia bloqueadas) e o HTML resultante é entregue ao SmartScraperGraph.
+# BROWSER_POOL_SIZE=0 volta ao comportamento anterior (o SmartScraperGraph busca a URL por conta própria).
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", str(MAX_CONCURRENT_SCRAPES)))
+BROWSER_WAIT_UNTIL = os.getenv("BROWSER_WAIT_UNTIL", "networkidle")
+BROWSER_NAVIGATION_TIMEOUT = float(os.getenv("BROWSER_NAVIGATION_TIMEOUT", "30"))
+
+# Extração por blocos: a página é limpa (menus, rodapés, anúncios) e dividida em um bloco por evento;
+# só os blocos dentro da janela de datas são enviados ao LLM, agrupados em documentos de até
+# CHUNK_TOKEN_BUDGET tokens de conteúdo (o prompt e o schema vão uma vez por documento), e cada
+# documento já extraído fica em cache.
+CHUNKED_EXTRACTION = os.getenv("CHUNKED_EXTRACTION", "true").lower() in ("1", "true", "yes")
+CHUNK_TOKEN_BUDGET = int(os.getenv("CHUNK_TOKEN_BUDGET", "8000"))
+EXTRACTION_WINDOW_DAYS = 30
+
+# Métricas da execução: ao final são gravados output/metrics.json e output/metrics.prom (formato
+# Prometheus) e, com METRICS_TRACE, um trecho (span) por URL e por evento em output/trace.jsonl.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+METRICS_TRACE = os.getenv("METRICS_TRACE", "true").lower() in ("1", "true", "yes")
+
+# Fila de tarefas persistente para distribuir o trabalho entre processos do mesmo host: `main.py enqueue` cria
+# uma tarefa por URL, `main.py worker` (em N processos) raspa as URLs e enriquece os eventos, e
+# `main.py collect` monta a saída final. Reservas não renovadas em JOB_LEASE_SECONDS são retomadas.
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", "cache/job_queue.sqlite3")
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "600"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "2"))
+
+# Versão do prompt de raspagem. Incremente ao alterar SCRAPER_PROMPT para invalidar o cache de páginas.
+SCRAPER_PROMPT_VERSION = "1"
+
 # JSON Schema para o Scrapegraph AI
 JSON_SCHEMA_STR = Evento
 
 # Prompt para o Scrapegraph AI
 SCRAPER_PROMPT = f"""
-Você é um agente de raspagem de dados altamente especializado em eventos musicais. Sua tarefa é analisar o conteúdo da página web fornecida e extrair o máximo de informações possível para eventos do tipo "música" que ocorrem entre o dia de hoje ({datetime.date.today()}) e os próximos 30 dias.
+Você é um agente de raspagem de dados altamente especializado em eventos musicais. Sua tarefa é analisar o conteúdo da página web fornecida e extrair o máximo de informações possível para eventos do tipo "música" que ocorrem entre o dia de hoje ({datetime.date.today()}) e os próximos {EXTRACTION_WINDOW_DAYS} dias.
 
 **Instruções de Extração:**
 
 1.  **Eventos Alvo:** Foco total em eventos de música, incluindo shows, festivais, turnês, musicais e apresentações em casas de espetáculo, tanto em locais abertos quanto fechados quanto públicos e privados.
-2.  **Período de Tempo:** Ignore eventos passados. Inclua **apenas eventos com datas a partir do dia de hoje até 30 dias no futuro**.
+2.  **Período de Tempo:** Ignore eventos passados. Inclua **apenas eventos com datas a partir do dia de hoje até {EXTRACTION_WINDOW_DAYS} dias no futuro**.
 3.  **Precisão nos Dados:** Preencha cada campo do JSON com a informação mais exata disponível. Se a página tiver a data e o horário, extraia-os. Se não tiver, busque por eles.
 4.  **Promotor:** Procure o nome do promotor ou organizador. **Se não encontrar o promotor, preencha todos os campos do objeto 'promotor' com `null`.** Não invente dados.
 5.  **Fontes de Dados:** Procure por dados de ingressos, flyers (cole os links), artistas, datas, horários e locais, mesmo que eles estejam dispersos.
 6.  **Saída JSON:** A saída deve ser um **array de objetos JSON**. Cada objeto JSON deve representar um evento distinto e seguir estritamente o formato do schema fornecido. Se um campo não tiver valor na página, preencha-o com `null`.
 """
 
-async def main_scraper_loop(url: str, all_extracted_events: list, enricher: GeminiEnricher):
+# Tokens estimados das instruções que o SmartScraperGraph acrescenta a cada requisição (template e
+# instruções de formato da saída), além do prompt e do schema.
+SCRAPER_TEMPLATE_TOKENS = 200
+
+def scraper_request_overhead_tokens() -> int:
+    """Tokens enviados em toda requisição de raspagem, independentemente do conteúdo: prompt, schema e template."""
+    schema = JSON_SCHEMA_STR.model_json_schema()
+    return estimate_tokens(SCRAPER_PROMPT) + estimate_tokens(json.dumps(schema, ensure_ascii=False)) + SCRAPER_TEMPLATE_TOKENS
+
+def _events_from_result(raw_scrape_result, url: str) -> Optional[List[dict]]:
+    """Normaliza o retorno do SmartScraperGraph (dicionário ou lista) em uma lista de eventos."""
+    # Corrigido: Normaliza a estrutura de dados de eventos raspados
+    if isinstance(raw_scrape_result, dict):
+        # Extrai a chave que contém a lista de eventos
+        key_with_events = next((k for k in raw_scrape_result if isinstance(raw_scrape_result[k], list)), None)
+        if key_with_events:
+            return raw_scrape_result[key_with_events]
+        logger.warning(f"ATENÇÃO: Não foi encontrada uma lista de eventos no dicionário retornado para {url}: {raw_scrape_result}")
+        return None
+    if isinstance(raw_scrape_result, list):
+        return raw_scrape_result
+    logger.warning(f"ATENÇÃO: Formato de retorno inesperado para {url}: {raw_scrape_result}")
+    return None
+
+async def run_smart_scraper(source: str, tokens: int = OPENAI_TOKENS_PER_SCRAPE):
+    """Executa o SmartScraperGraph sobre uma URL ou um HTML, respeitando o limite de taxa da OpenAI."""
+    from scrapegraphai.graphs import SmartScraperGraph
+
+    smart_scraper_graph = SmartScraperGraph(
+        prompt=SCRAPER_PROMPT,
+        source=source,
+        schema=JSON_SCHEMA_STR,
+        config=graph_config,
+    )
+    metrics = get_metrics()
+    metrics.increment("openai_estimated_tokens_total", tokens)
+    add_to_current_span("openai_estimated_tokens", tokens)
+    with metrics.span("smart_scraper", source="url" if source.startswith("http") else "html"):
+        return await get_rate_limiter("openai").call(asyncio.to_thread, smart_scraper_graph.run, tokens=tokens)
+
+async def extract_events_by_chunks(url: str, chunked: "ChunkedPage", page_cache: Optional["PageCache"] = None,
+                                   use_cache: bool = True) -> Tuple[List[dict], bool]:
+    """
+    Extrai os eventos de uma página a partir dos seus blocos. Blocos já extraídos vêm do cache de
+    páginas; os novos ou alterados são agrupados em documentos de até CHUNK_TOKEN_BUDGET tokens e
+    cada documento é extraído em uma requisição, em paralelo. Os eventos de cada documento são
+    guardados no cache bloco a bloco, de modo que um bloco alterado não invalida os vizinhos.
+
+    Args:
+        use_cache (bool): False (FORCE_REFRESH) extrai todos os blocos de novo, sem ler o cache;
+                          os resultados novos ainda são gravados nele.
+
+    Returns:
+        Tuple[List[dict], bool]: Os eventos extraídos e se todos os blocos foram extraídos com sucesso.
+    """
+    from src.services.page_chunker import assign_events_to_chunks, pack_chunks, wrap_chunks_html
+
+    overhead_tokens = scraper_request_overhead_tokens()
+    events, pending = [], []
+    for chunk in chunked.chunks:
+        cached_events = page_cache.get_chunk(chunk.hash) if page_cache is not None and use_cache else None
+        if cached_events is None:
+            pending.append(chunk)
+        else:
+            events.extend(cached_events)
+
+    cached_chunks = len(chunked.chunks) - len(pending)
+    packs = pack_chunks(pending, CHUNK_TOKEN_BUDGET)
+    pack_tokens = [overhead_tokens + sum(chunk.tokens for chunk in pack) for pack in packs]
+    results = await asyncio.gather(
+        *(run_smart_scraper(wrap_chunks_html(pack), tokens=tokens) for pack, tokens in zip(packs, pack_tokens)),
+        return_exceptions=True,
+    )
+    complete = True
+    for pack, result in zip(packs, results):
+        pack_events = None if isinstance(result, Exception) else _events_from_result(result, url)
+        if pack_events is None:
+            if isinstance(result, Exception):
+                logger.error(f"Erro ao extrair {len(pack)} blocos de {url}: {result}")
+            complete = False
+            continue
+        events.extend(pack_events)
+        if page_cache is None:
+            continue
+        chunk_events = assign_events_to_chunks(pack, pack_events)
+        if chunk_events is None:
+            # Sem saber de qual bloco veio cada evento, o lote é extraído de novo na próxima execução.
+            logger.debug(f"{url}: eventos de um lote de {len(pack)} blocos não associados aos blocos; lote não cacheado.")
+            continue
+        for chunk, events_of_chunk in zip(pack, chunk_events):
+            page_cache.set_chunk(chunk.hash, events_of_chunk)
+
+    # Comparação com uma única requisição com a página inteira; pode ser negativa se a página tiver
+    # muitos blocos grandes (várias requisições, cada uma com o prompt e o schema).
+    sent_tokens = sum(pack_tokens)
+    full_tokens = overhead_tokens + chunked.page_tokens
+    extracted_chunks = sum(len(pack) for pack in packs)
+    metrics = get_metrics()
+    metrics.increment("scraper_chunks_total", chunked.dropped, result="dropped")
+    metrics.increment("scraper_chunks_total", cached_chunks, result="cached")
+    metrics.increment("scraper_chunks_total", extracted_chunks, result="extracted")
+    metrics.increment("scraper_chunk_requests_total", len(packs))
+    metrics.increment("scraper_input_tokens_total", sent_tokens, mode="chunked")
+    metrics.increment("scraper_input_tokens_total", full_tokens, mode="full_page")
+    metrics.observe("scraper_input_tokens_saved", full_tokens - sent_tokens)
+    add_to_current_span("input_tokens_saved", full_tokens - sent_tokens)
+    logger.info(
+        f"{url}: {len(chunked.chunks)} blocos de evento na janela de datas ({chunked.dropped} descartados, "
+        f"{cached_chunks} do cache, {extracted_chunks} extraídos em {len(packs)} requisições). Tokens de entrada: "
+        f"~{sent_tokens} em vez de ~{full_tokens} (economia de ~{full_tokens - sent_tokens})."
+    )
+    return events, complete
+
+async def main_scraper_loop(url: str, pipeline: Union["EnrichmentPipeline", RawEventSink],
+                            page_cache: Optional["PageCache"] = None, browser_pool: Optional["BrowserPool"] = None):
+    """
+    Raspa uma URL e entrega os eventos ao `pipeline`: o `EnrichmentPipeline` (estágio `all`) ou um
+    `RawEventSink`, que grava os eventos brutos (estágio `scrape`).
+    """
     print(f"\n--- Iniciando raspagem para a URL: {url} ---")
     try:
-        smart_scraper_graph = SmartScraperGraph(
-            prompt=SCRAPER_PROMPT,
-            source=url,
-            schema=JSON_SCHEMA_STR,
-            config=graph_config,
-        )
-        raw_scrape_result = await asyncio.to_thread(smart_scraper_graph.run)
-        
-        # Corrigido: Normaliza a estrutura de dados de eventos raspados
-        events_from_url_raw = []
-        if isinstance(raw_scrape_result, dict):
-            # Extrai a chave que contém a lista de eventos
-            key_with_events = next((k for k in raw_scrape_result if isinstance(raw_scrape_result[k], list)), None)
-            if key_with_events:
-                events_from_url_raw = raw_scrape_result[key_with_events]
+        metrics = get_metrics()
+        # O trecho cobre a verificação, a renderização e a extração; o envio para a fila de
+        # enriquecimento (que pode esperar por contrapressão) fica de fora.
+        with metrics.span("scrape_url", url=url) as span:
+            page_check = None
+            if page_cache is not None:
+                page_entry = page_cache.get(url)
+                page_check = await asyncio.to_thread(page_cache.check, url, page_entry)
+                metrics.increment("page_cache_requests_total", result="unchanged" if page_check.unchanged else "changed")
+
+            complete = True
+            if page_check is not None and page_check.unchanged and not FORCE_REFRESH:
+                logger.info(f"Página {url} inalterada desde a última raspagem. Reaproveitando {len(page_entry.events)} eventos do cache.")
+                events_from_url_raw = page_entry.events
+                span.set("source", "page_cache")
             else:
-                logger.warning(f"ATENÇÃO: Não foi encontrada uma lista de eventos no dicionário retornado para {url}: {raw_scrape_result}")
-                return
-        elif isinstance(raw_scrape_result, list):
-            events_from_url_raw = raw_scrape_result
-        else:
-            logger.warning(f"ATENÇÃO: Formato de retorno inesperado para {url}: {raw_scrape_result}")
-            return
+                # Com o pool, a página é renderizada no navegador compartilhado e o SmartScraperGraph
+                # recebe o HTML pronto (fonte local), sem abrir um navegador próprio.
+                rendered_html = None
+                if browser_pool is not None:
+                    try:
+                        rendered_html = await browser_pool.fetch(url)
+                    except Exception as e:
+                        logger.warning(f"AVISO: Falha ao renderizar {url} no navegador compartilhado ({e}). Usando o carregamento padrão.")
+
+                # Extração por blocos: a página é reduzida e dividida em um bloco por evento; só os blocos
+                # na janela de datas do prompt vão para o LLM. O HTML estático (sem navegador) só é usado
+                # se a lista de eventos for reconhecida nele; senão a página é raspada inteira, como antes.
+                chunked = None
+                html = rendered_html or (page_check.html if page_check is not None else None)
+                if CHUNKED_EXTRACTION and html:
+                    from src.services.page_chunker import chunk_page
+
+                    today = datetime.date.today()
+                    chunked = await asyncio.to_thread(
+                        chunk_page, html, url, today, today + datetime.timedelta(days=EXTRACTION_WINDOW_DAYS)
+                    )
+                    if not chunked.structured and rendered_html is None:
+                        chunked = None
+
+                if chunked is not None:
+                    span.set("source", "chunks")
+                    events_from_url_raw, complete = await extract_events_by_chunks(url, chunked, page_cache, use_cache=not FORCE_REFRESH)
+                else:
+                    span.set("source", "rendered_html" if rendered_html else "url")
+                    raw_scrape_result = await run_smart_scraper(rendered_html or url)
+                    events_from_url_raw = _events_from_result(raw_scrape_result, url)
+                    if events_from_url_raw is None:
+                        return
+
+            span.set("events", len(events_from_url_raw))
+            metrics.increment("scraper_events_extracted_total", len(events_from_url_raw), url=url)
+            # Uma extração parcial (algum bloco falhou) não é guardada, para ser refeita na próxima execução.
+            if page_check is not None and complete:
+                page_cache.set(
+                    url,
+                    events_from_url_raw,
+                    etag=page_check.etag,
+                    last_modified=page_check.last_modified,
+                    content_hash=page_check.content_hash,
+                )
         
         parsed_url = urlparse(url)
         domain_name = parsed_url.netloc.replace("www.", "").split(".")[0]
         source_name = domain_name.capitalize() if domain_name else "Desconhecida"
 
         for event_dict in events_from_url_raw:
+            # Garante que 'fonte_de_divulgacao' seja preenchida
+            if isinstance(event_dict, dict) and not event_dict.get('fonte_de_divulgacao'):
+                event_dict['fonte_de_divulgacao'] = source_name
+
+        # Converte todos os dicionários raspados para o modelo Pydantic Evento de uma só vez
+        events_pydantic, failures = validate_events(events_from_url_raw)
+        for failure in failures:
+            logger.error(f"Erro ao processar/converter evento do dicionário: {failure.record}. Erro: {failure.message}")
+
+        for event_pydantic in events_pydantic:
+            if event_pydantic is None:
+                continue
             try:
-                # Garante que 'fonte_de_divulgacao' seja preenchida
-                if 'fonte_de_divulgacao' not in event_dict or not event_dict['fonte_de_divulgacao']:
-                    event_dict['fonte_de_divulgacao'] = source_name
-                
-                # Converte o dicionário raspado para o modelo Pydantic Evento
-                event_pydantic = Evento(**event_dict)
-                
-                # Enriquece o objeto Evento Pydantic com o Gemini
-                enriched_event = await enricher.enrich_event_data(event_pydantic)
-                all_extracted_events.append(enriched_event)
-            
+                # Envia o evento para a fila de enriquecimento com o Gemini
+                await pipeline.submit(event_pydantic, url=url)
             except Exception as e:
-                logger.error(f"Erro ao processar/converter/enriquecer evento do dicionário: {event_dict}. Erro: {e}", exc_info=True)
+                logger.error(f"Erro ao enviar evento para enriquecimento: {event_pydantic.nome_do_evento}. Erro: {e}", exc_info=True)
         
-        logger.info(f"--- {len(events_from_url_raw)} eventos extraídos (brutos) de {url}. Tentando enriquecer. ---")
+        pipeline.finish_url(url)
+        logger.info(f"--- {len(events_from_url_raw)} eventos extraídos (brutos) de {url}. Enviados para enriquecimento. ---")
 
     except Exception as e:
         logger.error(f"ERRO geral ao raspar {url}: {e}", exc_info=True)
 
-async def main():
+def metrics_suffix(stage: str) -> str:
+    """Sufixo dos arquivos de métricas: o estágio `all` grava metrics.json; os demais, metrics_<estágio>.json."""
+    return "" if stage == "all" else f"_{stage}"
+
+def setup_metrics(output_dir: str, stage: str) -> MetricsRegistry:
+    """Cria o registro de métricas do estágio (com rastreamento em arquivo, se ativo) e o torna o padrão."""
+    os.makedirs(output_dir, exist_ok=True)
+    trace_path = None
+    if METRICS_ENABLED and METRICS_TRACE:
+        trace_path = os.path.join(output_dir, f"trace{metrics_suffix(stage)}.jsonl")
+    metrics = MetricsRegistry(trace_path=trace_path)
+    configure_metrics(metrics)
+    return metrics
+
+def export_run_metrics(metrics: MetricsRegistry, output_dir: str, stage: str = "all") -> None:
+    """Calcula os indicadores derivados da execução e grava as métricas em JSON e no formato Prometheus."""
+    gemini_requests = metrics.counter_value("gemini_requests_total")
+    gemini_events = metrics.counter_value("gemini_events_total")
+    gemini_tokens = metrics.counter_value("gemini_tokens_total")
+    if gemini_requests:
+        metrics.set_gauge(
+            "gemini_function_call_rate",
+            metrics.counter_value("gemini_requests_total", function_call="true") / gemini_requests,
+        )
+    if gemini_events:
+        metrics.set_gauge("gemini_calls_per_event", gemini_requests / gemini_events)
+        metrics.set_gauge("gemini_tokens_per_event", gemini_tokens / gemini_events)
+    if stage != "export":
+        logger.info(
+            f"Gemini: {gemini_requests:.0f} chamadas para {gemini_events:.0f} eventos, {gemini_tokens:.0f} tokens. "
+            f"OpenAI (estimado): {metrics.counter_value('openai_estimated_tokens_total'):.0f} tokens de entrada."
+        )
+    suffix = metrics_suffix(stage)
+    metrics.export_json(os.path.join(output_dir, f"metrics{suffix}.json"))
+    metrics.export_prometheus(os.path.join(output_dir, f"metrics{suffix}.prom"))
+
+def finish_metrics(metrics: MetricsRegistry, output_dir: str, stage: str) -> None:
+    if METRICS_ENABLED:
+        export_run_metrics(metrics, output_dir, stage)
+    metrics.close()
+
+def setup_rate_limiters() -> None:
+    configure_rate_limiters(
+        openai=ProviderLimiter(
+            "openai",
+            requests_per_minute=OPENAI_REQUESTS_PER_MINUTE,
+            tokens_per_minute=OPENAI_TOKENS_PER_MINUTE,
+            max_concurrency=MAX_CONCURRENT_SCRAPES,
+            max_retries=RATE_LIMIT_MAX_RETRIES,
+        ),
+        gemini=ProviderLimiter(
+            "gemini",
+            requests_per_minute=GEMINI_REQUESTS_PER_MINUTE,
+            tokens_per_minute=GEMINI_TOKENS_PER_MINUTE,
+            max_concurrency=ENRICHMENT_WORKERS,
+            max_retries=RATE_LIMIT_MAX_RETRIES,
+        ),
+        brasilapi=ProviderLimiter(
+            "brasilapi",
+            requests_per_minute=BRASILAPI_REQUESTS_PER_MINUTE,
+            max_retries=RATE_LIMIT_MAX_RETRIES,
+        ),
+    )
+
+def log_rate_limiter_stats(metrics: MetricsRegistry, providers: Iterable[str]) -> None:
+    for provider in providers:
+        limiter_stats = get_rate_limiter(provider).stats()
+        logger.info(
+            f"Limite de taxa ({provider}): {limiter_stats['throttled']} respostas 429, "
+            f"{limiter_stats['retries']} novas tentativas, concorrência final {limiter_stats['concurrency_limit']}."
+        )
+        metrics.set_gauge("rate_limiter_concurrency_limit", limiter_stats['concurrency_limit'], provider=provider)
+
+def open_event_output(jsonl_path: str, checkpoint_path: str) -> Tuple[JsonlEventWriter, RunCheckpoint]:
+    """
+    Abre o JSONL de saída de um estágio e seu checkpoint. Se a execução anterior foi interrompida,
+    ela é retomada; senão o checkpoint e o arquivo de saída começam do zero.
+    """
+    checkpoint = RunCheckpoint(checkpoint_path)
+    if checkpoint.can_resume:
+        logger.info(
+            f"Retomando execução interrompida: {len(checkpoint.urls_done)} URLs e "
+            f"{len(checkpoint.events_done)} eventos já concluídos."
+        )
+    else:
+        checkpoint.reset()
+        if os.path.exists(jsonl_path):
+            os.remove(jsonl_path)
+    return JsonlEventWriter(jsonl_path), checkpoint
+
+def create_page_cache() -> Optional["PageCache"]:
+    if FORCE_REFRESH:
+        logger.info("FORCE_REFRESH ativo: todas as URLs serão raspadas novamente, ignorando o cache de páginas.")
+    if not PAGE_CACHE_ENABLED:
+        return None
+    from src.services.page_cache import PageCache
+
+    return PageCache(
+        db_path=PAGE_CACHE_PATH,
+        prompt_version=SCRAPER_PROMPT_VERSION,
+        max_age_seconds=PAGE_CACHE_MAX_AGE_HOURS * 3600,
+    )
+
+async def scrape_urls(urls: List[str], pipeline: Union["EnrichmentPipeline", RawEventSink],
+                      page_cache: Optional["PageCache"] = None) -> None:
+    """Raspa as URLs (em paralelo ou uma por vez), com o navegador compartilhado, entregando os eventos ao `pipeline`."""
+    browser_pool = None
+    if BROWSER_POOL_SIZE > 0 and urls:
+        from src.services.browser_pool import BrowserPool
+
+        browser_pool = BrowserPool(
+            size=BROWSER_POOL_SIZE,
+            headless=graph_config["headless"],
+            navigation_timeout=BROWSER_NAVIGATION_TIMEOUT,
+            wait_until=BROWSER_WAIT_UNTIL,
+        )
+        await browser_pool.start()
+    try:
+        if CONCURRENT_SCRAPING:
+            scheduler = UrlScheduler(
+                max_concurrency=MAX_CONCURRENT_SCRAPES,
+                max_per_domain=MAX_CONCURRENT_PER_DOMAIN,
+            )
+            await scheduler.run(urls, lambda url: main_scraper_loop(url, pipeline, page_cache, browser_pool))
+        else:
+            for url in urls:
+                await main_scraper_loop(url, pipeline, page_cache, browser_pool)
+    finally:
+        if browser_pool is not None:
+            await browser_pool.close()
+
+def create_enricher() -> Tuple["GeminiEnricher", Optional["EnrichmentCache"]]:
+    """Configura o serviço de CNPJ e cria o GeminiEnricher, com o cache de enriquecimento se ativo."""
+    from src.services.cnpj_lookup import CNPJCache, CNPJLookupService, configure_cnpj_service
+    from src.services.enrichment_cache import EnrichmentCache
+    from src.services.gemini_enricher import GeminiEnricher
+
+    configure_cnpj_service(CNPJLookupService(cache=CNPJCache(
+        db_path=CNPJ_CACHE_PATH,
+        ttl_seconds=CNPJ_CACHE_TTL_DAYS * 24 * 3600,
+        negative_ttl_seconds=CNPJ_CACHE_NEGATIVE_TTL_HOURS * 3600,
+    )))
+    enrichment_cache = None
+    if ENRICHMENT_CACHE_ENABLED:
+        enrichment_cache = EnrichmentCache(
+            db_path=ENRICHMENT_CACHE_PATH,
+            max_entries=ENRICHMENT_CACHE_MAX_ENTRIES,
+            max_age_seconds=ENRICHMENT_CACHE_MAX_AGE_DAYS * 24 * 3600,
+        )
+    return GeminiEnricher(gemini_api_key=gemini_api_key, cache=enrichment_cache), enrichment_cache
+
+def create_enrichment_pipeline(enricher: "GeminiEnricher", writer: JsonlEventWriter, checkpoint: RunCheckpoint,
+                               deduplicator: Optional["EventDeduplicator"]) -> "EnrichmentPipeline":
+    from src.services.enrichment_pipeline import EnrichmentPipeline
+
+    return EnrichmentPipeline(
+        enricher,
+        num_workers=ENRICHMENT_WORKERS,
+        queue_size=ENRICHMENT_QUEUE_SIZE,
+        batch_size=ENRICHMENT_BATCH_SIZE,
+        deduplicator=deduplicator,
+        writer=writer,
+        checkpoint=checkpoint,
+    )
+
+def create_deduplicator() -> Optional["EventDeduplicator"]:
+    if not DEDUP_ENABLED:
+        return None
+    from src.services.deduplicator import EventDeduplicator
+
+    return EventDeduplicator(name_threshold=DEDUP_NAME_THRESHOLD)
+
+def log_dedup_stats(metrics: MetricsRegistry, deduplicator: "EventDeduplicator") -> None:
+    dedup_stats = deduplicator.stats()
+    logger.info(
+        f"Deduplicação: {dedup_stats['seen']} eventos recebidos, {dedup_stats['unique']} únicos, "
+        f"{dedup_stats['collapsed']} duplicatas colapsadas por fonte: {dedup_stats['collapsed_by_source']}."
+    )
+    metrics.set_gauge("dedup_events_seen", dedup_stats['seen'])
+    metrics.set_gauge("dedup_events_collapsed", dedup_stats['collapsed'])
+
+def log_enrichment_stats(metrics: MetricsRegistry, enricher: "GeminiEnricher",
+                         enrichment_cache: Optional["EnrichmentCache"],
+                         deduplicator: Optional["EventDeduplicator"]) -> None:
+    if deduplicator is not None:
+        log_dedup_stats(metrics, deduplicator)
+    rule_stats = enricher.rules.stats()
+    logger.info(
+        f"Regras determinísticas: {rule_stats['resolved']} eventos resolvidos sem LLM, "
+        f"{rule_stats['unresolved']} enviados ao Gemini."
+    )
+    metrics.set_gauge("rule_enricher_events", rule_stats['resolved'], result="resolved")
+    metrics.set_gauge("rule_enricher_events", rule_stats['unresolved'], result="unresolved")
+    if enrichment_cache is not None:
+        cache_stats = enrichment_cache.stats()
+        logger.info(
+            f"Cache de enriquecimento: {cache_stats['hits']} acertos, {cache_stats['misses']} falhas "
+            f"(taxa de acerto: {cache_stats['hit_rate']:.1%})."
+        )
+        metrics.set_gauge("enrichment_cache_requests", cache_stats['hits'], result="hit")
+        metrics.set_gauge("enrichment_cache_requests", cache_stats['misses'], result="miss")
+        metrics.set_gauge("enrichment_cache_hit_rate", cache_stats['hit_rate'])
+
+def store_events(input_path: str) -> EventStore:
+    """Grava os eventos de um arquivo na base de eventos (inserindo os novos e atualizando os alterados)."""
+    store = EventStore(EVENT_STORE_PATH)
+    counts = store.upsert_many(iter_validated_events(load_records(input_path), input_path))
+    logger.info(
+        f"Base de eventos '{EVENT_STORE_PATH}': {counts['new']} eventos novos, {counts['changed']} alterados "
+        f"e {counts['unchanged']} inalterados."
+    )
+    metrics = get_metrics()
+    for result, count in counts.items():
+        metrics.increment("event_store_upserts_total", count, result=result)
+    return store
+
+def export_events(input_path: str, output_dir: str, formats: Optional[List[str]] = None,
+                  explode_ingressos: bool = EXPORT_EXPLODE_INGRESSOS, changed_only: bool = EXPORT_ONLY_CHANGES) -> int:
+    """
+    Gera os arquivos finais a partir de um arquivo de eventos enriquecidos: o array JSON (quando a
+    entrada é um JSONL) e as planilhas nos formatos pedidos. Com a base de eventos ativa, os eventos
+    são gravados nela e, com `changed_only`, as planilhas trazem só os eventos novos ou alterados
+    desde a exportação anterior.
+
+    Returns:
+        int: Quantidade de eventos exportados.
+    """
+    from src.services.excel_generator import ExcelGenerator
+
+    if not os.path.exists(input_path):
+        logger.error(f"ERRO: Arquivo de eventos '{input_path}' não encontrado.")
+        return 0
+    os.makedirs(output_dir, exist_ok=True)
+    if input_path.endswith(".jsonl"):
+        output_json_filepath = os.path.join(output_dir, os.path.splitext(os.path.basename(input_path))[0] + ".json")
+        total_events = jsonl_to_json_array(input_path, output_json_filepath)
+        if not total_events:
+            os.remove(output_json_filepath)
+    else:
+        output_json_filepath = input_path
+        total_events = sum(1 for _ in load_records(input_path))
+    if not total_events:
+        logger.warning("Nenhum evento foi extraído e enriquecido. Nenhum arquivo JSON/Excel será gerado.")
+        return 0
+
+    logger.info(f"Todos os eventos enriquecidos salvos em '{output_json_filepath}'")
+    store = store_events(input_path) if EVENT_STORE_ENABLED else None
+    records, filename_prefix = (lambda: load_records(input_path)), "eventos_enriquecidos"
+    if changed_only:
+        if store is None:
+            logger.warning("AVISO: EXPORT_ONLY_CHANGES requer a base de eventos (EVENT_STORE_ENABLED). Exportando todos os eventos.")
+        else:
+            since, until = store.pending_changes(EXPORT_CURSOR)
+            if since == until:
+                logger.info("Nenhum evento novo ou alterado desde a exportação anterior. Nenhuma planilha será gerada.")
+                store.close()
+                return total_events
+            records, filename_prefix = (lambda: store.iter_changes(since, until)), "eventos_novos_ou_alterados"
+
+    excel_generator = ExcelGenerator(output_dir=output_dir)
+    exported = [
+        excel_generator.export(records(), export_format, filename=f"{filename_prefix}.{export_format}",
+                               explode_ingressos=explode_ingressos)
+        for export_format in formats or EXPORT_FORMATS
+    ]
+    if store is not None:
+        # O cursor só avança se todas as planilhas foram geradas; senão as alterações saem na próxima exportação.
+        if all(filepath is not None for filepath in exported):
+            store.set_cursor(EXPORT_CURSOR, store.last_change_seq())
+        store.close()
+    return total_events
+
+async def run_scrape(output_dir: str = "output", urls: Optional[List[str]] = None,
+                     output_path: Optional[str] = None) -> None:
+    """Estágio `scrape`: raspa as URLs e grava os eventos brutos (sem enriquecimento) em JSONL."""
+    output_path = output_path or os.path.join(output_dir, "raw_events.jsonl")
+    metrics = setup_metrics(output_dir, "scrape")
+    setup_rate_limiters()
+    page_cache = create_page_cache()
+
+    writer, checkpoint = open_event_output(output_path, os.path.join(output_dir, "checkpoint_scrape.jsonl"))
+    sink = RawEventSink(writer, checkpoint)
+    await scrape_urls([url for url in urls or TARGET_URLS if not checkpoint.is_url_done(url)], sink, page_cache)
+    writer.close()
+    checkpoint.mark_completed()
+    checkpoint.close()
+
+    logger.info(f"Raspagem concluída: {sink.processed} eventos brutos gravados em '{output_path}'.")
+    log_rate_limiter_stats(metrics, ("openai",))
+    finish_metrics(metrics, output_dir, "scrape")
+
+async def run_enrich(output_dir: str = "output", input_path: Optional[str] = None,
+                     output_path: Optional[str] = None) -> None:
+    """Estágio `enrich`: enriquece com o Gemini os eventos brutos de um arquivo e grava o resultado em JSONL."""
+    input_path = input_path or os.path.join(output_dir, "raw_events.jsonl")
+    output_path = output_path or os.path.join(output_dir, "all_enriched_events.jsonl")
+    if not os.path.exists(input_path):
+        logger.error(f"ERRO: Arquivo de eventos brutos '{input_path}' não encontrado. Rode antes o estágio scrape.")
+        return
+    metrics = setup_metrics(output_dir, "enrich")
+    setup_rate_limiters()
+    enricher, enrichment_cache = create_enricher()
+    deduplicator = create_deduplicator()
+
+    writer, checkpoint = open_event_output(output_path, os.path.join(output_dir, "checkpoint_enrich.jsonl"))
+    async with create_enrichment_pipeline(enricher, writer, checkpoint, deduplicator) as pipeline:
+        for event_pydantic in iter_validated_events(load_records(input_path), input_path):
+            await pipeline.submit(event_pydantic)
+    writer.close()
+    checkpoint.mark_completed()
+    checkpoint.close()
+
+    logger.info(f"Enriquecimento concluído: {pipeline.processed} eventos enriquecidos gravados em '{output_path}'.")
+    log_enrichment_stats(metrics, enricher, enrichment_cache, deduplicator)
+    log_rate_limiter_stats(metrics, ("gemini", "brasilapi"))
+    finish_metrics(metrics, output_dir, "enrich")
+
+def run_export(output_dir: str = "output", input_path: Optional[str] = None, formats: Optional[List[str]] = None,
+               explode_ingressos: bool = EXPORT_EXPLODE_INGRESSOS, changed_only: bool = EXPORT_ONLY_CHANGES) -> None:
+    """Estágio `export`: gera o JSON e as planilhas a partir de um arquivo de eventos já enriquecidos."""
+    input_path = input_path or os.path.join(output_dir, "all_enriched_events.jsonl")
+    metrics = setup_metrics(output_dir, "export")
+    total_events = export_events(input_path, output_dir, formats, explode_ingressos, changed_only)
+    logger.info(f"Exportação concluída: {total_events} eventos.")
+    finish_metrics(metrics, output_dir, "export")
+
+def run_query(args: argparse.Namespace) -> None:
+    """
+    Estágio `query`: consulta a base de eventos por datas, local, CNPJ do promotor, fonte e preço.
+    Sem --format, imprime os eventos encontrados em JSONL (um por linha) na saída padrão.
+    """
+    if not os.path.exists(EVENT_STORE_PATH):
+        logger.error(f"ERRO: Base de eventos '{EVENT_STORE_PATH}' não encontrada. Rode antes o estágio export.")
+        return
+    store = EventStore(EVENT_STORE_PATH)
+    records = lambda: store.query(
+        start=args.date_from, end=args.date_to, venue=args.venue, promotor_cnpj=args.promotor_cnpj,
+        fonte=args.fonte, min_price=args.min_price, max_price=args.max_price, limit=args.limit,
+    )
+    if args.formats:
+        from src.services.excel_generator import ExcelGenerator
+
+        excel_generator = ExcelGenerator(output_dir=args.output_dir)
+        for export_format in args.formats:
+            excel_generator.export(records(), export_format, filename=f"eventos_consulta.{export_format}")
+    else:
+        for record in records():
+            print(json.dumps(record, ensure_ascii=False))
+    store.close()
+
+def create_job_queue() -> JobQueue:
+    return JobQueue(JOB_QUEUE_PATH, lease_seconds=JOB_LEASE_SECONDS, max_attempts=JOB_MAX_ATTEMPTS)
+
+def run_enqueue(urls: Optional[List[str]] = None, append: bool = False) -> None:
+    """Estágio `enqueue`: cria uma tarefa `scrape_url` por URL (por padrão, descartando a execução anterior)."""
+    queue = create_job_queue()
+    if not append:
+        queue.clear()
+    added = sum(queue.enqueue(SCRAPE_URL, {"url": url}, key=url) for url in urls or TARGET_URLS)
+    logger.info(f"{added} tarefas de raspagem adicionadas à fila '{JOB_QUEUE_PATH}'.")
+    queue.close()
+
+async def keep_leases(queue: JobQueue, jobs: List[Job], worker_id: str) -> None:
+    """Renova periodicamente a reserva das tarefas em andamento, para que não sejam retomadas por outro worker."""
+    while True:
+        await asyncio.sleep(queue.lease_seconds / 3)
+        await asyncio.to_thread(queue.extend_lease, [job.id for job in jobs], worker_id)
+
+async def run_scrape_job(queue: JobQueue, job: Job, worker_id: str, page_cache: Optional["PageCache"],
+                         browser_pool: Optional["BrowserPool"]) -> None:
+    """Raspa a URL de uma tarefa `scrape_url`; cada evento extraído vira uma tarefa `enrich_event`."""
+    url = job.payload["url"]
+    sink = JobQueueSink(queue)
+    await main_scraper_loop(url, sink, page_cache, browser_pool)
+    # main_scraper_loop registra os erros e só conclui a URL quando todos os eventos foram entregues.
+    if url in sink.finished_urls:
+        queue.complete(job, worker_id, {"events": sink.submitted})
+    else:
+        queue.fail(job, worker_id, f"Falha ao raspar {url} (ver o log do worker).")
+
+async def run_enrich_jobs(queue: JobQueue, jobs: List[Job], worker_id: str, enricher: "GeminiEnricher") -> None:
+    """Enriquece um lote de tarefas `enrich_event` em uma única requisição ao Gemini."""
+    batch, events = [], []
+    validated, failures = validate_events([job.payload.get("event") for job in jobs])
+    for failure in failures:
+        queue.fail(jobs[failure.index], worker_id, f"Evento inválido: {failure.message}")
+    for job, event in zip(jobs, validated):
+        if event is not None:
+            events.append(event)
+            batch.append(job)
+    if not batch:
+        return
+    try:
+        enriched_events, enrich_failures = await enricher.enrich_events(events)
+    except Exception as e:
+        logger.error(f"Erro ao enriquecer lote de {len(batch)} eventos: {e}", exc_info=True)
+        for job in batch:
+            queue.fail(job, worker_id, str(e))
+        return
+    # Eventos cuja chamada ao Gemini falhou voltam para a fila, em vez de concluídos sem enriquecimento.
+    for index, (job, enriched_event) in enumerate(zip(batch, enriched_events)):
+        if index in enrich_failures:
+            queue.fail(job, worker_id, enrich_failures[index])
+        else:
+            queue.complete(job, worker_id, enriched_event.model_dump(mode='json', exclude_none=True))
+
+async def run_worker(output_dir: str = "output", job_types: Optional[List[str]] = None, concurrency: int = ENRICHMENT_WORKERS,
+                     exit_when_drained: bool = True) -> None:
+    """
+    Estágio `worker`: consome a fila de tarefas com `concurrency` tarefas simultâneas neste processo.
+    Vários processos do mesmo host podem rodar ao mesmo tempo sobre a mesma fila.
+
+    Args:
+        output_dir (str): Diretório das métricas do worker.
+        job_types (Optional[List[str]]): Tipos de tarefa aceitos. Padrão: raspagem e enriquecimento.
+        concurrency (int): Tarefas processadas ao mesmo tempo neste processo.
+        exit_when_drained (bool): Encerra quando não houver tarefas pendentes nem em andamento na fila.
+    """
+    job_types = job_types or list(JOB_TYPES)
+    worker_id = make_worker_id()
+    metrics = setup_metrics(output_dir, f"worker_{os.getpid()}")
+    setup_rate_limiters()
+    queue = create_job_queue()
+    enricher, enrichment_cache = create_enricher() if ENRICH_EVENT in job_types else (None, None)
+    page_cache = create_page_cache() if SCRAPE_URL in job_types else None
+
+    browser_pool = None
+    if SCRAPE_URL in job_types and BROWSER_POOL_SIZE > 0:
+        from src.services.browser_pool import BrowserPool
+
+        browser_pool = BrowserPool(
+            size=min(BROWSER_POOL_SIZE, concurrency),
+            headless=graph_config["headless"],
+            navigation_timeout=BROWSER_NAVIGATION_TIMEOUT,
+            wait_until=BROWSER_WAIT_UNTIL,
+        )
+        await browser_pool.start()
+
+    processed = {SCRAPE_URL: 0, ENRICH_EVENT: 0}
+
+    async def slot() -> None:
+        while True:
+            jobs: List[Job] = []
+            # A raspagem tem prioridade: ela é que gera as tarefas de enriquecimento.
+            if SCRAPE_URL in job_types:
+                jobs = await asyncio.to_thread(queue.lease, worker_id, SCRAPE_URL, 1)
+            if not jobs and ENRICH_EVENT in job_types:
+                jobs = await asyncio.to_thread(queue.lease, worker_id, ENRICH_EVENT, ENRICHMENT_BATCH_SIZE)
+            if not jobs:
+                if exit_when_drained and await asyncio.to_thread(queue.is_drained):
+                    return
+                await asyncio.sleep(JOB_POLL_INTERVAL)
+                continue
+            keeper = asyncio.create_task(keep_leases(queue, jobs, worker_id))
+            try:
+                if jobs[0].type == SCRAPE_URL:
+                    await run_scrape_job(queue, jobs[0], worker_id, page_cache, browser_pool)
+                else:
+                    await run_enrich_jobs(queue, jobs, worker_id, enricher)
+            finally:
+                keeper.cancel()
+            processed[jobs[0].type] += len(jobs)
+
+    logger.info(f"Worker {worker_id} iniciado ({concurrency} tarefas simultâneas, tipos: {', '.join(job_types)}).")
+    try:
+        await asyncio.gather(*(slot() for _ in range(concurrency)))
+    finally:
+        if browser_pool is not None:
+            await browser_pool.close()
+        queue.close()
+
+    logger.info(
+        f"Worker {worker_id} encerrado: {processed[SCRAPE_URL]} URLs e {processed[ENRICH_EVENT]} eventos processados."
+    )
+    if enricher is not None:
+        log_enrichment_stats(metrics, enricher, enrichment_cache, None)
+    log_rate_limiter_stats(metrics, ("openai", "gemini", "brasilapi"))
+    finish_metrics(metrics, output_dir, f"worker_{os.getpid()}")
+
+def _worker_process(output_dir: str, job_types: Optional[List[str]], concurrency: int, exit_when_drained: bool) -> None:
+    asyncio.run(run_worker(output_dir, job_types, concurrency, exit_when_drained))
+
+def run_workers(processes: int, output_dir: str = "output", job_types: Optional[List[str]] = None,
+                concurrency: int = ENRICHMENT_WORKERS, exit_when_drained: bool = True) -> None:
+    """Inicia `processes` processos de worker neste host e aguarda todos terminarem."""
+    if processes <= 1:
+        _worker_process(output_dir, job_types, concurrency, exit_when_drained)
+        return
+    # "spawn": cada processo começa limpo (sem threads nem conexões SQLite herdadas do processo pai).
+    context = multiprocessing.get_context("spawn")
+    workers = [
+        context.Process(target=_worker_process, args=(output_dir, job_types, concurrency, exit_when_drained),
+                        name=f"worker-{i}")
+        for i in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    failed = [worker.name for worker in workers if worker.exitcode != 0]
+    if failed:
+        logger.error(f"ERRO: Workers encerrados com erro: {', '.join(failed)}. Suas tarefas serão retomadas após a reserva expirar.")
+
+async def run_collect(output_dir: str = "output", wait: bool = False) -> None:
+    """
+    Estágio `collect`: monta o JSONL final a partir das tarefas `enrich_event` da fila e exporta.
+    Eventos cujo enriquecimento falhou em todas as tentativas entram como foram raspados; com a
+    deduplicação ativa, as duplicatas entre fontes são unidas aqui.
+    """
+    metrics = setup_metrics(output_dir, "collect")
+    queue = create_job_queue()
+    while not queue.is_drained():
+        if not wait:
+            logger.warning(f"AVISO: A fila ainda tem tarefas pendentes ou em andamento: {queue.counts()}. Montando a saída parcial.")
+            break
+        await asyncio.sleep(JOB_POLL_INTERVAL)
+
+    counts = queue.counts()
+    failed_urls = [job["payload"]["url"] for job in queue.iter_jobs(SCRAPE_URL, (FAILED,))]
+    if failed_urls:
+        logger.warning(f"AVISO: {len(failed_urls)} URLs não puderam ser raspadas: {failed_urls}")
+
+    deduplicator = create_deduplicator()
+    collected: List[Evento] = []
+    results = (job["result"] if job["status"] == DONE else job["payload"]["event"]
+               for job in queue.iter_jobs(ENRICH_EVENT, (DONE, FAILED)))
+    for event_pydantic in iter_validated_events(results, "tarefas de enriquecimento"):
+        if deduplicator is None or deduplicator.add(event_pydantic)[1]:
+            collected.append(event_pydantic)
+    queue.close()
+
+    output_jsonl_filepath = os.path.join(output_dir, "all_enriched_events.jsonl")
+    if os.path.exists(output_jsonl_filepath):
+        os.remove(output_jsonl_filepath)
+    writer = JsonlEventWriter(output_jsonl_filepath)
+    for event_pydantic in collected:
+        writer.write(event_pydantic)
+    writer.close()
+
+    logger.info(
+        f"Coleta concluída: {writer.count} eventos ({counts[ENRICH_EVENT].get(FAILED, 0)} sem enriquecimento "
+        f"após {JOB_MAX_ATTEMPTS} tentativas) gravados em '{output_jsonl_filepath}'."
+    )
+    if deduplicator is not None:
+        log_dedup_stats(metrics, deduplicator)
+    export_events(output_jsonl_filepath, output_dir)
+    finish_metrics(metrics, output_dir, "collect")
+
+async def main(output_dir: str = "output", urls: Optional[List[str]] = None):
+    """Estágio `all`: raspa, enriquece (em paralelo, pela fila do pipeline) e exporta."""
     logger.info("Iniciando o processo principal de raspagem e enriquecimento.")
     
-    enricher = GeminiEnricher(gemini_api_key=gemini_api_key)
-    all_extracted_events = []
-    
-    output_dir = "output"
-    os.makedirs(output_dir, exist_ok=True)
+    metrics = setup_metrics(output_dir, "all")
+    setup_rate_limiters()
+    enricher, enrichment_cache = create_enricher()
+    page_cache = create_page_cache()
+    deduplicator = create_deduplicator()
+
+    # Os eventos enriquecidos são gravados um a um no JSONL; o checkpoint permite retomar uma execução interrompida.
+    output_jsonl_filepath = os.path.join(output_dir, "all_enriched_events.jsonl")
+    writer, checkpoint = open_event_output(output_jsonl_filepath, os.path.join(output_dir, "checkpoint.jsonl"))
+    pending_urls = [url for url in urls or TARGET_URLS if not checkpoint.is_url_done(url)]
 
-    for url in TARGET_URLS:
-        await main_scraper_loop(url, all_extracted_events, enricher)
+    async with create_enrichment_pipeline(enricher, writer, checkpoint, deduplicator) as pipeline:
+        await scrape_urls(pending_urls, pipeline, page_cache)
+    writer.close()
+    checkpoint.mark_completed()
+    checkpoint.close()
 
     print("\n--- Raspagem e Enriquecimento de todas as URLs concluída! ---")
-    print(f"Total final de eventos coletados e enriquecidos: {len(all_extracted_events)}")
+    print(f"Eventos enriquecidos nesta execução: {pipeline.processed}")
+    log_enrichment_stats(metrics, enricher, enrichment_cache, deduplicator)
+    log_rate_limiter_stats(metrics, ("openai", "gemini", "brasilapi"))
     
-    if all_extracted_events:
-        final_output = [event.model_dump(mode='json', exclude_none=True) for event in all_extracted_events]
-        output_json_filepath = os.path.join(output_dir, "all_enriched_events.json")
-        with open(output_json_filepath, "w", encoding="utf-8") as f:
-            json.dump(final_output, f, ensure_ascii=False, indent=4)
-        logger.info(f"Todos os eventos enriquecidos salvos em '{output_json_filepath}'")
-        
-        excel_generator = ExcelGenerator(output_dir=output_dir)
-        excel_generator.generate_excel(final_output, filename="eventos_enriquecidos.xlsx")
-    else:
-        logger.warning("Nenhum evento foi extraído e enriquecido. Nenhum arquivo JSON/Excel será gerado.")
+    # O JSON final e o Excel são montados a partir do JSONL gravado durante a execução.
+    total_events = export_events(output_jsonl_filepath, output_dir)
+    print(f"Total final de eventos coletados e enriquecidos: {total_events}")
+
+    finish_metrics(metrics, output_dir, "all")
     
     logger.info("Processo principal concluído.")
 
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Raspagem e enriquecimento de eventos. Sem subcomando, executa o fluxo completo (all).",
+    )
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--output-dir", default="output", help="Diretório de saída (padrão: output).")
+    subparsers = parser.add_subparsers(dest="command", title="estágios")
+
+    scrape = subparsers.add_parser("scrape", parents=[common],
+                                   help="Raspa as URLs e grava os eventos brutos em JSONL (requer OPENAI_API_KEY).")
+    scrape.add_argument("--url", dest="urls", action="append", help="URL a raspar (pode ser repetido). Padrão: TARGET_URLS.")
+    scrape.add_argument("--output", help="JSONL de saída. Padrão: <output-dir>/raw_events.jsonl.")
+
+    enrich = subparsers.add_parser("enrich", parents=[common],
+                                   help="Enriquece os eventos brutos de um arquivo com o Gemini (requer GEMINI_API_KEY).")
+    enrich.add_argument("--input", help="Eventos brutos (.jsonl ou .json). Padrão: <output-dir>/raw_events.jsonl.")
+    enrich.add_argument("--output", help="JSONL de saída. Padrão: <output-dir>/all_enriched_events.jsonl.")
+
+    export = subparsers.add_parser("export", parents=[common],
+                                   help="Gera o JSON e as planilhas a partir de eventos enriquecidos (sem chaves de API).")
+    export.add_argument("--input", help="Eventos enriquecidos (.jsonl ou .json). Padrão: <output-dir>/all_enriched_events.jsonl.")
+    export.add_argument("--format", dest="formats", action="append",
+                        help="Formato de saída: xlsx, csv ou parquet (pode ser repetido). Padrão: EXPORT_FORMATS.")
+    export.add_argument("--explode-ingressos", action="store_true", default=EXPORT_EXPLODE_INGRESSOS,
+                        help="Gera uma linha por ingresso.")
+    export.add_argument("--changed-only", action="store_true", default=EXPORT_ONLY_CHANGES,
+                        help="Planilhas só com os eventos novos ou alterados desde a exportação anterior.")
+
+    query = subparsers.add_parser("query", parents=[common],
+                                  help="Consulta a base de eventos (datas, local, promotor, fonte, preço).")
+    query.add_argument("--from", dest="date_from", type=datetime.date.fromisoformat, help="Data inicial (AAAA-MM-DD).")
+    query.add_argument("--to", dest="date_to", type=datetime.date.fromisoformat, help="Data final (AAAA-MM-DD).")
+    query.add_argument("--venue", help="Nome ou CNPJ do local.")
+    query.add_argument("--promotor-cnpj", help="CNPJ do promotor.")
+    query.add_argument("--fonte", help="Fonte de divulgação (ex.: Guiadasemana).")
+    query.add_argument("--min-price", type=float, help="Eventos com algum ingresso a partir deste valor (R$).")
+    query.add_argument("--max-price", type=float, help="Eventos com algum ingresso até este valor (R$).")
+    query.add_argument("--limit", type=int, help="Quantidade máxima de eventos.")
+    query.add_argument("--format", dest="formats", action="append",
+                       help="Exporta o resultado (xlsx, csv ou parquet) em vez de imprimir JSONL.")
+
+    enqueue = subparsers.add_parser("enqueue", help="Cria na fila de tarefas uma tarefa de raspagem por URL.")
+    enqueue.add_argument("--url", dest="urls", action="append", help="URL a raspar (pode ser repetido). Padrão: TARGET_URLS.")
+    enqueue.add_argument("--append", action="store_true", help="Mantém as tarefas existentes em vez de começar uma nova execução.")
+
+    worker = subparsers.add_parser("worker", parents=[common],
+                                   help="Processa as tarefas da fila (raspagem requer OPENAI_API_KEY; enriquecimento, GEMINI_API_KEY).")
+    worker.add_argument("--processes", type=int, default=1, help="Processos de worker iniciados neste host (padrão: 1).")
+    worker.add_argument("--concurrency", type=int, default=ENRICHMENT_WORKERS,
+                        help="Tarefas simultâneas por processo (padrão: ENRICHMENT_WORKERS).")
+    worker.add_argument("--job-type", dest="job_types", action="append", choices=JOB_TYPES,
+                        help="Tipo de tarefa aceito (pode ser repetido). Padrão: todos.")
+    worker.add_argument("--keep-running", action="store_true",
+                        help="Continua aguardando novas tarefas quando a fila esvazia.")
+
+    collect = subparsers.add_parser("collect", parents=[common],
+                                    help="Monta a saída final a partir da fila de tarefas e exporta.")
+    collect.add_argument("--wait", action="store_true", help="Aguarda a fila esvaziar antes de montar a saída.")
+
+    run_all = subparsers.add_parser("all", parents=[common],
+                                    help="Raspa, enriquece e exporta (requer OPENAI_API_KEY e GEMINI_API_KEY).")
+    run_all.add_argument("--url", dest="urls", action="append", help="URL a raspar (pode ser repetido). Padrão: TARGET_URLS.")
+    return parser
+
+def cli(argv: Optional[List[str]] = None) -> None:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command is None:
+        args = parser.parse_args(["all"])
+    # O worker só exige as chaves dos tipos de tarefa que aceita.
+    stages = [args.command]
+    if args.command == "worker":
+        job_types = args.job_types or JOB_TYPES
+        stages = [stage for job_type, stage in ((SCRAPE_URL, "scrape"), (ENRICH_EVENT, "enrich")) if job_type in job_types]
+    try:
+        for stage in stages:
+            check_credentials(stage)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.command == "scrape":
+        asyncio.run(run_scrape(args.output_dir, args.urls, args.output))
+    elif args.command == "enrich":
+        asyncio.run(run_enrich(args.output_dir, args.input, args.output))
+    elif args.command == "export":
+        run_export(args.output_dir, args.input, args.formats, args.explode_ingressos, args.changed_only)
+    elif args.command == "query":
+        run_query(args)
+    elif args.command == "enqueue":
+        run_enqueue(args.urls, args.append)
+    elif args.command == "worker":
+        run_workers(args.processes, args.output_dir, args.job_types, args.concurrency, not args.keep_running)
+    elif args.command == "collect":
+        asyncio.run(run_collect(args.output_dir, args.wait))
+    else:
+        asyncio.run(main(args.output_dir, args.urls))
+
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    cli()
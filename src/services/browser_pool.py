@@ -0,0 +1,137 @@
+# src/services/browser_pool.py
+
+import asyncio
+import logging
+from typing import List, Optional, Sequence
+
+from playwright.async_api import Browser, BrowserContext, Playwright, Route, async_playwright
+
+logger = logging.getLogger(__name__)
+
+# Tipos de recurso que não influenciam o HTML renderizado e só custam banda e memória.
+DEFAULT_BLOCKED_RESOURCE_TYPES = ("image", "font", "media")
+
+# Converte links e imagens em URLs absolutas, já que o HTML é processado fora da página de origem.
+_ABSOLUTIZE_LINKS_JS = """
+() => {
+    for (const el of document.querySelectorAll('a[href]')) el.setAttribute('href', el.href);
+    for (const el of document.querySelectorAll('img[src]')) el.setAttribute('src', el.src);
+}
+"""
+
+
+class BrowserPool:
+    """
+    Pool de contextos de navegador (Playwright/Chromium) compartilhado por toda a execução.
+
+    Um único navegador headless é iniciado uma vez e mantém `size` contextos reaproveitados entre
+    as URLs, em vez de cada `SmartScraperGraph` abrir e fechar o próprio navegador. Imagens,
+    fontes e mídia são bloqueadas. O HTML renderizado é entregue ao passo de extração.
+    """
+    def __init__(self, size: int = 2, headless: bool = True, navigation_timeout: float = 30.0,
+                 wait_until: str = "networkidle", max_pages_per_context: int = 50,
+                 blocked_resource_types: Sequence[str] = DEFAULT_BLOCKED_RESOURCE_TYPES):
+        """
+        Inicializa o pool (o navegador só é iniciado em `start`).
+
+        Args:
+            size (int): Número de contextos de navegador (páginas renderizadas simultaneamente).
+            headless (bool): Se o navegador roda sem interface gráfica.
+            navigation_timeout (float): Timeout (em segundos) do carregamento de cada página.
+            wait_until (str): Evento do Playwright aguardado no carregamento ('load', 'domcontentloaded', 'networkidle').
+            max_pages_per_context (int): Após quantas páginas um contexto é recriado, para limitar o uso de memória.
+            blocked_resource_types (Sequence[str]): Tipos de recurso bloqueados nas páginas.
+        """
+        if size < 1:
+            raise ValueError("size deve ser maior ou igual a 1.")
+        self.size = size
+        self.headless = headless
+        self.navigation_timeout = navigation_timeout
+        self.wait_until = wait_until
+        self.max_pages_per_context = max_pages_per_context
+        self.blocked_resource_types = set(blocked_resource_types)
+        self.pages_fetched = 0
+        self._playwright: Optional[Playwright] = None
+        self._browser: Optional[Browser] = None
+        self._contexts: asyncio.Queue = asyncio.Queue()
+        self._all_contexts: List[BrowserContext] = []
+        self._pages_per_context = {}
+
+    async def __aenter__(self) -> "BrowserPool":
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    async def start(self) -> None:
+        """Inicia o navegador e cria os contextos do pool."""
+        if self._browser is not None:
+            return
+        self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(headless=self.headless)
+        for _ in range(self.size):
+            self._contexts.put_nowait(await self._new_context())
+        logger.info(f"BrowserPool iniciado com {self.size} contextos (bloqueando: {sorted(self.blocked_resource_types)}).")
+
+    async def _new_context(self) -> BrowserContext:
+        context = await self._browser.new_context()
+        context.set_default_navigation_timeout(self.navigation_timeout * 1000)
+        if self.blocked_resource_types:
+            await context.route("**/*", self._route)
+        self._all_contexts.append(context)
+        self._pages_per_context[id(context)] = 0
+        return context
+
+    async def _route(self, route: Route) -> None:
+        if route.request.resource_type in self.blocked_resource_types:
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _recycle(self, context: BrowserContext) -> BrowserContext:
+        self._all_contexts.remove(context)
+        self._pages_per_context.pop(id(context), None)
+        await context.close()
+        return await self._new_context()
+
+    async def fetch(self, url: str) -> str:
+        """
+        Renderiza uma URL em um dos contextos do pool e retorna o HTML resultante.
+        Aguarda um contexto livre se todos estiverem em uso.
+        """
+        if self._browser is None:
+            await self.start()
+        context = await self._contexts.get()
+        try:
+            page = await context.new_page()
+            try:
+                await page.goto(url, wait_until=self.wait_until)
+                await page.evaluate(_ABSOLUTIZE_LINKS_JS)
+                html = await page.content()
+            finally:
+                await page.close()
+            self.pages_fetched += 1
+            self._pages_per_context[id(context)] += 1
+            if self._pages_per_context[id(context)] >= self.max_pages_per_context:
+                context = await self._recycle(context)
+            return html
+        finally:
+            self._contexts.put_nowait(context)
+
+    async def close(self) -> None:
+        """Fecha todos os contextos, o navegador e o Playwright."""
+        for context in self._all_contexts:
+            try:
+                await context.close()
+            except Exception as e:
+                logger.warning(f"AVISO: Erro ao fechar contexto do navegador: {e}")
+        self._all_contexts = []
+        self._contexts = asyncio.Queue()
+        if self._browser is not None:
+            await self._browser.close()
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+        logger.info(f"BrowserPool encerrado após {self.pages_fetched} páginas renderizadas.")
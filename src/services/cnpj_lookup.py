@@ -0,0 +1,265 @@
+# src/services/cnpj_lookup.py
+
+import asyncio
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.services.metrics import get_metrics
+from src.services.rate_limiter import RetriesExhaustedError, get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+BRASIL_API_BASE_URL = os.getenv("BRASIL_API_BASE_URL", "https://brasilapi.com.br")
+
+_NON_DIGIT_PATTERN = re.compile(r'\D')
+
+# Marcador interno para "CNPJ inexistente" (HTTP 404), que é cacheado como resultado negativo.
+_NOT_FOUND = object()
+
+
+def clean_cnpj(cnpj: Any) -> Optional[str]:
+    """
+    Remove caracteres não numéricos de um CNPJ.
+
+    Returns:
+        Optional[str]: O CNPJ com 14 dígitos, ou None se o valor não for um CNPJ com tamanho válido.
+    """
+    if not cnpj or not isinstance(cnpj, str):
+        logger.warning(f"AVISO: CNPJ fornecido não é uma string ou está vazio: '{cnpj}'")
+        return None
+    cnpj_clean = _NON_DIGIT_PATTERN.sub('', cnpj)
+    if len(cnpj_clean) != 14:
+        logger.warning(f"AVISO: CNPJ com tamanho incorreto após limpeza: '{cnpj_clean}' (original: '{cnpj}')")
+        return None
+    return cnpj_clean
+
+
+class CNPJCache:
+    """
+    Cache persistente (SQLite) das respostas da Brasil API, indexado pelo CNPJ limpo de 14 dígitos.
+
+    Respostas positivas expiram após `ttl_seconds`; CNPJs inexistentes (404) são guardados
+    como resultado negativo e expiram após `negative_ttl_seconds`.
+    """
+    def __init__(self, db_path: str = "cache/cnpj_cache.sqlite3",
+                 ttl_seconds: float = 30 * 24 * 3600, negative_ttl_seconds: float = 24 * 3600):
+        """
+        Inicializa o cache, criando o arquivo e a tabela se necessário.
+
+        Args:
+            db_path (str): Caminho do arquivo SQLite. Use ":memory:" para um cache apenas em memória.
+            ttl_seconds (float): Validade de uma resposta encontrada.
+            negative_ttl_seconds (float): Validade de um resultado "não encontrado" (404).
+        """
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cnpj_cache ("
+                " cnpj TEXT PRIMARY KEY,"
+                " data TEXT,"
+                " fetched_at REAL NOT NULL)"
+            )
+
+    def get(self, cnpj: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """
+        Busca um CNPJ no cache.
+
+        Returns:
+            Tuple[bool, Optional[Dict[str, Any]]]: (encontrado_no_cache, dados). Um acerto com
+            dados None indica um resultado negativo (CNPJ inexistente) ainda válido.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, fetched_at FROM cnpj_cache WHERE cnpj = ?", (cnpj,)
+            ).fetchone()
+        if row is None:
+            return False, None
+        data, fetched_at = row
+        ttl = self.ttl_seconds if data is not None else self.negative_ttl_seconds
+        if time.time() - fetched_at > ttl:
+            return False, None
+        return True, json.loads(data) if data is not None else None
+
+    def set(self, cnpj: str, data: Optional[Dict[str, Any]]) -> None:
+        """Grava a resposta de um CNPJ. `data=None` registra um resultado negativo."""
+        payload = json.dumps(data, ensure_ascii=False) if data is not None else None
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cnpj_cache (cnpj, data, fetched_at) VALUES (?, ?, ?)",
+                (cnpj, payload, time.time()),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CNPJLookupService:
+    """
+    Consulta de CNPJs na Brasil API com cache persistente, pool de conexões HTTP
+    e agrupamento de requisições simultâneas para o mesmo CNPJ.
+    """
+    def __init__(self, cache: Optional[CNPJCache] = None, base_url: str = BRASIL_API_BASE_URL,
+                 timeout: float = 10, pool_size: int = 10):
+        """
+        Inicializa o serviço.
+
+        Args:
+            cache (Optional[CNPJCache]): Cache a ser usado. Se None, as consultas não são cacheadas.
+            base_url (str): URL base da Brasil API.
+            timeout (float): Timeout (em segundos) de cada requisição HTTP.
+            pool_size (int): Número de conexões mantidas abertas no pool HTTP.
+        """
+        self.cache = cache
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    def _request(self, cnpj_clean: str) -> Any:
+        """Faz a requisição HTTP. Retorna os dados ou `_NOT_FOUND` (404); outros erros são propagados."""
+        url = f"{self.base_url}/api/cnpj/v1/{cnpj_clean}"
+        metrics = get_metrics()
+        started = time.perf_counter()
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+        except requests.exceptions.RequestException:
+            metrics.observe("brasilapi_request_duration_seconds", time.perf_counter() - started)
+            metrics.increment("brasilapi_requests_total", status="error")
+            raise
+        metrics.observe("brasilapi_request_duration_seconds", time.perf_counter() - started)
+        metrics.increment("brasilapi_requests_total", status=response.status_code)
+        if response.status_code == 404:
+            logger.warning(f"AVISO: CNPJ {cnpj_clean} não encontrado na Brasil API.")
+            return _NOT_FOUND
+        response.raise_for_status()
+        data = response.json()
+        logger.info(f"DEBUG: Dados do CNPJ {cnpj_clean} obtidos com sucesso da Brasil API.")
+        return data
+
+    @staticmethod
+    def _log_fetch_error(cnpj_clean: str, e: Exception) -> None:
+        get_metrics().increment("brasilapi_errors_total", type=type(e).__name__)
+        if isinstance(e, requests.exceptions.HTTPError):
+            logger.error(f"ERRO HTTP ao consultar Brasil API para CNPJ {cnpj_clean}: {e}")
+        elif isinstance(e, requests.exceptions.RequestException):
+            logger.error(f"ERRO de Conexão ao consultar Brasil API para CNPJ {cnpj_clean}: {e}")
+        elif isinstance(e, ValueError):
+            logger.error(f"ERRO ao decodificar JSON da Brasil API para CNPJ {cnpj_clean}: {e}")
+        else:
+            logger.error(f"ERRO ao consultar Brasil API para CNPJ {cnpj_clean}: {e}")
+
+    def _fetch(self, cnpj_clean: str) -> Any:
+        """Consulta síncrona, sem novas tentativas. Retorna os dados, `_NOT_FOUND` ou None em caso de erro."""
+        try:
+            return self._request(cnpj_clean)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            self._log_fetch_error(cnpj_clean, e)
+            return None
+
+    async def _fetch_async(self, cnpj_clean: str) -> Any:
+        """
+        Consulta assíncrona pelo limitador compartilhado da Brasil API: respeita o limite de taxa e
+        repete a requisição (com backoff) em caso de 429 ou erro 5xx.
+        """
+        try:
+            return await get_rate_limiter("brasilapi").call(asyncio.to_thread, self._request, cnpj_clean)
+        except (requests.exceptions.RequestException, ValueError, RetriesExhaustedError) as e:
+            self._log_fetch_error(cnpj_clean, e)
+            return None
+
+    def _store(self, cnpj_clean: str, result: Any) -> Optional[Dict[str, Any]]:
+        # Erros transitórios (None) não são cacheados para que a próxima consulta tente de novo.
+        if result is _NOT_FOUND:
+            if self.cache:
+                self.cache.set(cnpj_clean, None)
+            return None
+        if result is not None and self.cache:
+            self.cache.set(cnpj_clean, result)
+        return result
+
+    def _cached(self, cnpj_clean: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        if not self.cache:
+            return False, None
+        hit, data = self.cache.get(cnpj_clean)
+        get_metrics().increment("cnpj_cache_requests_total", result="hit" if hit else "miss")
+        return hit, data
+
+    def lookup(self, cnpj: str) -> Optional[Dict[str, Any]]:
+        """Consulta um CNPJ de forma síncrona, usando o cache quando possível."""
+        cnpj_clean = clean_cnpj(cnpj)
+        if not cnpj_clean:
+            return None
+        hit, data = self._cached(cnpj_clean)
+        if hit:
+            return data
+        return self._store(cnpj_clean, self._fetch(cnpj_clean))
+
+    async def lookup_async(self, cnpj: str) -> Optional[Dict[str, Any]]:
+        """
+        Consulta um CNPJ sem bloquear o event loop. Consultas simultâneas ao mesmo CNPJ
+        compartilham uma única requisição HTTP.
+        """
+        cnpj_clean = clean_cnpj(cnpj)
+        if not cnpj_clean:
+            return None
+        hit, data = self._cached(cnpj_clean)
+        if hit:
+            return data
+
+        in_flight = self._in_flight.get(cnpj_clean)
+        if in_flight is not None:
+            get_metrics().increment("cnpj_lookups_coalesced_total")
+            return await asyncio.shield(in_flight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[cnpj_clean] = future
+        try:
+            result = self._store(cnpj_clean, await self._fetch_async(cnpj_clean))
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Evita o aviso de "exception never retrieved" quando ninguém mais aguardava.
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[cnpj_clean]
+
+
+_default_service: Optional[CNPJLookupService] = None
+
+
+def get_cnpj_service() -> CNPJLookupService:
+    """Retorna o serviço de consulta de CNPJ padrão, criando-o com cache em disco se necessário."""
+    global _default_service
+    if _default_service is None:
+        _default_service = CNPJLookupService(cache=CNPJCache())
+    return _default_service
+
+
+def configure_cnpj_service(service: CNPJLookupService) -> None:
+    """Substitui o serviço de consulta de CNPJ padrão (ex.: para usar outro cache ou TTL)."""
+    global _default_service
+    _default_service = service
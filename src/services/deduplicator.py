@@ -0,0 +1,155 @@
+# src/services/deduplicator.py
+
+import logging
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from src.models.Evento import Evento
+from src.services.normalization import normalize_text, parse_event_dates
+
+logger = logging.getLogger(__name__)
+
+# Palavras que não ajudam a distinguir eventos ou locais ("show", "ao vivo", artigos, cidade...).
+_STOPWORDS = {
+    "a", "o", "as", "os", "de", "da", "do", "das", "dos", "e", "em", "no", "na", "com", "para",
+    "show", "shows", "ao", "vivo", "turne", "tour", "apresenta", "sao", "paulo", "sp",
+}
+
+
+def _tokens(text: Optional[str]) -> List[str]:
+    return [token for token in normalize_text(text).split() if token not in _STOPWORDS]
+
+
+def _similarity(a: List[str], b: List[str]) -> float:
+    """
+    Similaridade entre dois textos já tokenizados: a maior entre a de sequência e a de conjuntos
+    (Jaccard). A sobreposição é medida contra a união das palavras, de modo que um nome curto
+    contido em outro mais longo ("Rock" x "Rock in Rio") não conta como o mesmo nome. Textos com
+    números diferentes nunca são similares.
+    """
+    if not a or not b:
+        return 0.0
+    set_a, set_b = set(a), set(b)
+    # Números diferentes ("Casa 1" x "Casa 2", "Parte 1" x "Parte 2") indicam coisas diferentes,
+    # por mais parecido que seja o resto do texto.
+    numbers_a = {token for token in set_a if token.isdigit()}
+    numbers_b = {token for token in set_b if token.isdigit()}
+    if numbers_a and numbers_b and numbers_a != numbers_b:
+        return 0.0
+    sequence_ratio = SequenceMatcher(None, " ".join(a), " ".join(b)).ratio()
+    jaccard = len(set_a & set_b) / len(set_a | set_b)
+    return max(sequence_ratio, jaccard)
+
+
+class _IndexedEvent:
+    """Evento canônico no índice, com as chaves normalizadas pré-calculadas."""
+    __slots__ = ("event", "name_tokens", "venue_tokens", "venue_cnpj")
+
+    def __init__(self, event: Evento):
+        self.event = event
+        self.name_tokens = _tokens(event.nome_do_evento)
+        venue = event.local_do_evento
+        self.venue_tokens = _tokens(venue.nome) if venue else []
+        self.venue_cnpj = venue.cnpj if venue and venue.cnpj else None
+
+
+def _merge_models(target: BaseModel, source: BaseModel) -> None:
+    """Preenche no `target` os campos vazios com os valores do `source` (recursivo para submodelos)."""
+    for field_name in type(target).model_fields:
+        target_value = getattr(target, field_name)
+        source_value = getattr(source, field_name)
+        if source_value is None or source_value == []:
+            continue
+        if target_value is None or target_value == [] or target_value == "":
+            setattr(target, field_name, source_value)
+        elif isinstance(target_value, BaseModel) and isinstance(source_value, BaseModel):
+            _merge_models(target_value, source_value)
+        elif isinstance(target_value, list):
+            target_value.extend(item for item in source_value if item not in target_value)
+
+
+def merge_events(canonical: Evento, duplicate: Evento) -> None:
+    """
+    Incorpora ao evento canônico (no lugar) as informações de uma duplicata: campos vazios são
+    preenchidos, listas (intérpretes, ingressos, flyers) são unidas e as fontes são concatenadas.
+    """
+    canonical_source = canonical.fonte_de_divulgacao
+    _merge_models(canonical, duplicate)
+    sources = [s for s in (canonical_source, duplicate.fonte_de_divulgacao) if s]
+    sources = list(dict.fromkeys(part.strip() for s in sources for part in s.split(",")))
+    canonical.fonte_de_divulgacao = ", ".join(sources) if sources else None
+
+
+class EventDeduplicator:
+    """
+    Índice de deduplicação de eventos entre fontes, aplicado antes do enriquecimento.
+
+    Os eventos são agrupados em blocos pela data de início (extraída de `datas_do_evento`) e,
+    dentro de cada bloco, comparados por similaridade aproximada do nome e concordância do local
+    (mesmo CNPJ ou nomes similares). Eventos sem data reconhecida ou sem local nunca são unidos:
+    sem essas informações não há como distinguir eventos diferentes de nomes parecidos. Uma duplicata é incorporada ao evento canônico já indexado e
+    não segue para o enriquecimento, de modo que cada evento é enriquecido uma única vez.
+    """
+    def __init__(self, name_threshold: float = 0.85, venue_threshold: float = 0.85):
+        """
+        Inicializa o índice.
+
+        Args:
+            name_threshold (float): Similaridade mínima (0 a 1) entre os nomes dos eventos.
+            venue_threshold (float): Similaridade mínima (0 a 1) entre os nomes dos locais.
+        """
+        self.name_threshold = name_threshold
+        self.venue_threshold = venue_threshold
+        self._blocks: Dict[str, List[_IndexedEvent]] = defaultdict(list)
+        self.seen_by_source: Counter = Counter()
+        self.collapsed_by_source: Counter = Counter()
+
+    def add(self, event: Evento) -> Tuple[Evento, bool]:
+        """
+        Indexa um evento.
+
+        Returns:
+            Tuple[Evento, bool]: O evento canônico e se o evento é novo. Quando não é novo, suas
+                                 informações já foram incorporadas ao canônico retornado.
+        """
+        source = event.fonte_de_divulgacao or "Desconhecida"
+        self.seen_by_source[source] += 1
+
+        dates = parse_event_dates(event.datas_do_evento)
+        if not dates:
+            return event, True
+        block_key = dates[0].isoformat()
+        candidate = _IndexedEvent(event)
+        for indexed in self._blocks[block_key]:
+            if self._is_duplicate(candidate, indexed):
+                merge_events(indexed.event, event)
+                self.collapsed_by_source[source] += 1
+                logger.debug(f"Evento duplicado '{event.nome_do_evento}' ({source}) incorporado a '{indexed.event.nome_do_evento}'.")
+                return indexed.event, False
+
+        self._blocks[block_key].append(candidate)
+        return event, True
+
+    def _is_duplicate(self, candidate: _IndexedEvent, indexed: _IndexedEvent) -> bool:
+        if _similarity(candidate.name_tokens, indexed.name_tokens) < self.name_threshold:
+            return False
+        if candidate.venue_cnpj and indexed.venue_cnpj:
+            return candidate.venue_cnpj == indexed.venue_cnpj
+        if candidate.venue_tokens and indexed.venue_tokens:
+            return _similarity(candidate.venue_tokens, indexed.venue_tokens) >= self.venue_threshold
+        # Sem informação de local em um dos lados não há como confirmar que é o mesmo evento.
+        return False
+
+    def stats(self) -> Dict[str, object]:
+        """Retorna os totais de eventos recebidos, únicos e colapsados (geral e por fonte)."""
+        seen = sum(self.seen_by_source.values())
+        collapsed = sum(self.collapsed_by_source.values())
+        return {
+            "seen": seen,
+            "unique": seen - collapsed,
+            "collapsed": collapsed,
+            "collapsed_by_source": dict(self.collapsed_by_source),
+        }
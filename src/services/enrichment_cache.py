@@ -0,0 +1,143 @@
+# src/services/enrichment_cache.py
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from src.models.Evento import Evento
+
+logger = logging.getLogger(__name__)
+
+
+def event_fingerprint(event: Evento) -> str:
+    """
+    Retorna um hash estável (SHA-256) do conteúdo de um evento.
+
+    O evento é serializado de forma canônica (`model_dump(mode='json')` com chaves ordenadas
+    e sem espaços), de modo que dois eventos com os mesmos dados geram o mesmo hash.
+    """
+    canonical = json.dumps(
+        event.model_dump(mode='json'), sort_keys=True, separators=(',', ':'), ensure_ascii=False
+    )
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class EnrichmentCache:
+    """
+    Cache persistente (SQLite) de eventos enriquecidos, endereçado pelo conteúdo do evento bruto.
+
+    A chave combina o hash canônico do evento com o modelo e a versão do prompt usados no
+    enriquecimento, então alterar o prompt ou o modelo invalida naturalmente as entradas antigas.
+    Entradas mais antigas que `max_age_seconds` são descartadas e, acima de `max_entries`,
+    as menos acessadas recentemente são removidas.
+    """
+    def __init__(self, db_path: str = "cache/enrichment_cache.sqlite3",
+                 max_entries: int = 100_000, max_age_seconds: float = 30 * 24 * 3600):
+        """
+        Inicializa o cache, criando o arquivo e a tabela se necessário.
+
+        Args:
+            db_path (str): Caminho do arquivo SQLite. Use ":memory:" para um cache apenas em memória.
+            max_entries (int): Número máximo de eventos mantidos no cache.
+            max_age_seconds (float): Idade máxima de uma entrada desde que foi gravada.
+        """
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self._writes_since_eviction = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS enrichment_cache ("
+                " key TEXT PRIMARY KEY,"
+                " data TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_accessed REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_enrichment_cache_last_accessed"
+                " ON enrichment_cache (last_accessed)"
+            )
+        self.evict()
+
+    @staticmethod
+    def make_key(event: Evento, model_name: str, prompt_version: str) -> str:
+        """Monta a chave do cache para um evento bruto, um modelo e uma versão de prompt."""
+        return f"{model_name}:{prompt_version}:{event_fingerprint(event)}"
+
+    def get(self, key: str) -> Optional[Evento]:
+        """Retorna o evento enriquecido guardado para a chave, ou None (e conta um 'miss')."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, created_at FROM enrichment_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.max_age_seconds:
+                self.misses += 1
+                return None
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE enrichment_cache SET last_accessed = ? WHERE key = ?", (now, key)
+                )
+            self.hits += 1
+        return Evento.model_validate_json(row[0])
+
+    def set(self, key: str, event: Evento) -> None:
+        """Grava um evento enriquecido para a chave informada."""
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO enrichment_cache (key, data, created_at, last_accessed)"
+                    " VALUES (?, ?, ?, ?)",
+                    (key, event.model_dump_json(), now, now),
+                )
+            self._writes_since_eviction += 1
+            should_evict = self._writes_since_eviction >= 100
+        if should_evict:
+            self.evict()
+
+    def evict(self) -> int:
+        """
+        Aplica a política de expulsão (idade máxima e número máximo de entradas).
+
+        Returns:
+            int: Quantidade de entradas removidas.
+        """
+        with self._lock, self._conn:
+            removed = self._conn.execute(
+                "DELETE FROM enrichment_cache WHERE created_at < ?",
+                (time.time() - self.max_age_seconds,),
+            ).rowcount
+            removed += self._conn.execute(
+                "DELETE FROM enrichment_cache WHERE key IN ("
+                " SELECT key FROM enrichment_cache ORDER BY last_accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+            self._writes_since_eviction = 0
+        if removed:
+            logger.info(f"Cache de enriquecimento: {removed} entradas removidas pela política de expulsão.")
+        return removed
+
+    def stats(self) -> Dict[str, float]:
+        """Retorna os contadores de acertos e falhas do cache."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
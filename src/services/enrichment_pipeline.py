@@ -0,0 +1,227 @@
+# src/services/enrichment_pipeline.py
+
+import asyncio
+import logging
+import time
+from collections import Counter
+from typing import List, NamedTuple, Optional, Set
+
+from src.models.Evento import Evento
+from src.services.deduplicator import EventDeduplicator
+from src.services.enrichment_cache import event_fingerprint
+from src.services.event_stream import JsonlEventWriter, RunCheckpoint
+from src.services.gemini_enricher import GeminiEnricher
+from src.services.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+# Marcador enviado aos workers para sinalizar o fim da fila.
+_STOP = object()
+
+
+class _QueuedEvent(NamedTuple):
+    event: Evento
+    key: str
+    url: Optional[str]
+    submitted_at: float
+
+
+class EnrichmentPipeline:
+    """
+    Pipeline produtor/consumidor de enriquecimento.
+
+    A raspagem produz objetos `Evento` em uma fila limitada (`submit`) e N workers
+    consomem dessa fila chamando o `GeminiEnricher`. Assim, o enriquecimento dos
+    eventos de uma URL acontece enquanto outras URLs ainda estão sendo raspadas.
+    Quando a fila está cheia, `submit` aguarda, aplicando contrapressão à raspagem.
+
+    Com um `EventDeduplicator`, eventos duplicados entre fontes são incorporados ao evento já
+    recebido e não entram na fila. Se o evento canônico ainda estiver aguardando na fila, ele é
+    enriquecido já com as informações da duplicata.
+
+    Com um `JsonlEventWriter`, cada evento enriquecido é gravado no arquivo assim que fica pronto
+    (em vez de acumulado em `results`) e, com um `RunCheckpoint`, os eventos gravados e as URLs
+    concluídas são registrados para que uma execução interrompida possa ser retomada.
+    """
+    def __init__(self, enricher: GeminiEnricher, num_workers: int = 4, queue_size: int = 100,
+                 batch_size: int = 1, deduplicator: Optional[EventDeduplicator] = None,
+                 writer: Optional[JsonlEventWriter] = None, checkpoint: Optional[RunCheckpoint] = None):
+        """
+        Inicializa o pipeline.
+
+        Args:
+            enricher (GeminiEnricher): O serviço usado para enriquecer cada evento.
+            num_workers (int): Número de workers de enriquecimento simultâneos.
+            queue_size (int): Capacidade máxima da fila entre raspagem e enriquecimento.
+            batch_size (int): Número máximo de eventos enviados ao Gemini por requisição. Cada worker
+                              agrupa os eventos já disponíveis na fila, sem esperar o lote encher.
+            deduplicator (Optional[EventDeduplicator]): Índice de deduplicação aplicado antes da fila.
+            writer (Optional[JsonlEventWriter]): Destino dos eventos enriquecidos. Sem ele, os eventos
+                                                 ficam em memória em `results`.
+            checkpoint (Optional[RunCheckpoint]): Checkpoint para retomar uma execução interrompida.
+        """
+        if num_workers < 1:
+            raise ValueError("num_workers deve ser maior ou igual a 1.")
+        if batch_size < 1:
+            raise ValueError("batch_size deve ser maior ou igual a 1.")
+        self.enricher = enricher
+        self.num_workers = num_workers
+        self.batch_size = batch_size
+        self.deduplicator = deduplicator
+        self.writer = writer
+        self.checkpoint = checkpoint
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.results: List[Evento] = []
+        self.processed = 0
+        self.skipped = 0
+        self._pending_by_url: Counter = Counter()
+        self._finished_urls: Set[str] = set()
+        self._workers: List[asyncio.Task] = []
+
+    async def __aenter__(self) -> "EnrichmentPipeline":
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            await self.close()
+        else:
+            self._cancel_workers()
+
+    def start(self) -> None:
+        """Inicia os workers de enriquecimento."""
+        if self._workers:
+            return
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"enrichment-worker-{i}")
+            for i in range(self.num_workers)
+        ]
+        logger.info(f"Pipeline de enriquecimento iniciado com {self.num_workers} workers.")
+
+    async def submit(self, event: Evento, url: Optional[str] = None) -> None:
+        """
+        Coloca um evento raspado na fila de enriquecimento, aguardando se ela estiver cheia.
+
+        Args:
+            event (Evento): O evento bruto.
+            url (Optional[str]): A URL de origem, usada para marcar a URL como concluída no checkpoint.
+        """
+        # O hash é calculado antes da deduplicação, que pode alterar o evento canônico no lugar.
+        key = event_fingerprint(event)
+        if self.deduplicator is not None:
+            _, is_new = self.deduplicator.add(event)
+            if not is_new:
+                self._mark_event_done(key)
+                return
+        if self.checkpoint is not None and self.checkpoint.is_event_done(key):
+            # Já gravado em uma execução anterior interrompida.
+            self.skipped += 1
+            return
+        if url is not None:
+            self._pending_by_url[url] += 1
+        await self.queue.put(_QueuedEvent(event, key, url, time.perf_counter()))
+
+    def finish_url(self, url: str) -> None:
+        """
+        Informa que todos os eventos de uma URL já foram submetidos. A URL é marcada como concluída
+        no checkpoint assim que o último deles for gravado.
+        """
+        self._finished_urls.add(url)
+        self._maybe_mark_url_done(url)
+
+    async def close(self) -> List[Evento]:
+        """
+        Aguarda o processamento de todos os eventos enfileirados e encerra os workers.
+
+        Returns:
+            List[Evento]: Todos os eventos enriquecidos pelo pipeline.
+        """
+        for _ in self._workers:
+            await self.queue.put(_STOP)
+        await asyncio.gather(*self._workers)
+        self._workers = []
+        logger.info(
+            f"Pipeline de enriquecimento encerrado. {self.processed} eventos processados"
+            f" ({self.skipped} já gravados em execução anterior)."
+        )
+        return self.results
+
+    def _cancel_workers(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        self._workers = []
+
+    def _mark_event_done(self, key: str) -> None:
+        if self.checkpoint is not None:
+            self.checkpoint.mark_event_done(key)
+
+    def _maybe_mark_url_done(self, url: str) -> None:
+        if self.checkpoint is not None and url in self._finished_urls and self._pending_by_url[url] == 0:
+            self.checkpoint.mark_url_done(url)
+
+    def _emit(self, item: _QueuedEvent, enriched_event: Evento) -> None:
+        if self.writer is not None:
+            self.writer.write(enriched_event)
+        else:
+            self.results.append(enriched_event)
+        self.processed += 1
+        self._mark_event_done(item.key)
+        if item.url is not None:
+            self._pending_by_url[item.url] -= 1
+            self._maybe_mark_url_done(item.url)
+
+    async def _worker(self, worker_id: int) -> None:
+        stop_requested = False
+        while not stop_requested:
+            batch: List[_QueuedEvent] = []
+            item = await self.queue.get()
+            while True:
+                if item is _STOP:
+                    stop_requested = True
+                else:
+                    batch.append(item)
+                if stop_requested or len(batch) >= self.batch_size or self.queue.empty():
+                    break
+                item = self.queue.get_nowait()
+            try:
+                if batch:
+                    await self._process(batch)
+            finally:
+                for _ in range(len(batch) + stop_requested):
+                    self.queue.task_done()
+
+    async def _process(self, batch: List[_QueuedEvent]) -> None:
+        """
+        Enriquece um lote e grava os eventos. Registra um trecho por lote e um por evento, com o tempo
+        de espera na fila e a parte das chamadas e tokens do Gemini que coube ao evento.
+        """
+        metrics = get_metrics()
+        started = time.perf_counter()
+        with metrics.span("enrich_batch", events=len(batch)) as batch_span:
+            enriched_events = await self._enrich([queued.event for queued in batch])
+        for queued, enriched_event in zip(batch, enriched_events):
+            queue_wait = started - queued.submitted_at
+            metrics.observe("enrichment_queue_wait_seconds", queue_wait)
+            metrics.record_span(
+                "enrich_event",
+                batch_span.duration,
+                parent_id=batch_span.span_id,
+                url=queued.url,
+                event=queued.key[:16],
+                nome_do_evento=queued.event.nome_do_evento,
+                queue_wait=queue_wait,
+                gemini_calls=batch_span.attributes.get("gemini_calls", 0) / len(batch),
+                gemini_tokens=batch_span.attributes.get("gemini_tokens", 0) / len(batch),
+            )
+            self._emit(queued, enriched_event)
+
+    async def _enrich(self, batch: List[Evento]) -> List[Evento]:
+        try:
+            if len(batch) == 1:
+                return [await self.enricher.enrich_event_data(batch[0])]
+            return await self.enricher.enrich_events_batch(batch)
+        except Exception as e:
+            # Falhas do Gemini já são tratadas pelo enricher, evento a evento. Qualquer outro erro
+            # não deve derrubar o worker: mantém os eventos originais.
+            logger.error(f"Erro ao enriquecer lote de {len(batch)} eventos: {e}", exc_info=True)
+            return batch
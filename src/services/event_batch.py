@@ -0,0 +1,115 @@
+# src/services/event_batch.py
+
+import logging
+from dataclasses import dataclass
+from itertools import islice
+from typing import Annotated, Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from pydantic import TypeAdapter, ValidationError, ValidatorFunctionWrapHandler, WrapValidator
+
+from src.models.Evento import Evento
+
+logger = logging.getLogger(__name__)
+
+
+
+class _InvalidItem:
+    """Marca, no resultado da validação em lote, um item inválido e os erros dele."""
+    __slots__ = ("errors",)
+
+    def __init__(self, errors: List[Dict[str, Any]]):
+        self.errors = errors
+
+
+def _capture_errors(value: Any, handler: ValidatorFunctionWrapHandler) -> Any:
+    try:
+        return handler(value)
+    except ValidationError as e:
+        return _InvalidItem(e.errors(include_url=False))
+
+
+# Adaptadores criados uma única vez: montar o validador/serializador do schema a cada chamada é caro.
+EVENT_ADAPTER = TypeAdapter(Evento)
+EVENT_LIST_ADAPTER = TypeAdapter(List[Evento])
+# Valida a lista inteira em uma chamada, mas um item inválido vira um `_InvalidItem` em vez de
+# invalidar o lote (o que obrigaria a validar os demais de novo).
+_TOLERANT_LIST_ADAPTER = TypeAdapter(List[Annotated[Evento, WrapValidator(_capture_errors)]])
+
+
+@dataclass
+class ValidationFailure:
+    """Registro que não pôde ser convertido em `Evento`: sua posição no lote, o registro e os erros."""
+    index: int
+    record: Any
+    errors: List[Dict[str, Any]]
+
+    @property
+    def message(self) -> str:
+        return "; ".join(
+            f"{'.'.join(str(part) for part in error['loc']) or '(evento)'}: {error['msg']}" for error in self.errors
+        )
+
+
+def validate_events(records: Sequence[Any]) -> Tuple[List[Optional[Evento]], List[ValidationFailure]]:
+    """
+    Valida um lote de registros em uma única chamada ao validador do pydantic, criado uma única vez
+    (em vez de um `Evento(**registro)` por registro).
+
+    Cada registro é validado uma única vez: um registro inválido vira uma `ValidationFailure` sem
+    descartar o lote nem obrigar a validar de novo os demais registros.
+
+    Returns:
+        Tuple[List[Optional[Evento]], List[ValidationFailure]]: Os eventos, alinhados com os registros
+        (None na posição dos inválidos), e as falhas de validação.
+    """
+    records = list(records)
+    events: List[Optional[Evento]] = _TOLERANT_LIST_ADAPTER.validate_python(records)
+    failures: List[ValidationFailure] = []
+    for index, item in enumerate(events):
+        if isinstance(item, _InvalidItem):
+            failures.append(ValidationFailure(index, records[index], item.errors))
+            events[index] = None
+    return events, failures
+
+
+def _log_failure(failure: ValidationFailure, source: str) -> None:
+    logger.error(f"Erro ao converter evento {failure.index} de {source}: {failure.record}. Erro: {failure.message}")
+
+
+def iter_validated_events(records: Iterable[Any], source: str = "lote", batch_size: int = 1000,
+                          on_error: Optional[Callable[[ValidationFailure], None]] = None) -> Iterator[Evento]:
+    """
+    Valida registros em lotes de `batch_size` (ex.: lidos de um JSONL com `iter_jsonl`) e devolve os
+    eventos válidos à medida que cada lote fica pronto. Cada registro inválido é passado a `on_error`
+    (por padrão, registrado no log) com o índice do registro na sequência inteira.
+    """
+    iterator = iter(records)
+    offset = 0
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        events, failures = validate_events(batch)
+        for failure in failures:
+            failure.index += offset
+            if on_error is not None:
+                on_error(failure)
+            else:
+                _log_failure(failure, source)
+        yield from (event for event in events if event is not None)
+        offset += len(batch)
+
+
+def dump_event_json(event: Evento, indent: Optional[int] = None) -> bytes:
+    """Serializa um evento em JSON (UTF-8, sem campos nulos) pelo serializador do pydantic, sem `model_dump` intermediário."""
+    return EVENT_ADAPTER.dump_json(event, exclude_none=True, indent=indent)
+
+
+def dump_events_json(events: List[Evento], exclude_none: bool = True) -> bytes:
+    """Serializa uma lista de eventos em um array JSON (UTF-8) em uma única chamada ao serializador."""
+    return EVENT_LIST_ADAPTER.dump_json(events, exclude_none=exclude_none)
+
+
+def dump_events_jsonl(events: Iterable[Evento]) -> bytes:
+    """Serializa eventos no formato JSONL (um evento por linha)."""
+    return b"".join(dump_event_json(event) + b"\n" for event in events)
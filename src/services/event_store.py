@@ -0,0 +1,306 @@
+# src/services/event_store.py
+
+import datetime
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.models.Evento import Evento
+from src.services.enrichment_cache import event_fingerprint
+from src.services.event_batch import dump_event_json
+from src.services.normalization import normalize_text, parse_event_dates, parse_event_time, parse_prices
+
+logger = logging.getLogger(__name__)
+
+# Resultado de um upsert.
+NEW = "new"
+CHANGED = "changed"
+UNCHANGED = "unchanged"
+
+# Eventos gravados por transação em `upsert_many`.
+_UPSERT_BATCH_SIZE = 500
+
+
+def _digits(value: Optional[str]) -> Optional[str]:
+    digits = ''.join(filter(str.isdigit, value or ""))
+    return digits or None
+
+
+def event_sources(event: Evento) -> List[str]:
+    """Fontes de divulgação de um evento, normalizadas (eventos unidos entre fontes guardam "A, B")."""
+    sources = (normalize_text(part) for part in (event.fonte_de_divulgacao or "").split(","))
+    return list(dict.fromkeys(source for source in sources if source))
+
+
+def event_identity(event: Evento, dates: Optional[List[datetime.date]] = None) -> str:
+    """
+    Retorna a identidade estável de um evento: o mesmo evento raspado de novo (com preço, horário ou
+    flyers alterados) tem a mesma identidade. Combina o nome normalizado, a primeira data e o nome
+    normalizado do local. Só entram campos que vêm da raspagem: o CNPJ do local, preenchido pelo
+    enriquecimento, mudaria a identidade de um evento já gravado.
+    """
+    if dates is None:
+        dates = parse_event_dates(event.datas_do_evento)
+    venue = event.local_do_evento
+    parts = [
+        normalize_text(event.nome_do_evento),
+        dates[0].isoformat() if dates else normalize_text(event.datas_do_evento),
+        normalize_text(venue.nome) if venue else "",
+    ]
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+class EventStore:
+    """
+    Base persistente (SQLite) dos eventos enriquecidos, atualizada a cada execução.
+
+    Cada evento é gravado pela sua identidade estável (`event_identity`): um evento já conhecido é
+    atualizado, e só recebe um novo número de alteração (`change_seq`) se o conteúdo mudou. As
+    datas, o horário e os preços (texto livre no `Evento`) são interpretados e guardados em colunas
+    tipadas e indexadas, assim como o local e o CNPJ do promotor, para consultas rápidas sem ler
+    todos os eventos. As fontes de divulgação ficam em uma tabela à parte (uma linha por fonte),
+    para que eventos unidos entre fontes sejam encontrados por qualquer uma delas. Cursores de
+    exportação permitem gerar apenas os eventos novos ou alterados desde a última exportação.
+    """
+    def __init__(self, db_path: str = "cache/event_store.sqlite3"):
+        """
+        Inicializa a base.
+
+        Args:
+            db_path (str): Caminho do arquivo SQLite. Use ":memory:" para uma base apenas em memória.
+        """
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS events ("
+                " event_id TEXT PRIMARY KEY,"
+                " content_hash TEXT NOT NULL,"
+                " data TEXT NOT NULL,"
+                " nome TEXT,"
+                " data_inicio TEXT,"
+                " data_fim TEXT,"
+                " horario TEXT,"
+                " preco_min REAL,"
+                " preco_max REAL,"
+                " local_nome TEXT,"
+                " local_cnpj TEXT,"
+                " promotor_cnpj TEXT,"
+                " change_seq INTEGER NOT NULL,"
+                " first_seen REAL NOT NULL,"
+                " last_seen REAL NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            for column in ("data_inicio", "data_fim", "preco_min", "local_nome", "local_cnpj",
+                           "promotor_cnpj", "change_seq"):
+                self._conn.execute(f"CREATE INDEX IF NOT EXISTS events_{column} ON events ({column})")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS event_sources ("
+                " event_id TEXT NOT NULL,"
+                " fonte TEXT NOT NULL,"
+                " PRIMARY KEY (event_id, fonte))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS event_sources_fonte ON event_sources (fonte)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS export_cursors ("
+                " name TEXT PRIMARY KEY,"
+                " change_seq INTEGER NOT NULL,"
+                " exported_at REAL NOT NULL)"
+            )
+
+    def _set_sources(self, event_id: str, event: Evento) -> None:
+        self._conn.execute("DELETE FROM event_sources WHERE event_id = ?", (event_id,))
+        self._conn.executemany(
+            "INSERT INTO event_sources (event_id, fonte) VALUES (?, ?)",
+            [(event_id, source) for source in event_sources(event)],
+        )
+
+    @staticmethod
+    def _columns(event: Evento) -> Dict[str, Any]:
+        """Interpreta os campos de texto livre do evento nas colunas tipadas."""
+        dates = parse_event_dates(event.datas_do_evento)
+        event_time = parse_event_time(event.horario_do_evento)
+        prices = [price for ingresso in event.ingressos for price in parse_prices(ingresso.valor)]
+        venue = event.local_do_evento
+        return {
+            "event_id": event_identity(event, dates),
+            "content_hash": event_fingerprint(event),
+            "data": dump_event_json(event).decode("utf-8"),
+            "nome": event.nome_do_evento,
+            "data_inicio": dates[0].isoformat() if dates else None,
+            "data_fim": dates[-1].isoformat() if dates else None,
+            "horario": event_time.strftime("%H:%M") if event_time else None,
+            "preco_min": min(prices) if prices else None,
+            "preco_max": max(prices) if prices else None,
+            "local_nome": normalize_text(venue.nome) or None if venue else None,
+            "local_cnpj": _digits(venue.cnpj) if venue else None,
+            "promotor_cnpj": _digits(event.promotor.cnpj) if event.promotor else None,
+        }
+
+    def _upsert(self, event: Evento, now: float) -> str:
+        # Chamado com o lock e a transação já abertos.
+        columns = self._columns(event)
+        row = self._conn.execute(
+            "SELECT content_hash FROM events WHERE event_id = ?", (columns["event_id"],)
+        ).fetchone()
+        if row is not None and row[0] == columns["content_hash"]:
+            self._conn.execute("UPDATE events SET last_seen = ? WHERE event_id = ?", (now, columns["event_id"]))
+            return UNCHANGED
+        names = list(columns)
+        self._conn.execute(
+            f"INSERT INTO events ({', '.join(names)}, change_seq, first_seen, last_seen, updated_at)"
+            f" VALUES ({', '.join('?' for _ in names)}, (SELECT COALESCE(MAX(change_seq), 0) + 1 FROM events), ?, ?, ?)"
+            f" ON CONFLICT(event_id) DO UPDATE SET"
+            f" {', '.join(f'{name} = excluded.{name}' for name in names[1:])},"
+            f" change_seq = excluded.change_seq, last_seen = excluded.last_seen, updated_at = excluded.updated_at",
+            (*columns.values(), now, now, now),
+        )
+        self._set_sources(columns["event_id"], event)
+        return NEW if row is None else CHANGED
+
+    def upsert(self, event: Evento) -> str:
+        """
+        Grava um evento, inserindo-o ou atualizando o registro com a mesma identidade.
+
+        Returns:
+            str: "new", "changed" ou "unchanged".
+        """
+        with self._lock, self._conn:
+            return self._upsert(event, time.time())
+
+    def upsert_many(self, events: Iterable[Evento]) -> Dict[str, int]:
+        """
+        Grava vários eventos, em transações de até `_UPSERT_BATCH_SIZE` eventos.
+
+        Returns:
+            Dict[str, int]: Quantos eventos eram novos, foram alterados ou estavam inalterados.
+        """
+        counts = {NEW: 0, CHANGED: 0, UNCHANGED: 0}
+        batch: List[Evento] = []
+
+        def flush() -> None:
+            now = time.time()
+            with self._lock, self._conn:
+                for event in batch:
+                    counts[self._upsert(event, now)] += 1
+            batch.clear()
+
+        for event in events:
+            batch.append(event)
+            if len(batch) >= _UPSERT_BATCH_SIZE:
+                flush()
+        if batch:
+            flush()
+        return counts
+
+    def query(self, start: Optional[datetime.date] = None, end: Optional[datetime.date] = None,
+              venue: Optional[str] = None, promotor_cnpj: Optional[str] = None, fonte: Optional[str] = None,
+              min_price: Optional[float] = None, max_price: Optional[float] = None,
+              limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Consulta os eventos pelos campos indexados. Todos os filtros são opcionais e combinados com E.
+
+        Args:
+            start (Optional[datetime.date]): Eventos que acontecem a partir desta data (inclusive).
+            end (Optional[datetime.date]): Eventos que acontecem até esta data (inclusive).
+            venue (Optional[str]): Nome do local (sem diferenciar acentos e maiúsculas) ou CNPJ do local.
+            promotor_cnpj (Optional[str]): CNPJ do promotor (com ou sem pontuação).
+            fonte (Optional[str]): Fonte de divulgação (ex.: "Guiadasemana"), sem diferenciar acentos e
+                maiúsculas. Eventos unidos entre fontes são encontrados por qualquer uma delas.
+            min_price (Optional[float]): Eventos com algum ingresso a partir deste valor.
+            max_price (Optional[float]): Eventos com algum ingresso até este valor.
+            limit (Optional[int]): Quantidade máxima de eventos.
+
+        Returns:
+            Iterator[Dict[str, Any]]: Os eventos encontrados (como gravados no JSONL), por data.
+        """
+        conditions, params = [], []
+        # Eventos de várias datas (temporadas) entram se o período deles cruzar o intervalo pedido.
+        if start is not None:
+            conditions.append("data_fim >= ?")
+            params.append(start.isoformat())
+        if end is not None:
+            conditions.append("data_inicio <= ?")
+            params.append(end.isoformat())
+        if venue:
+            venue_cnpj = _digits(venue)
+            if venue_cnpj and len(venue_cnpj) == 14:
+                conditions.append("local_cnpj = ?")
+                params.append(venue_cnpj)
+            else:
+                conditions.append("local_nome = ?")
+                params.append(normalize_text(venue))
+        if promotor_cnpj:
+            conditions.append("promotor_cnpj = ?")
+            params.append(_digits(promotor_cnpj))
+        if fonte:
+            conditions.append("event_id IN (SELECT event_id FROM event_sources WHERE fonte = ?)")
+            params.append(normalize_text(fonte))
+        if min_price is not None:
+            conditions.append("preco_max >= ?")
+            params.append(min_price)
+        if max_price is not None:
+            conditions.append("preco_min <= ?")
+            params.append(max_price)
+        sql = "SELECT data FROM events"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY data_inicio, horario, nome"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        for (data,) in rows:
+            yield json.loads(data)
+
+    def last_change_seq(self) -> int:
+        """Número da alteração mais recente gravada na base."""
+        with self._lock:
+            row = self._conn.execute("SELECT COALESCE(MAX(change_seq), 0) FROM events").fetchone()
+        return row[0]
+
+    def get_cursor(self, name: str) -> int:
+        """Número da última alteração já exportada pelo cursor `name` (0 se nunca exportou)."""
+        with self._lock:
+            row = self._conn.execute("SELECT change_seq FROM export_cursors WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0
+
+    def set_cursor(self, name: str, change_seq: int) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO export_cursors (name, change_seq, exported_at) VALUES (?, ?, ?)",
+                (name, change_seq, time.time()),
+            )
+
+    def iter_changes(self, since: int, until: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Percorre os eventos novos ou alterados com `since < change_seq <= until`, em blocos."""
+        last = since
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT change_seq, data FROM events WHERE change_seq > ? AND change_seq <= ?"
+                    " ORDER BY change_seq LIMIT 1000",
+                    (last, until if until is not None else 2 ** 62),
+                ).fetchall()
+            if not rows:
+                return
+            for _, data in rows:
+                yield json.loads(data)
+            last = rows[-1][0]
+
+    def pending_changes(self, cursor: str) -> Tuple[int, int]:
+        """Retorna o intervalo (desde, até) de alterações ainda não exportadas pelo cursor."""
+        return self.get_cursor(cursor), self.last_change_seq()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,186 @@
+# src/services/event_stream.py
+
+import json
+import logging
+import os
+from typing import Any, Dict, Iterable, Iterator, Optional, Set
+
+from src.models.Evento import Evento
+from src.services.enrichment_cache import event_fingerprint
+from src.services.event_batch import dump_event_json
+
+logger = logging.getLogger(__name__)
+
+
+def _ensure_trailing_newline(path: str) -> None:
+    """Se a última linha do arquivo ficou incompleta (ex.: queda no meio da escrita), encerra-a."""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return
+    with open(path, "rb+") as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b"\n":
+            f.write(b"\n")
+
+
+def iter_jsonl(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Lê um arquivo JSONL registro a registro, sem carregá-lo inteiro em memória.
+    Linhas corrompidas (tipicamente a última, após uma interrupção) são ignoradas.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"AVISO: Linha {line_number} inválida ignorada em '{path}'.")
+
+
+def load_records(path: str) -> Iterable[dict]:
+    """Lê os eventos de um arquivo `.jsonl` (registro a registro) ou `.json` (array)."""
+    if path.endswith(".jsonl"):
+        return iter_jsonl(path)
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def jsonl_to_json_array(jsonl_path: str, json_path: str) -> int:
+    """
+    Converte um arquivo JSONL em um único array JSON (com `indent=4`), registro a registro.
+
+    Returns:
+        int: Quantidade de registros escritos.
+    """
+    count = 0
+    with open(json_path, "w", encoding="utf-8") as f:
+        f.write("[")
+        for record in iter_jsonl(jsonl_path):
+            f.write(",\n" if count else "\n")
+            f.write(json.dumps(record, ensure_ascii=False, indent=4))
+            count += 1
+        f.write("\n]" if count else "]")
+    return count
+
+
+class JsonlEventWriter:
+    """
+    Grava eventos enriquecidos em um arquivo JSONL (um evento por linha) à medida que ficam prontos.
+    Cada linha é descarregada no disco imediatamente, então uma interrupção perde no máximo o evento em curso.
+    """
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        _ensure_trailing_newline(path)
+        self.path = path
+        self.count = 0
+        self._file = open(path, "ab")
+
+    def write(self, event: Evento) -> None:
+        self._file.write(dump_event_json(event) + b"\n")
+        self._file.flush()
+        self.count += 1
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+
+
+class RunCheckpoint:
+    """
+    Checkpoint de uma execução, para retomá-la após uma interrupção.
+
+    É um arquivo JSONL somente de acréscimo que registra as URLs concluídas (todos os eventos
+    gravados) e os eventos já gravados, identificados pelo hash do evento bruto. Ao final da
+    execução é registrado um marcador de conclusão; a próxima execução então começa do zero.
+    """
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.urls_done: Set[str] = set()
+        self.events_done: Set[str] = set()
+        self.completed = False
+        self.exists = os.path.exists(path)
+        for record in iter_jsonl(path):
+            if record.get("type") == "url":
+                self.urls_done.add(record["id"])
+            elif record.get("type") == "event":
+                self.events_done.add(record["id"])
+            elif record.get("type") == "completed":
+                self.completed = True
+        _ensure_trailing_newline(path)
+        self._file = open(path, "a", encoding="utf-8")
+
+    @property
+    def can_resume(self) -> bool:
+        """Indica se há uma execução anterior interrompida para retomar."""
+        return self.exists and not self.completed
+
+    def reset(self) -> None:
+        """Descarta o checkpoint atual e começa uma nova execução."""
+        self._file.close()
+        self._file = open(self.path, "w", encoding="utf-8")
+        self.urls_done.clear()
+        self.events_done.clear()
+        self.completed = False
+
+    def _append(self, record_type: str, record_id: Optional[str] = None) -> None:
+        record = {"type": record_type} if record_id is None else {"type": record_type, "id": record_id}
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def is_url_done(self, url: str) -> bool:
+        return url in self.urls_done
+
+    def mark_url_done(self, url: str) -> None:
+        if url not in self.urls_done:
+            self.urls_done.add(url)
+            self._append("url", url)
+
+    def is_event_done(self, event_key: str) -> bool:
+        return event_key in self.events_done
+
+    def mark_event_done(self, event_key: str) -> None:
+        if event_key not in self.events_done:
+            self.events_done.add(event_key)
+            self._append("event", event_key)
+
+    def mark_completed(self) -> None:
+        self.completed = True
+        self._append("completed")
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+
+
+class RawEventSink:
+    """
+    Destino dos eventos brutos quando a raspagem roda sozinha (`python main.py scrape`).
+
+    Tem a mesma interface do `EnrichmentPipeline` usada pela raspagem (`submit` e `finish_url`),
+    mas grava cada evento direto no JSONL, sem enriquecimento. Com um `RunCheckpoint`, eventos já
+    gravados em uma execução interrompida não são gravados de novo.
+    """
+    def __init__(self, writer: JsonlEventWriter, checkpoint: Optional[RunCheckpoint] = None):
+        self.writer = writer
+        self.checkpoint = checkpoint
+        self.processed = 0
+        self.skipped = 0
+
+    async def submit(self, event: Evento, url: Optional[str] = None) -> None:
+        key = event_fingerprint(event)
+        if self.checkpoint is not None and self.checkpoint.is_event_done(key):
+            self.skipped += 1
+            return
+        self.writer.write(event)
+        self.processed += 1
+        if self.checkpoint is not None:
+            self.checkpoint.mark_event_done(key)
+
+    def finish_url(self, url: str) -> None:
+        # Os eventos são gravados no `submit`, então a URL já pode ser marcada como concluída.
+        if self.checkpoint is not None:
+            self.checkpoint.mark_url_done(url)
@@ -1,100 +1,294 @@
 # src/services/excel_generator.py
 
-import pandas as pd
+import argparse
 import logging
 import os
+import typing
+from itertools import islice
+from typing import Any, Iterable, Iterator
+
 import pandas as pd
+from openpyxl import Workbook
+from pydantic import BaseModel
+
+from src.models.Evento import Evento
+from src.services.event_stream import load_records
+from src.services.metrics import get_metrics
 
 logger = logging.getLogger(__name__)
 
+EXPORT_FORMATS = ("xlsx", "csv", "parquet")
+
+# Separador usado ao juntar várias entradas (intérpretes, flyers, ingressos) em uma única célula.
+LIST_SEPARATOR = " | "
+
+
+def _nested_model(annotation: Any) -> type[BaseModel] | None:
+    """Retorna o submodelo Pydantic de uma anotação `Optional[Model]` ou `List[Model]`, se houver."""
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    for arg in typing.get_args(annotation):
+        model = _nested_model(arg)
+        if model is not None:
+            return model
+    return None
+
+
+def _is_list(annotation: Any) -> bool:
+    return typing.get_origin(annotation) in (list, typing.List)
+
+
+def schema_columns(model: type[BaseModel] = Evento) -> tuple[list[str], list[str], dict[str, list[str]]]:
+    """
+    Deriva as colunas da planilha a partir do schema do modelo.
+
+    Submodelos (`promotor`, `local_do_evento`...) viram colunas `<campo>_<subcampo>`; listas de
+    submodelos (`ingressos`) viram colunas `ingresso_<subcampo>`; listas simples ficam em uma coluna.
+
+    Returns:
+        tuple: (colunas na ordem do schema, campos que são listas simples,
+                {campo lista de submodelos: colunas correspondentes}).
+    """
+    columns, scalar_lists, model_lists = [], [], {}
+    for name, field in model.model_fields.items():
+        nested = _nested_model(field.annotation)
+        if nested is not None and _is_list(field.annotation):
+            prefix = name[:-1] if name.endswith("s") else name
+            model_lists[name] = [f"{prefix}_{sub_name}" for sub_name in nested.model_fields]
+            columns.extend(model_lists[name])
+        elif nested is not None:
+            columns.extend(f"{name}_{sub_name}" for sub_name in nested.model_fields)
+        else:
+            columns.append(name)
+            if _is_list(field.annotation):
+                scalar_lists.append(name)
+    return columns, scalar_lists, model_lists
+
+
+EXPORT_COLUMNS, _SCALAR_LIST_FIELDS, _MODEL_LIST_FIELDS = schema_columns()
+_MODEL_LIST_COLUMNS = {column for columns in _MODEL_LIST_FIELDS.values() for column in columns}
+
+
+def _join(values: Any, keep_empty: bool = False) -> str | None:
+    """
+    Junta uma lista em um texto. Com `keep_empty`, valores nulos viram posições vazias em vez de
+    serem descartados, para que colunas paralelas (setor, lote e valor de cada ingresso) continuem
+    com uma entrada por item e alinhadas entre si.
+    """
+    if not isinstance(values, list):
+        return values
+    if keep_empty:
+        parts = ["" if v is None else str(v) for v in values]
+        return LIST_SEPARATOR.join(parts) if any(parts) else None
+    values = [str(v) for v in values if v is not None]
+    return LIST_SEPARATOR.join(values) if values else None
+
+
+def flatten_events(records: list[dict], explode_ingressos: bool = False) -> pd.DataFrame:
+    """
+    Achata uma lista de eventos (dicionários no formato de `Evento`) em um DataFrame com as
+    colunas de `EXPORT_COLUMNS`, usando operações do pandas por coluna em vez de laços por campo.
+
+    Args:
+        records (list[dict]): Os eventos.
+        explode_ingressos (bool): Se True, gera uma linha por ingresso (eventos sem ingresso mantêm
+                                  uma linha). Se False, os ingressos de cada evento são juntados em
+                                  uma única linha, separados por `LIST_SEPARATOR`.
+
+    Returns:
+        pd.DataFrame: Uma linha por evento (ou por ingresso), com as colunas do schema.
+    """
+    if not records:
+        return pd.DataFrame(columns=EXPORT_COLUMNS)
+
+    model_list_data = {field: [record.get(field) or [] for record in records] for field in _MODEL_LIST_FIELDS}
+    df = pd.json_normalize(
+        [{k: v for k, v in record.items() if k not in _MODEL_LIST_FIELDS} for record in records],
+        sep="_",
+    )
+    df = df.reindex(columns=[c for c in EXPORT_COLUMNS if c not in _MODEL_LIST_COLUMNS])
+    for field in _SCALAR_LIST_FIELDS:
+        df[field] = df[field].map(_join)
+
+    for field, columns in _MODEL_LIST_FIELDS.items():
+        items = pd.Series(model_list_data[field], index=df.index)
+        sub_fields = [column.split("_", 1)[1] for column in columns]
+        if explode_ingressos:
+            exploded = items.explode()
+            sub_df = pd.json_normalize(exploded.map(lambda v: v if isinstance(v, dict) else {}).tolist())
+            sub_df = sub_df.reindex(columns=sub_fields)
+            sub_df.columns = columns
+            sub_df.index = exploded.index
+            df = df.join(sub_df, how="left")
+        else:
+            for column, sub_field in zip(columns, sub_fields):
+                df[column] = items.map(lambda values, key=sub_field: _join([v.get(key) for v in values], keep_empty=True))
+
+    return df.reindex(columns=EXPORT_COLUMNS).reset_index(drop=True)
+
+
+def _chunks(records: Iterable[dict], size: int) -> Iterator[list[dict]]:
+    iterator = iter(records)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
 class ExcelGenerator:
     """
-    Classe responsável por gerar arquivos Excel a partir de uma lista de dados JSON.
+    Classe responsável por gerar arquivos Excel (e CSV/Parquet) a partir de uma lista de dados JSON.
     """
-    def __init__(self, output_dir: str = "output"):
+    def __init__(self, output_dir: str = "output", chunk_size: int = 10_000):
         """
         Inicializa o gerador de Excel.
 
         Args:
             output_dir (str): O diretório onde o arquivo Excel será salvo.
                               Será criado se não existir.
+            chunk_size (int): Quantidade de eventos achatados e gravados por vez nos modos em streaming.
         """
         self.output_dir = output_dir
+        self.chunk_size = chunk_size
         os.makedirs(self.output_dir, exist_ok=True)
         logger.info(f"ExcelGenerator inicializado. Arquivos serão salvos em: {self.output_dir}")
 
-    def generate_excel(self, data: list[dict], filename: str = "eventos_enriquecidos.xlsx") -> str | None:
+    def generate_excel(self, data: Iterable[dict], filename: str = "eventos_enriquecidos.xlsx",
+                       explode_ingressos: bool = False, streaming: bool = True) -> str | None:
         """
         Gera um arquivo Excel a partir de uma lista de dicionários.
 
         Args:
-            data (list[dict]): Uma lista de dicionários, onde cada dicionário representa um evento.
-                               Assume-se que os dicionários têm uma estrutura semi-consistente.
+            data (Iterable[dict]): Os eventos, onde cada dicionário representa um evento. Pode ser um
+                                   iterador (ex.: `iter_jsonl`), consumido em blocos de `chunk_size`.
             filename (str): O nome do arquivo Excel a ser gerado.
+            explode_ingressos (bool): Se True, gera uma linha por ingresso.
+            streaming (bool): Se True, usa o modo somente escrita do openpyxl, com memória constante.
+                              Se False, monta o DataFrame completo e usa `DataFrame.to_excel`.
 
         Returns:
             str | None: O caminho completo do arquivo gerado se bem-sucedido, caso contrário None.
         """
-        if not data:
-            logger.warning("Nenhum dado fornecido para gerar o Excel. Arquivo não será criado.")
+        filepath = os.path.join(self.output_dir, filename)
+        try:
+            if not streaming:
+                records = list(data)
+                if not records:
+                    logger.warning("Nenhum dado fornecido para gerar o Excel. Arquivo não será criado.")
+                    return None
+                flatten_events(records, explode_ingressos).to_excel(filepath, index=False)
+            else:
+                workbook = Workbook(write_only=True)
+                sheet = workbook.create_sheet("Eventos")
+                sheet.append(EXPORT_COLUMNS)
+                total = 0
+                for chunk in _chunks(data, self.chunk_size):
+                    df = flatten_events(chunk, explode_ingressos).astype(object)
+                    for row in df.where(df.notna(), None).itertuples(index=False, name=None):
+                        sheet.append(row)
+                    total += len(chunk)
+                if not total:
+                    logger.warning("Nenhum dado fornecido para gerar o Excel. Arquivo não será criado.")
+                    return None
+                workbook.save(filepath)
+            logger.info(f"Arquivo Excel gerado com sucesso em: {filepath}")
+            return filepath
+        except Exception as e:
+            logger.error(f"Erro ao gerar o arquivo Excel '{filename}': {e}")
             return None
 
+    def generate_csv(self, data: Iterable[dict], filename: str = "eventos_enriquecidos.csv",
+                     explode_ingressos: bool = False) -> str | None:
+        """Gera um arquivo CSV (UTF-8 com BOM, para abrir corretamente no Excel), em blocos."""
         filepath = os.path.join(self.output_dir, filename)
+        try:
+            total = 0
+            for chunk in _chunks(data, self.chunk_size):
+                flatten_events(chunk, explode_ingressos).to_csv(
+                    filepath, index=False, mode="w" if total == 0 else "a",
+                    header=total == 0, encoding="utf-8-sig" if total == 0 else "utf-8",
+                )
+                total += len(chunk)
+            if not total:
+                logger.warning("Nenhum dado fornecido para gerar o CSV. Arquivo não será criado.")
+                return None
+            logger.info(f"Arquivo CSV gerado com sucesso em: {filepath}")
+            return filepath
+        except Exception as e:
+            logger.error(f"Erro ao gerar o arquivo CSV '{filename}': {e}")
+            return None
 
+    def generate_parquet(self, data: Iterable[dict], filename: str = "eventos_enriquecidos.parquet",
+                         explode_ingressos: bool = False) -> str | None:
+        """Gera um arquivo Parquet em blocos (requer o pacote opcional `pyarrow`)."""
         try:
-            # Normalizar os dados para lidar com estruturas aninhadas (local, promotor, ingressos)
-            # e garantir que todos os campos estejam no nível superior ou tratados.
-            normalized_data = []
-            for item in data:
-                flat_item = {}
-                for k, v in item.items():
-                    if isinstance(v, dict):
-                        # Se for um dicionário aninhado (ex: 'local', 'promotor')
-                        for sub_k, sub_v in v.items():
-                            flat_item[f"{k}_{sub_k}"] = sub_v # Concatena o nome do pai com o filho (ex: "local_nome")
-                    elif isinstance(v, list) and k == "ingressos":
-                        # Tratar a lista de ingressos: pegar o primeiro tipo/preco como exemplo
-                        if v:
-                            first_ingresso = v[0]
-                            flat_item["ingresso_tipo"] = first_ingresso.get("tipo")
-                            flat_item["ingresso_preco"] = first_ingresso.get("preco")
-                            flat_item["ingresso_moeda"] = first_ingresso.get("moeda")
-                            # Você pode expandir aqui para mais ingressos ou uma representação mais complexa
-                        else:
-                            flat_item["ingresso_tipo"] = None
-                            flat_item["ingresso_preco"] = None
-                            flat_item["ingresso_moeda"] = None
-                    elif isinstance(v, list) and k == "tags":
-                         flat_item[k] = ", ".join(v) if v else None # Converte lista de tags em string
-                    elif isinstance(v, list) and k == "artistas":
-                         flat_item[k] = ", ".join(v) if v else None # Converte lista de artistas em string
-                    else:
-                        flat_item[k] = v
-                normalized_data.append(flat_item)
-
-            df = pd.DataFrame(normalized_data)
-
-            # Reordenar colunas para melhor visualização, se desejar
-            # Exemplo de reordenação:
-            desired_order = [
-                "nome", "data_inicio", "data_fim", "horario_inicio", "horario_fim",
-                "local_nome", "local_endereco", "local_cidade", "local_estado", "local_cep",
-                "promotor_nome", "promotor_email", "promotor_telefone", "promotor_site",
-                "ingresso_tipo", "ingresso_preco", "ingresso_moeda", "ingresso_disponibilidade", "ingresso_link_venda",
-                "artistas", "categoria", "tags", "faixa_etaria", "acessibilidade",
-                "status_evento", "link_original", "descricao", "observacoes",
-                "idioma_original", "local_capacidade_estimada", "local_latitude", "local_longitude"
-            ]
-            # Filtra colunas que realmente existem no DataFrame
-            existing_columns = [col for col in desired_order if col in df.columns]
-            # Adiciona colunas que não estavam na ordem desejada mas existem no DF
-            remaining_columns = [col for col in df.columns if col not in existing_columns]
-            df = df[existing_columns + remaining_columns]
-
-
-            df.to_excel(filepath, index=False)
-            logger.info(f"Arquivo Excel gerado com sucesso em: {filepath}")
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            logger.error("Exportação para Parquet requer o pacote 'pyarrow'. Instale com: poetry install --extras parquet")
+            return None
+
+        filepath = os.path.join(self.output_dir, filename)
+        schema = pa.schema([(column, pa.string()) for column in EXPORT_COLUMNS])
+        writer = None
+        try:
+            for chunk in _chunks(data, self.chunk_size):
+                df = flatten_events(chunk, explode_ingressos).astype(object)
+                df = df.where(df.isna(), df.astype(str))
+                table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(filepath, schema)
+                writer.write_table(table)
+            if writer is None:
+                logger.warning("Nenhum dado fornecido para gerar o Parquet. Arquivo não será criado.")
+                return None
+            logger.info(f"Arquivo Parquet gerado com sucesso em: {filepath}")
             return filepath
         except Exception as e:
-            logger.error(f"Erro ao gerar o arquivo Excel '{filename}': {e}")
-            return None
\ No newline at end of file
+            logger.error(f"Erro ao gerar o arquivo Parquet '{filename}': {e}")
+            return None
+        finally:
+            if writer is not None:
+                writer.close()
+
+    def export(self, data: Iterable[dict], fmt: str = "xlsx", filename: str | None = None,
+               explode_ingressos: bool = False) -> str | None:
+        """
+        Exporta os eventos no formato indicado ('xlsx', 'csv' ou 'parquet').
+
+        Returns:
+            str | None: O caminho do arquivo gerado, ou None em caso de erro.
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Formato de exportação inválido: '{fmt}'. Use um de {EXPORT_FORMATS}.")
+        filename = filename or f"eventos_enriquecidos.{fmt}"
+        with get_metrics().span("export", format=fmt, filename=filename) as span:
+            if fmt == "csv":
+                filepath = self.generate_csv(data, filename, explode_ingressos)
+            elif fmt == "parquet":
+                filepath = self.generate_parquet(data, filename, explode_ingressos)
+            else:
+                filepath = self.generate_excel(data, filename, explode_ingressos)
+            span.set("success", filepath is not None)
+        return filepath
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Exporta um arquivo de eventos (.jsonl ou .json) já gerado, sem rodar a raspagem."""
+    parser = argparse.ArgumentParser(description="Exporta eventos enriquecidos para Excel, CSV ou Parquet.")
+    parser.add_argument("input", help="Arquivo de eventos (.jsonl ou .json).")
+    parser.add_argument("--format", dest="formats", action="append", choices=EXPORT_FORMATS,
+                        help="Formato de saída (pode ser repetido). Padrão: xlsx.")
+    parser.add_argument("--output-dir", default="output", help="Diretório de saída.")
+    parser.add_argument("--explode-ingressos", action="store_true", help="Gera uma linha por ingresso.")
+    args = parser.parse_args(argv)
+
+    generator = ExcelGenerator(output_dir=args.output_dir)
+    for fmt in args.formats or ["xlsx"]:
+        generator.export(load_records(args.input), fmt, explode_ingressos=args.explode_ingressos)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    main()
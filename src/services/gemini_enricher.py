@@ -1,55 +1,51 @@
 import google.generativeai as genai
+import asyncio
 import logging
 import json
 import re
-import requests
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
+
+from pydantic import ValidationError
 
 # Importe os modelos Pydantic
 from src.models.Evento import Evento
 from src.models.Promotor import Promotor
 from src.models.Local import LocalDoEvento, LocalDeRealizacao
 from src.models.Ingresso import Ingresso
+from src.services.cnpj_lookup import get_cnpj_service
+from src.services.enrichment_cache import EnrichmentCache
+from src.services.event_batch import EVENT_ADAPTER, dump_events_json, validate_events
+from src.services.metrics import add_to_current_span, get_metrics
+from src.services.rate_limiter import estimate_tokens, get_rate_limiter
+from src.services.rule_enricher import RuleBasedEnricher
 
 logger = logging.getLogger(__name__)
 
-BRASIL_API_BASE_URL = "https://brasilapi.com.br"
+GEMINI_MODEL_NAME = 'gemini-1.5-flash-latest'
+
+# Versão do prompt de enriquecimento. Incremente ao alterar o prompt para invalidar o cache de enriquecimento.
+ENRICHMENT_PROMPT_VERSION = "2"
+
+# Número máximo de rodadas de chamadas à ferramenta por requisição ao Gemini.
+MAX_TOOL_ROUNDS = 5
+
+# Cercas de código Markdown (```json ... ```) em volta do JSON das respostas.
+_JSON_FENCE_PATTERN = re.compile(r'^```json\s*|```\s*$', re.MULTILINE)
 
 def get_cnpj_info(cnpj: str) -> Optional[Dict[str, Any]]:
     """
     Consulta a Brasil API para obter informações de um CNPJ.
-    Valida e limpa o CNPJ antes de consultar.
+    Valida e limpa o CNPJ antes de consultar. As respostas (inclusive CNPJs inexistentes)
+    ficam em cache persistente e as conexões HTTP são reaproveitadas.
+    """
+    return get_cnpj_service().lookup(cnpj)
+
+async def get_cnpj_info_async(cnpj: str) -> Optional[Dict[str, Any]]:
+    """
+    Versão não bloqueante de `get_cnpj_info`. Consultas simultâneas ao mesmo CNPJ
+    compartilham uma única requisição HTTP.
     """
-    if not cnpj or not isinstance(cnpj, str):
-        logger.warning(f"AVISO: CNPJ fornecido não é uma string ou está vazio: '{cnpj}'")
-        return None
-
-    # Remove todos os caracteres não numéricos
-    cnpj_clean = re.sub(r'\D', '', cnpj)
-
-    if len(cnpj_clean) != 14:
-        logger.warning(f"AVISO: CNPJ com tamanho incorreto após limpeza: '{cnpj_clean}' (original: '{cnpj}')")
-        return None
-
-    url = f"{BRASIL_API_BASE_URL}/api/cnpj/v1/{cnpj_clean}"
-    try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        logger.info(f"DEBUG: Dados do CNPJ {cnpj_clean} obtidos com sucesso da Brasil API.")
-        return data
-    except requests.exceptions.HTTPError as e:
-        if e.response.status_code == 404:
-            logger.warning(f"AVISO: CNPJ {cnpj_clean} não encontrado na Brasil API.")
-        else:
-            logger.error(f"ERRO HTTP ao consultar Brasil API para CNPJ {cnpj_clean}: {e}")
-        return None
-    except requests.exceptions.RequestException as e:
-        logger.error(f"ERRO de Conexão ao consultar Brasil API para CNPJ {cnpj_clean}: {e}")
-        return None
-    except ValueError as e:
-        logger.error(f"ERRO ao decodificar JSON da Brasil API para CNPJ {cnpj_clean}: {e}")
-        return None
+    return await get_cnpj_service().lookup_async(cnpj)
 
 # A definição da ferramenta para o Gemini.
 tool_get_cnpj = genai.protos.Tool(
@@ -76,37 +72,177 @@ class GeminiEnricher:
     Classe responsável por enriquecer dados de eventos usando o modelo Gemini
     e a ferramenta de consulta de CNPJ.
     """
-    def __init__(self, gemini_api_key: str):
+    def __init__(self, gemini_api_key: str, cache: Optional[EnrichmentCache] = None):
+        """
+        Inicializa o enriquecedor.
+
+        Args:
+            gemini_api_key (str): Chave da API do Google Gemini.
+            cache (Optional[EnrichmentCache]): Cache de eventos já enriquecidos. Se informado, eventos
+                                               idênticos a um já enriquecido não geram nova chamada ao Gemini.
+        """
         genai.configure(api_key=gemini_api_key)
-        self.model = genai.GenerativeModel('gemini-1.5-flash-latest', tools=[tool_get_cnpj])
+        self.model_name = GEMINI_MODEL_NAME
+        self.model = genai.GenerativeModel(self.model_name, tools=[tool_get_cnpj])
+        self.cache = cache
+        self.rules = RuleBasedEnricher()
         logger.info("GeminiEnricher inicializado com o modelo Gemini 1.5 Flash e a ferramenta de CNPJ.")
 
     async def enrich_event_data(self, event: Evento) -> Evento:
         """
-        Envia os dados brutos de um evento para o Gemini para enriquecimento.
+        Enriquece os dados brutos de um evento.
+
+        As regras determinísticas (CNPJ + Brasil API) são aplicadas primeiro; o Gemini só é chamado
+        para eventos que elas não conseguem resolver. Se houver cache e o mesmo evento já tiver sido
+        enriquecido pelo Gemini, retorna o resultado guardado. Se a chamada ao Gemini falhar, retorna
+        o evento com o que as regras conseguiram preencher.
+        """
+        enriched_events, _ = await self.enrich_events([event])
+        return enriched_events[0]
+
+    async def enrich_events_batch(self, events: List[Evento]) -> List[Evento]:
+        """
+        Enriquece uma lista de eventos enviando-os ao Gemini em lotes (um array JSON por requisição),
+        o que dilui o custo das instruções do prompt entre vários eventos.
+
+        Eventos resolvidos pelas regras determinísticas ou já presentes no cache não são enviados.
+        A resposta é associada aos eventos pela posição no array; se ela vier malformada ou
+        incompleta, o lote é dividido ao meio e reenviado, até chegar ao enriquecimento individual.
+        Se a chamada ao Gemini falhar, os eventos enviados nela voltam com o que as regras
+        conseguiram preencher; os demais não são afetados.
+
+        Args:
+            events (List[Evento]): Eventos brutos a serem enriquecidos.
+
+        Returns:
+            List[Evento]: Os eventos enriquecidos, na mesma ordem da entrada.
+        """
+        enriched_events, _ = await self.enrich_events(events)
+        return enriched_events
+
+    async def enrich_events(self, events: List[Evento]) -> Tuple[List[Evento], Dict[int, str]]:
+        """
+        Enriquece uma lista de eventos como `enrich_events_batch` e informa quais não puderam ser
+        enviados ao Gemini, para quem precisa tentá-los de novo (como os workers da fila de tarefas).
+
+        Falhas da própria chamada ao Gemini (como `RetriesExhaustedError` ou erros de rede) não
+        dividem o lote: os eventos daquela chamada ficam com o resultado das regras, não são
+        cacheados e são informados como falhas. Uma resposta que não pôde ser interpretada não é
+        uma falha: o evento volta sem o enriquecimento do Gemini, como no enriquecimento individual.
+
+        Args:
+            events (List[Evento]): Eventos brutos a serem enriquecidos.
+
+        Returns:
+            Tuple[List[Evento], Dict[int, str]]: Os eventos, na mesma ordem da entrada, e a mensagem
+                de erro de cada posição cuja chamada ao Gemini falhou.
+        """
+        results: List[Optional[Evento]] = [None] * len(events)
+        failures: Dict[int, str] = {}
+        pending: List[int] = []
+        pending_events: List[Evento] = []
+        cache_keys: Dict[int, str] = {}
+        rule_results = await asyncio.gather(*(self.rules.enrich(event) for event in events))
+        for index, (event, (rule_event, resolved)) in enumerate(zip(events, rule_results)):
+            if resolved:
+                results[index] = rule_event
+                continue
+            if self.cache is not None:
+                cache_keys[index] = self.cache.make_key(event, self.model_name, ENRICHMENT_PROMPT_VERSION)
+                cached_event = self.cache.get(cache_keys[index])
+                if cached_event is not None:
+                    results[index] = cached_event
+                    continue
+            pending.append(index)
+            pending_events.append(rule_event)
+
+        if pending:
+            get_metrics().increment("gemini_events_total", len(pending))
+            try:
+                enriched_events = await self._enrich_batch_with_gemini(pending_events)
+            except Exception as e:
+                logger.error(f"Erro durante o enriquecimento com Gemini de {len(pending)} eventos: {e}", exc_info=True)
+                get_metrics().increment("gemini_failed_events_total", len(pending))
+                for index, rule_event in zip(pending, pending_events):
+                    results[index] = rule_event
+                    failures[index] = str(e) or type(e).__name__
+                return results, failures
+            for index, rule_event, enriched_event in zip(pending, pending_events, enriched_events):
+                results[index] = enriched_event
+                # Um evento que o Gemini não conseguiu enriquecer volta inalterado e não é cacheado.
+                if self.cache is not None and enriched_event is not rule_event:
+                    self.cache.set(cache_keys[index], enriched_event)
+        return results, failures
+
+    async def _generate_with_tools(self, prompt: str) -> str:
+        """
+        Envia o prompt ao Gemini e resolve as chamadas à ferramenta `get_cnpj_info` (inclusive
+        várias na mesma resposta, comuns em lotes) até o modelo devolver o texto final.
+        Cada chamada passa pelo limitador de taxa do Gemini, com novas tentativas em caso de 429.
         """
-        # Melhoria: Adiciona um passo de pré-processamento para extrair CNPJs do texto
-        cnpjs_found = set()
-        if event.promotor and event.promotor.nome:
-            cnpjs_found.update(re.findall(r'\d{2}\.\d{3}\.\d{3}/\d{4}-\d{2}|\d{14}', event.promotor.nome))
-        if event.local_do_evento and event.local_do_evento.nome:
-            cnpjs_found.update(re.findall(r'\d{2}\.\d{3}\.\d{3}/\d{4}-\d{2}|\d{14}', event.local_do_evento.nome))
-
-        # Se encontrou CNPJs, tenta enriquecer com a Brasil API diretamente
-        if cnpjs_found:
-            for cnpj in cnpjs_found:
-                cnpj_data = get_cnpj_info(cnpj)
-                if cnpj_data:
-                    # Atualiza o promotor se o CNPJ corresponder
-                    if event.promotor and cnpj_data.get('cnpj') in (event.promotor.cnpj or ''):
-                        event.promotor.nome = cnpj_data.get('razao_social', event.promotor.nome)
-                        event.promotor.telefone = next((tel.get('telefone') for tel in cnpj_data.get('cnaes_secundarios', []) if 'telefone' in tel), event.promotor.telefone)
-                        event.promotor.email = cnpj_data.get('email', event.promotor.email)
-
-                    # Atualiza o local do evento se o CNPJ corresponder
-                    if event.local_do_evento and cnpj_data.get('cnpj') in (event.local_do_evento.cnpj or ''):
-                        event.local_do_evento.nome = cnpj_data.get('razao_social', event.local_do_evento.nome)
+        limiter = get_rate_limiter("gemini")
+        prompt_tokens = estimate_tokens(prompt)
+        contents: List[Any] = [prompt]
+        response = await limiter.call(self.model.generate_content_async, contents=contents, tokens=prompt_tokens)
+        self._record_response(response, prompt_tokens)
+        for _ in range(MAX_TOOL_ROUNDS):
+            if not response.candidates or not response.candidates[0].content.parts:
+                break
+            function_calls = [
+                part.function_call for part in response.candidates[0].content.parts
+                if part.function_call and part.function_call.name == 'get_cnpj_info'
+            ]
+            if not function_calls:
+                break
+            cnpj_results = await asyncio.gather(
+                *(get_cnpj_info_async(call.args.get('cnpj')) for call in function_calls)
+            )
+            contents.append(response.candidates[0].content)
+            contents.append(genai.protos.Content(
+                role='user',
+                parts=[
+                    genai.protos.Part(
+                        function_response=genai.protos.FunctionResponse(
+                            name='get_cnpj_info',
+                            response={'json': json.dumps(cnpj_data) if cnpj_data else json.dumps({'error': 'CNPJ not found'})}
+                        )
+                    )
+                    for cnpj_data in cnpj_results
+                ],
+            ))
+            # Nova chamada para o modelo com o resultado da ferramenta
+            response = await limiter.call(self.model.generate_content_async, contents=contents, tokens=prompt_tokens)
+            self._record_response(response, prompt_tokens)
+        return response.text.strip()
 
+    @staticmethod
+    def _record_response(response: Any, estimated_prompt_tokens: int) -> None:
+        """
+        Registra nas métricas uma resposta do Gemini: tokens consumidos (de `usage_metadata`, ou a
+        estimativa do prompt se ela não vier) e se a resposta pediu a ferramenta de CNPJ.
+        """
+        metrics = get_metrics()
+        usage = getattr(response, "usage_metadata", None)
+        prompt_tokens = getattr(usage, "prompt_token_count", None) or estimated_prompt_tokens
+        output_tokens = getattr(usage, "candidates_token_count", None) or 0
+        parts = response.candidates[0].content.parts if response.candidates else []
+        function_calls = sum(
+            1 for part in parts if part.function_call and part.function_call.name == 'get_cnpj_info'
+        )
+        metrics.increment("gemini_requests_total", function_call="true" if function_calls else "false")
+        metrics.increment("gemini_tokens_total", prompt_tokens, type="prompt")
+        metrics.increment("gemini_tokens_total", output_tokens, type="output")
+        metrics.increment("gemini_function_calls_total", function_calls)
+        add_to_current_span("gemini_calls", 1)
+        add_to_current_span("gemini_tokens", prompt_tokens + output_tokens)
+
+    @staticmethod
+    def _parse_json_response(text: str) -> Any:
+        """Remove as cercas de código Markdown da resposta e decodifica o JSON."""
+        cleaned_json_text = _JSON_FENCE_PATTERN.sub('', text).strip()
+        return json.loads(cleaned_json_text)
+
+    async def _enrich_single_with_gemini(self, event: Evento) -> Evento:
         # Continua com o enriquecimento via Gemini para outros campos
         prompt_with_tools = f"""
         Você é um especialista em enriquecimento de dados de eventos. Sua tarefa é analisar o evento JSON fornecido, validar e completar as informações.
@@ -119,55 +255,66 @@ class GeminiEnricher:
         4.  **Formato de Saída:** Retorne **APENAS** o objeto JSON completo e enriquecido do evento, seguindo o schema original.
 
         **Dados do Evento (brutos do Scrapegraph AI):**
-        {json.dumps(event.model_dump(mode='json'), indent=2, ensure_ascii=False)}
+        {EVENT_ADAPTER.dump_json(event, indent=2).decode('utf-8')}
 
         Retorne APENAS o objeto JSON de saída.
         """
+        # Falhas da chamada sobem para `enrich_events`, como no enriquecimento em lote.
+        enriched_data_text = await self._generate_with_tools(prompt_with_tools)
         try:
-            response = self.model.generate_content(contents=prompt_with_tools)
-
-            if response.candidates and response.candidates[0].content.parts:
-                part = response.candidates[0].content.parts[0]
-                if hasattr(part, 'function_call'):
-                    function_call = part.function_call
-                    if function_call.name == 'get_cnpj_info':
-                        cnpj_param = function_call.args.get('cnpj')
-                        if cnpj_param:
-                            cnpj_data = get_cnpj_info(cnpj_param)
-
-                            # Segunda chamada para o modelo com o resultado da ferramenta
-                            tool_result_response = self.model.generate_content(
-                                contents=[
-                                    prompt_with_tools,
-                                    response.candidates[0].content,
-                                    genai.protos.Part(
-                                        function_response=genai.protos.FunctionResponse(
-                                            name='get_cnpj_info',
-                                            response={'json': json.dumps(cnpj_data) if cnpj_data else json.dumps({'error': 'CNPJ not found'})}
-                                        )
-                                    )
-                                ]
-                            )
-                            enriched_data_text = tool_result_response.text.strip()
-                        else:
-                            enriched_data_text = response.text.strip()
-                    else:
-                        enriched_data_text = response.text.strip()
-                else:
-                    enriched_data_text = response.text.strip()
-            else:
-                enriched_data_text = response.text.strip()
-
-            # Limpa e decodifica a resposta JSON
-            cleaned_json_text = re.sub(r'^```json\s*|```\s*$', '', enriched_data_text, flags=re.MULTILINE).strip()
-            try:
-                enriched_dict = json.loads(cleaned_json_text)
-                return Evento(**enriched_dict)
-            except json.JSONDecodeError as e:
-                logger.error(f"Erro de decodificação JSON na resposta do Gemini: {e}")
-                logger.debug(f"Resposta bruta do Gemini: {cleaned_json_text}")
-                return event
-        
-        except Exception as e:
-            logger.error(f"Erro durante o enriquecimento com Gemini: {e}", exc_info=True)
-            return event
\ No newline at end of file
+            enriched_dict = self._parse_json_response(enriched_data_text)
+            return Evento(**enriched_dict)
+        except (json.JSONDecodeError, TypeError, ValidationError) as e:
+            logger.error(f"Resposta inválida do Gemini para '{event.nome_do_evento}': {e}")
+            logger.debug(f"Resposta bruta do Gemini: {enriched_data_text}")
+            return event
+
+    async def _enrich_batch_with_gemini(self, events: List[Evento]) -> List[Evento]:
+        if len(events) == 1:
+            return [await self._enrich_single_with_gemini(events[0])]
+
+        batch_prompt = f"""
+        Você é um especialista em enriquecimento de dados de eventos. Sua tarefa é analisar o array JSON de eventos fornecido, validar e completar as informações de cada evento.
+
+        **Instruções:**
+
+        1.  **Validação e Extração de CNPJ:** Para cada evento, analise os campos `promotor.nome` e `local_do_evento.nome` para encontrar um CNPJ. Se um CNPJ válido for encontrado, use a ferramenta `get_cnpj_info` para buscar os dados e preencher os campos `cnpj`, `telefone`, e `email` do respectivo objeto (promotor ou local).
+        2.  **Manter Dados:** Se a ferramenta não retornar dados ou não for chamada, mantenha os dados originais do evento.
+        3.  **Não Inventar:** Nunca invente informações. Se um campo não puder ser preenchido, mantenha-o como `null`.
+        4.  **Formato de Saída:** Retorne **APENAS** um array JSON com exatamente {len(events)} objetos, na mesma ordem da entrada, cada um sendo o evento completo e enriquecido seguindo o schema original.
+
+        **Eventos (brutos do Scrapegraph AI):**
+        {dump_events_json(events, exclude_none=False).decode('utf-8')}
+
+        Retorne APENAS o array JSON de saída.
+        """
+        # Falhas da chamada (limite de taxa esgotado, erro de rede ou da API) não são resolvidas
+        # dividindo o lote: mais requisições só agravariam a limitação. Elas sobem para `enrich_events`.
+        enriched_data_text = await self._generate_with_tools(batch_prompt)
+        try:
+            enriched_list = self._parse_json_response(enriched_data_text)
+        except json.JSONDecodeError as e:
+            logger.warning(f"AVISO: Resposta inválida do Gemini para um lote de {len(events)} eventos ({e}). Dividindo o lote.")
+            enriched_list = None
+
+        if not isinstance(enriched_list, list) or len(enriched_list) != len(events):
+            if isinstance(enriched_list, list):
+                logger.warning(
+                    f"AVISO: O Gemini retornou {len(enriched_list)} eventos para um lote de {len(events)}. Dividindo o lote."
+                )
+            middle = len(events) // 2
+            first_half, second_half = await asyncio.gather(
+                self._enrich_batch_with_gemini(events[:middle]),
+                self._enrich_batch_with_gemini(events[middle:]),
+            )
+            return first_half + second_half
+
+        # O lote inteiro é validado de uma vez; apenas os itens inválidos são reenviados individualmente.
+        results, failures = validate_events(enriched_list)
+        for failure in failures:
+            event = events[failure.index]
+            logger.warning(f"AVISO: Item inválido no lote do Gemini para '{event.nome_do_evento}': {failure.message}")
+        retried = await asyncio.gather(*(self._enrich_single_with_gemini(events[failure.index]) for failure in failures))
+        for failure, enriched_event in zip(failures, retried):
+            results[failure.index] = enriched_event
+        return results
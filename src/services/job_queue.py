@@ -0,0 +1,275 @@
+# src/services/job_queue.py
+
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set
+
+from src.models.Evento import Evento
+from src.services.enrichment_cache import event_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Tipos de tarefa: a raspagem de uma URL gera uma tarefa de enriquecimento por evento.
+SCRAPE_URL = "scrape_url"
+ENRICH_EVENT = "enrich_event"
+JOB_TYPES = (SCRAPE_URL, ENRICH_EVENT)
+
+# Estados de uma tarefa.
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+
+def make_worker_id() -> str:
+    """Identificador único de um worker: host, PID e um sufixo aleatório."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+@dataclass
+class Job:
+    """Tarefa reservada por um worker."""
+    id: int
+    type: str
+    payload: Dict[str, Any]
+    attempts: int
+
+
+class JobQueue:
+    """
+    Fila de tarefas persistente (SQLite) compartilhada por vários processos de worker do mesmo host.
+
+    Cada tarefa é reservada (`lease`) por um worker durante `lease_seconds`. Se o worker morrer
+    sem concluí-la, a reserva expira e a tarefa volta a ficar disponível para outro worker; o
+    worker que ainda está trabalhando renova a reserva com `extend_lease`. Tarefas que falham são
+    repetidas com espera crescente até `max_attempts` tentativas e então marcadas como falhas.
+
+    O arquivo usa o modo WAL do SQLite, que permite vários processos do mesmo host lendo e gravando
+    ao mesmo tempo. O WAL depende de memória compartilhada entre os processos: o arquivo deve ficar em
+    um disco local e não pode ser compartilhado entre máquinas (NFS/SMB), sob pena de a mesma tarefa
+    ser reservada duas vezes ou de o arquivo ser corrompido.
+    """
+    def __init__(self, db_path: str = "cache/job_queue.sqlite3", lease_seconds: float = 600,
+                 max_attempts: int = 3, retry_delay: float = 30):
+        """
+        Inicializa a fila.
+
+        Args:
+            db_path (str): Caminho do arquivo SQLite compartilhado pelos workers.
+            lease_seconds (float): Duração da reserva de uma tarefa. Reservas expiradas são retomadas.
+            max_attempts (int): Número máximo de tentativas de uma tarefa antes de marcá-la como falha.
+            retry_delay (float): Espera (em segundos) antes de repetir uma tarefa que falhou, dobrada a cada tentativa.
+        """
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._lock = threading.Lock()
+        # Transações controladas manualmente (BEGIN IMMEDIATE) para reservar tarefas sem disputa.
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30, isolation_level=None)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " type TEXT NOT NULL,"
+                " job_key TEXT NOT NULL UNIQUE,"
+                " payload TEXT NOT NULL,"
+                " status TEXT NOT NULL,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " available_at REAL NOT NULL,"
+                " lease_until REAL,"
+                " worker TEXT,"
+                " result TEXT,"
+                " error TEXT,"
+                " created_at REAL NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, type, available_at)")
+
+    def _transaction(self, sql_and_params: Sequence[tuple]) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, params in sql_and_params:
+                    self._conn.execute(sql, params)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def enqueue(self, job_type: str, payload: Dict[str, Any], key: Optional[str] = None) -> bool:
+        """
+        Adiciona uma tarefa à fila.
+
+        Args:
+            job_type (str): O tipo da tarefa (`scrape_url` ou `enrich_event`).
+            payload (Dict[str, Any]): Os dados da tarefa, serializáveis em JSON.
+            key (Optional[str]): Identificador da tarefa. Uma tarefa com a mesma chave não é adicionada de novo.
+
+        Returns:
+            bool: True se a tarefa foi adicionada, False se já existia.
+        """
+        if job_type not in JOB_TYPES:
+            raise ValueError(f"Tipo de tarefa inválido: '{job_type}'. Use um de {JOB_TYPES}.")
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO jobs (type, job_key, payload, status, available_at, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_type, f"{job_type}:{key or uuid.uuid4().hex}", json.dumps(payload, ensure_ascii=False),
+                 PENDING, now, now, now),
+            )
+        return cursor.rowcount > 0
+
+    def lease(self, worker_id: str, job_type: str, limit: int = 1) -> List[Job]:
+        """
+        Reserva até `limit` tarefas disponíveis de um tipo: pendentes ou com a reserva expirada
+        (worker que morreu). Tarefas expiradas que já esgotaram as tentativas são marcadas como falhas.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, error = 'Reserva expirada', updated_at = ?"
+                    " WHERE status = ? AND lease_until < ? AND attempts >= ?",
+                    (FAILED, now, LEASED, now, self.max_attempts),
+                )
+                rows = self._conn.execute(
+                    "SELECT id, payload, attempts FROM jobs"
+                    " WHERE type = ? AND ((status = ? AND available_at <= ?) OR (status = ? AND lease_until < ?))"
+                    " ORDER BY id LIMIT ?",
+                    (job_type, PENDING, now, LEASED, now, limit),
+                ).fetchall()
+                self._conn.executemany(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_until = ?, worker = ?, updated_at = ?"
+                    " WHERE id = ?",
+                    [(LEASED, now + self.lease_seconds, worker_id, now, row[0]) for row in rows],
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [Job(row[0], job_type, json.loads(row[1]), row[2] + 1) for row in rows]
+
+    def extend_lease(self, job_ids: Sequence[int], worker_id: str) -> None:
+        """Renova a reserva das tarefas ainda em andamento por este worker."""
+        now = time.time()
+        self._transaction([
+            ("UPDATE jobs SET lease_until = ?, updated_at = ? WHERE id = ? AND status = ? AND worker = ?",
+             (now + self.lease_seconds, now, job_id, LEASED, worker_id))
+            for job_id in job_ids
+        ])
+
+    def complete(self, job: Job, worker_id: str, result: Optional[Any] = None) -> bool:
+        """
+        Marca uma tarefa como concluída, com o resultado. Retorna False se a reserva já tiver sido
+        perdida para outro worker (o resultado é descartado).
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = NULL, lease_until = NULL, updated_at = ?"
+                " WHERE id = ? AND status = ? AND worker = ?",
+                (DONE, None if result is None else json.dumps(result, ensure_ascii=False), now,
+                 job.id, LEASED, worker_id),
+            )
+        if cursor.rowcount == 0:
+            logger.warning(f"AVISO: Reserva da tarefa {job.id} ({job.type}) perdida antes da conclusão. Resultado descartado.")
+        return cursor.rowcount > 0
+
+    def fail(self, job: Job, worker_id: str, error: str) -> None:
+        """Registra uma falha: a tarefa volta para a fila após uma espera, ou falha de vez após `max_attempts`."""
+        now = time.time()
+        final = job.attempts >= self.max_attempts
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, available_at = ?, lease_until = NULL, updated_at = ?"
+                " WHERE id = ? AND status = ? AND worker = ?",
+                (FAILED if final else PENDING, error, now + self.retry_delay * 2 ** (job.attempts - 1), now,
+                 job.id, LEASED, worker_id),
+            )
+        if final:
+            logger.error(f"ERRO: Tarefa {job.id} ({job.type}) falhou após {job.attempts} tentativas: {error}")
+        else:
+            logger.warning(f"AVISO: Tarefa {job.id} ({job.type}) falhou (tentativa {job.attempts}): {error}. Será repetida.")
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        """Quantidade de tarefas por tipo e estado."""
+        with self._lock:
+            rows = self._conn.execute("SELECT type, status, COUNT(*) FROM jobs GROUP BY type, status").fetchall()
+        result: Dict[str, Dict[str, int]] = {job_type: {} for job_type in JOB_TYPES}
+        for job_type, status, count in rows:
+            result.setdefault(job_type, {})[status] = count
+        return result
+
+    def is_drained(self) -> bool:
+        """Indica se não há mais tarefas pendentes nem em andamento (todas concluídas ou falhas)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", (PENDING, LEASED)
+            ).fetchone()
+        return row[0] == 0
+
+    def iter_jobs(self, job_type: str, statuses: Sequence[str] = (DONE,)) -> Iterator[Dict[str, Any]]:
+        """Percorre as tarefas de um tipo (payload, resultado e estado), na ordem em que foram criadas."""
+        placeholders = ",".join("?" for _ in statuses)
+        last_id = 0
+        while True:
+            # Leitura em páginas, para não manter o lock (nem todas as tarefas) durante a iteração.
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT id, payload, result, status FROM jobs WHERE type = ? AND id > ?"
+                    f" AND status IN ({placeholders}) ORDER BY id LIMIT 1000",
+                    (job_type, last_id, *statuses),
+                ).fetchall()
+            if not rows:
+                return
+            for job_id, payload, result, status in rows:
+                yield {
+                    "id": job_id,
+                    "payload": json.loads(payload),
+                    "result": json.loads(result) if result is not None else None,
+                    "status": status,
+                }
+            last_id = rows[-1][0]
+
+    def clear(self) -> None:
+        """Remove todas as tarefas (para começar uma nova execução)."""
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class JobQueueSink:
+    """
+    Destino dos eventos raspados por um worker da fila: cada evento vira uma tarefa `enrich_event`.
+
+    Tem a mesma interface do `EnrichmentPipeline` usada pela raspagem (`submit` e `finish_url`).
+    Eventos idênticos (mesmo hash) geram uma única tarefa, mesmo vindos de URLs ou workers diferentes.
+    """
+    def __init__(self, queue: JobQueue):
+        self.queue = queue
+        self.submitted = 0
+        self.finished_urls: Set[str] = set()
+
+    async def submit(self, event: Evento, url: Optional[str] = None) -> None:
+        payload = {"event": event.model_dump(mode='json', exclude_none=True), "url": url}
+        if self.queue.enqueue(ENRICH_EVENT, payload, key=event_fingerprint(event)):
+            self.submitted += 1
+
+    def finish_url(self, url: str) -> None:
+        self.finished_urls.add(url)
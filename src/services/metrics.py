@@ -0,0 +1,282 @@
+# src/services/metrics.py
+
+import contextlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Quantis exportados para as medidas (durações, tamanhos).
+QUANTILES = (0.5, 0.95, 0.99)
+
+_SeriesKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def _series_key(name: str, labels: Dict[str, Any]) -> _SeriesKey:
+    return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class _Summary:
+    """Contagem, soma, máximo e uma amostra limitada (reservoir sampling) para estimar quantis."""
+    __slots__ = ("count", "sum", "max", "_samples", "_random")
+
+    RESERVOIR_SIZE = 10_000
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.max = float("-inf")
+        self._samples: List[float] = []
+        self._random = random.Random(0)
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        if len(self._samples) < self.RESERVOIR_SIZE:
+            self._samples.append(value)
+        else:
+            index = self._random.randrange(self.count)
+            if index < self.RESERVOIR_SIZE:
+                self._samples[index] = value
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Span:
+    """Trecho medido da execução (a raspagem de uma URL, o enriquecimento de um evento...)."""
+    __slots__ = ("name", "span_id", "parent_id", "attributes", "start", "duration")
+
+    def __init__(self, name: str, parent_id: Optional[str] = None, **attributes: Any):
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes: Dict[str, Any] = dict(attributes)
+        self.start = time.time()
+        self.duration: Optional[float] = None
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def add(self, key: str, value: float) -> None:
+        """Soma um valor a um atributo numérico (ex.: tokens consumidos dentro do trecho)."""
+        self.attributes[key] = self.attributes.get(key, 0) + value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "duration": self.duration,
+            "attributes": self.attributes,
+        }
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    """Retorna o trecho ativo no contexto atual (tarefas asyncio e `asyncio.to_thread` herdam o contexto)."""
+    return _current_span.get()
+
+
+def add_to_current_span(key: str, value: float) -> None:
+    """Soma um valor a um atributo do trecho ativo, se houver."""
+    span = _current_span.get()
+    if span is not None:
+        span.add(key, value)
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in pairs) + "}"
+
+
+class MetricsRegistry:
+    """
+    Métricas e rastreamento de uma execução: contadores, medidas (com quantis) e trechos (spans).
+
+    Cada trecho encerrado alimenta a medida `<nome>_duration_seconds` e, com `trace_path`, é gravado
+    como uma linha JSON, de modo que o rastreamento de execuções longas não se acumula em memória.
+    Ao final da execução, `export_json` e `export_prometheus` gravam o resumo em arquivo.
+    Seguro para uso a partir de várias threads (ex.: consultas feitas com `asyncio.to_thread`).
+    """
+    def __init__(self, trace_path: Optional[str] = None):
+        """
+        Inicializa o registro.
+
+        Args:
+            trace_path (Optional[str]): Arquivo JSONL onde cada trecho encerrado é gravado.
+                                        Se None, os trechos só alimentam as medidas de duração.
+        """
+        self.trace_path = trace_path
+        self._lock = threading.Lock()
+        self._counters: Dict[_SeriesKey, float] = {}
+        self._gauges: Dict[_SeriesKey, float] = {}
+        self._summaries: Dict[_SeriesKey, _Summary] = {}
+        self._trace_file = None
+        if trace_path is not None:
+            os.makedirs(os.path.dirname(trace_path) or ".", exist_ok=True)
+            self._trace_file = open(trace_path, "w", encoding="utf-8")
+
+    def increment(self, name: str, value: float = 1.0, **labels: Any) -> None:
+        """Incrementa um contador (nomes terminados em `_total`, por convenção do Prometheus)."""
+        key = _series_key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def set_gauge(self, name: str, value: float, **labels: Any) -> None:
+        """Define o valor de um indicador (ex.: taxa de acerto calculada ao final)."""
+        with self._lock:
+            self._gauges[_series_key(name, labels)] = value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        """Registra uma medida (ex.: uma latência em segundos)."""
+        key = _series_key(name, labels)
+        with self._lock:
+            summary = self._summaries.get(key)
+            if summary is None:
+                summary = self._summaries[key] = _Summary()
+            summary.observe(value)
+
+    def counter_value(self, name: str, **labels: Any) -> float:
+        """Soma das séries de um contador que têm os rótulos informados."""
+        wanted = {(key, str(value)) for key, value in labels.items()}
+        with self._lock:
+            return sum(
+                value for (series_name, series_labels), value in self._counters.items()
+                if series_name == name and wanted <= set(series_labels)
+            )
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        """
+        Mede um trecho da execução. Trechos abertos dentro dele (inclusive em tarefas criadas
+        dentro do bloco) ficam registrados como filhos.
+        """
+        parent = _current_span.get()
+        span = Span(name, parent.span_id if parent is not None else None, **attributes)
+        token = _current_span.set(span)
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.set("error", type(e).__name__)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.duration = time.perf_counter() - started
+            self._finish(span)
+
+    def record_span(self, name: str, duration: float, parent_id: Optional[str] = None, **attributes: Any) -> Span:
+        """Registra um trecho já medido (ex.: um evento de um lote enriquecido de uma só vez)."""
+        span = Span(name, parent_id, **attributes)
+        span.start -= duration
+        span.duration = duration
+        self._finish(span)
+        return span
+
+    def _finish(self, span: Span) -> None:
+        self.observe(f"{span.name}_duration_seconds", span.duration)
+        if self._trace_file is not None:
+            line = json.dumps(span.to_dict(), ensure_ascii=False, default=str) + "\n"
+            with self._lock:
+                if not self._trace_file.closed:
+                    self._trace_file.write(line)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Retorna todas as métricas em um dicionário serializável em JSON."""
+        def grouped(series: Dict[_SeriesKey, Any], render) -> Dict[str, List[Dict[str, Any]]]:
+            result: Dict[str, List[Dict[str, Any]]] = {}
+            for (name, labels), value in sorted(series.items()):
+                result.setdefault(name, []).append({"labels": dict(labels), **render(value)})
+            return result
+
+        def render_summary(summary: _Summary) -> Dict[str, Any]:
+            data = {"count": summary.count, "sum": summary.sum, "max": summary.max}
+            data.update({f"p{int(q * 100)}": summary.quantile(q) for q in QUANTILES})
+            return data
+
+        with self._lock:
+            return {
+                "generated_at": time.time(),
+                "counters": grouped(self._counters, lambda value: {"value": value}),
+                "gauges": grouped(self._gauges, lambda value: {"value": value}),
+                "summaries": grouped(self._summaries, render_summary),
+            }
+
+    def to_prometheus(self) -> str:
+        """Retorna as métricas no formato texto de exposição do Prometheus."""
+        lines: List[str] = []
+        with self._lock:
+            for kind, series in (("counter", self._counters), ("gauge", self._gauges)):
+                current = None
+                for (name, labels), value in sorted(series.items()):
+                    if name != current:
+                        lines.append(f"# TYPE {name} {kind}")
+                        current = name
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+            current = None
+            for (name, labels), summary in sorted(self._summaries.items()):
+                if name != current:
+                    lines.append(f"# TYPE {name} summary")
+                    current = name
+                for q in QUANTILES:
+                    value = summary.quantile(q)
+                    if value is not None:
+                        lines.append(f"{name}{_format_labels(labels, (('quantile', str(q)),))} {value}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {summary.sum}")
+                lines.append(f"{name}_count{_format_labels(labels)} {summary.count}")
+        return "\n".join(lines) + "\n"
+
+    def export_json(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=4)
+        logger.info(f"Métricas da execução salvas em '{path}'.")
+
+    def export_prometheus(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        logger.info(f"Métricas da execução (formato Prometheus) salvas em '{path}'.")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._trace_file is not None and not self._trace_file.closed:
+                self._trace_file.close()
+
+
+_default_registry: Optional[MetricsRegistry] = None
+
+
+def get_metrics() -> MetricsRegistry:
+    """Retorna o registro de métricas compartilhado, criando-o (sem arquivo de rastreamento) se necessário."""
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = MetricsRegistry()
+    return _default_registry
+
+
+def configure_metrics(registry: MetricsRegistry) -> None:
+    """Substitui o registro de métricas compartilhado (ex.: para gravar o rastreamento em arquivo)."""
+    global _default_registry
+    _default_registry = registry
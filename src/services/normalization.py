@@ -0,0 +1,132 @@
+# src/services/normalization.py
+
+import datetime
+import re
+import unicodedata
+from typing import List, Optional
+
+MESES = {
+    "jan": 1, "fev": 2, "mar": 3, "abr": 4, "mai": 5, "jun": 6,
+    "jul": 7, "ago": 8, "set": 9, "out": 10, "nov": 11, "dez": 12,
+}
+
+_ISO_DATE_PATTERN = re.compile(r'(?<!\d)(\d{4})-(\d{1,2})-(\d{1,2})(?!\d)')
+_NUMERIC_DATE_PATTERN = re.compile(r'(?<!\d)(\d{1,2})/(\d{1,2})(?:/(\d{4}|\d{2}))?(?![\d/])')
+_TEXT_DATE_PATTERN = re.compile(
+    r'(?<!\d)(?:(\d{1,2})\s*(?:a|e|ate|-)\s*)?(\d{1,2})o?\s*(?:de\s+)?'
+    r'(jan|fev|mar|abr|mai|jun|jul|ago|set|out|nov|dez)[a-z]*\.?'
+    r'(?:\s*(?:de\s+)?(\d{4}))?'
+)
+
+# Valores em reais: "R$ 1.250,50", "R$ 80", "50.00". Com "R$" no texto, só os valores precedidos por ele contam.
+_PRICE_PATTERN = re.compile(r'(?<![\d.,])(\d{1,3}(?:\.\d{3})+|\d+)(?:[,.](\d{1,2}))?(?![\d])')
+_CURRENCY_PRICE_PATTERN = re.compile(r'r\$\s*(\d{1,3}(?:\.\d{3})+|\d+)(?:[,.](\d{1,2}))?(?![\d])')
+_FREE_PATTERN = re.compile(r'\b(?:gratuit[oa]s?|gratis|free|entrada (?:franca|livre)|sem custo)\b')
+# Horários: "21h", "21h30", "20:00", "às 20 horas".
+_TIME_PATTERN = re.compile(r'(?<!\d)([01]?\d|2[0-3])\s*(?:h|:|horas?)\s*([0-5]\d)?(?!\d)')
+
+
+def strip_accents(text: str) -> str:
+    """Remove acentos e cedilhas de um texto."""
+    return ''.join(
+        c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c)
+    )
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """
+    Normaliza um texto para comparação: minúsculas, sem acentos, sem pontuação e com
+    espaços colapsados. Retorna uma string vazia para valores vazios.
+    """
+    if not text:
+        return ""
+    text = strip_accents(text.lower())
+    text = re.sub(r'[^a-z0-9]+', ' ', text)
+    return text.strip()
+
+
+def _build_date(year: Optional[int], month: int, day: int, reference: datetime.date) -> Optional[datetime.date]:
+    """Monta uma data; sem ano, assume o ano de referência (ou o seguinte, se a data já passou há meses)."""
+    try:
+        if year is None:
+            candidate = datetime.date(reference.year, month, day)
+            if (reference - candidate).days > 180:
+                candidate = datetime.date(reference.year + 1, month, day)
+            return candidate
+        if year < 100:
+            year += 2000
+        return datetime.date(year, month, day)
+    except ValueError:
+        return None
+
+
+def parse_event_dates(text: Optional[str], reference: Optional[datetime.date] = None) -> List[datetime.date]:
+    """
+    Extrai as datas de um texto livre como o de `datas_do_evento`.
+
+    Reconhece os formatos mais comuns nas agendas: ISO (2025-08-15), numérico (15/08/2025, 15/08)
+    e por extenso (15 de agosto de 2025, 15 ago, 15 a 17 de agosto).
+
+    Args:
+        text (Optional[str]): O texto com as datas.
+        reference (Optional[datetime.date]): Data usada para inferir o ano quando ele não é informado.
+                                             Padrão: hoje.
+
+    Returns:
+        List[datetime.date]: As datas encontradas, ordenadas e sem repetição.
+    """
+    if not text:
+        return []
+    reference = reference or datetime.date.today()
+    normalized = strip_accents(text.lower())
+    dates = []
+
+    for match in _ISO_DATE_PATTERN.finditer(normalized):
+        dates.append(_build_date(int(match.group(1)), int(match.group(2)), int(match.group(3)), reference))
+    normalized = _ISO_DATE_PATTERN.sub(' ', normalized)
+
+    for match in _NUMERIC_DATE_PATTERN.finditer(normalized):
+        year = int(match.group(3)) if match.group(3) else None
+        dates.append(_build_date(year, int(match.group(2)), int(match.group(1)), reference))
+
+    for match in _TEXT_DATE_PATTERN.finditer(normalized):
+        month = MESES[match.group(3)]
+        year = int(match.group(4)) if match.group(4) else None
+        if match.group(1):
+            dates.append(_build_date(year, month, int(match.group(1)), reference))
+        dates.append(_build_date(year, month, int(match.group(2)), reference))
+
+    return sorted({d for d in dates if d is not None})
+
+
+def parse_prices(text: Optional[str]) -> List[float]:
+    """
+    Extrai os valores em reais de um texto livre como o de `Ingresso.valor`.
+
+    Reconhece "R$ 1.250,50", "R$ 80 a R$ 120", "50.00" e ingressos gratuitos ("Gratuito", "Entrada franca"),
+    que valem 0. Se o texto tiver "R$", números sem o símbolo (ex.: "10x", "1º lote") são ignorados.
+
+    Returns:
+        List[float]: Os valores encontrados, ordenados e sem repetição.
+    """
+    if not text:
+        return []
+    normalized = strip_accents(text.lower())
+    pattern = _CURRENCY_PRICE_PATTERN if "r$" in normalized else _PRICE_PATTERN
+    prices = {
+        float(match.group(1).replace(".", "") + "." + (match.group(2) or "0").ljust(2, "0"))
+        for match in pattern.finditer(normalized)
+    }
+    if _FREE_PATTERN.search(normalized):
+        prices.add(0.0)
+    return sorted(prices)
+
+
+def parse_event_time(text: Optional[str]) -> Optional[datetime.time]:
+    """Extrai o primeiro horário de um texto livre como o de `horario_do_evento` ("21h", "20:30", "às 20 horas")."""
+    if not text:
+        return None
+    match = _TIME_PATTERN.search(strip_accents(text.lower()))
+    if match is None:
+        return None
+    return datetime.time(int(match.group(1)), int(match.group(2) or 0))
@@ -0,0 +1,203 @@
+# src/services/page_cache.py
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import requests
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (compatible; PoC-Ecad-IA/0.1)",
+}
+
+
+def normalize_page_content(html: str) -> str:
+    """
+    Normaliza o HTML de uma página para comparação entre execuções.
+
+    Remove scripts, estilos e demais elementos não visíveis (onde costumam ficar tokens e nonces
+    que mudam a cada requisição), mantendo apenas o texto visível com espaços colapsados.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(["script", "style", "noscript", "template", "svg", "iframe"]):
+        tag.decompose()
+    text = soup.get_text(" ", strip=True)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def content_hash(html: str) -> str:
+    """Retorna o hash SHA-256 do conteúdo normalizado de uma página."""
+    return hashlib.sha256(normalize_page_content(html).encode("utf-8")).hexdigest()
+
+
+@dataclass
+class PageCacheEntry:
+    """Estado guardado de uma URL: validadores HTTP, hash do conteúdo e eventos extraídos."""
+    url: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    content_hash: Optional[str]
+    events: List[Dict[str, Any]]
+    scraped_at: float
+
+
+@dataclass
+class PageCheck:
+    """Resultado da verificação de uma página antes da raspagem."""
+    unchanged: bool
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_hash: Optional[str] = None
+    html: Optional[str] = None
+
+
+class PageCache:
+    """
+    Cache persistente (SQLite) das páginas de agenda já raspadas.
+
+    Para cada URL guarda o ETag, o Last-Modified, o hash do conteúdo normalizado e a lista de
+    eventos extraída pelo Scrapegraph AI. Antes de raspar, `check` faz uma requisição condicional
+    (If-None-Match / If-Modified-Since); se o servidor responder 304 ou o conteúdo normalizado não
+    tiver mudado, a lista de eventos guardada pode ser reaproveitada sem abrir o navegador nem chamar o LLM.
+
+    Também guarda os eventos extraídos de cada bloco de evento da página (ver `page_chunker`), pelo
+    hash do bloco: quando a página muda, só os blocos alterados voltam para o LLM.
+    """
+    def __init__(self, db_path: str = "cache/page_cache.sqlite3", prompt_version: str = "1",
+                 max_age_seconds: float = 7 * 24 * 3600, timeout: float = 20):
+        """
+        Inicializa o cache.
+
+        Args:
+            db_path (str): Caminho do arquivo SQLite. Use ":memory:" para um cache apenas em memória.
+            prompt_version (str): Versão do prompt de raspagem. Entradas de outra versão são ignoradas.
+            max_age_seconds (float): Idade máxima de uma extração reaproveitada, mesmo com a página inalterada.
+            timeout (float): Timeout (em segundos) da requisição condicional.
+        """
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.db_path = db_path
+        self.prompt_version = prompt_version
+        self.max_age_seconds = max_age_seconds
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS page_cache ("
+                " url TEXT PRIMARY KEY,"
+                " prompt_version TEXT NOT NULL,"
+                " etag TEXT,"
+                " last_modified TEXT,"
+                " content_hash TEXT,"
+                " events TEXT NOT NULL,"
+                " scraped_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS chunk_cache ("
+                " chunk_hash TEXT NOT NULL,"
+                " prompt_version TEXT NOT NULL,"
+                " events TEXT NOT NULL,"
+                " scraped_at REAL NOT NULL,"
+                " PRIMARY KEY (chunk_hash, prompt_version))"
+            )
+            # Blocos de páginas que mudaram deixam de ser consultados; descarta os expirados.
+            self._conn.execute("DELETE FROM chunk_cache WHERE scraped_at < ?", (time.time() - max_age_seconds,))
+
+    def get(self, url: str) -> Optional[PageCacheEntry]:
+        """Retorna a entrada válida de uma URL, ou None se não houver (ou estiver expirada)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, content_hash, events, scraped_at FROM page_cache"
+                " WHERE url = ? AND prompt_version = ?",
+                (url, self.prompt_version),
+            ).fetchone()
+        if row is None or time.time() - row[4] > self.max_age_seconds:
+            return None
+        return PageCacheEntry(url, row[0], row[1], row[2], json.loads(row[3]), row[4])
+
+    def set(self, url: str, events: List[Dict[str, Any]], etag: Optional[str] = None,
+            last_modified: Optional[str] = None, content_hash: Optional[str] = None) -> None:
+        """Grava os validadores e a lista de eventos extraída de uma URL."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO page_cache"
+                " (url, prompt_version, etag, last_modified, content_hash, events, scraped_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, self.prompt_version, etag, last_modified, content_hash,
+                 json.dumps(events, ensure_ascii=False), time.time()),
+            )
+
+    def get_chunk(self, chunk_hash: str) -> Optional[List[Dict[str, Any]]]:
+        """Retorna os eventos extraídos de um bloco de página pelo seu hash, ou None se não houver (ou estiver expirado)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT events, scraped_at FROM chunk_cache WHERE chunk_hash = ? AND prompt_version = ?",
+                (chunk_hash, self.prompt_version),
+            ).fetchone()
+        if row is None or time.time() - row[1] > self.max_age_seconds:
+            return None
+        return json.loads(row[0])
+
+    def set_chunk(self, chunk_hash: str, events: List[Dict[str, Any]]) -> None:
+        """Grava os eventos extraídos de um bloco de página."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chunk_cache (chunk_hash, prompt_version, events, scraped_at)"
+                " VALUES (?, ?, ?, ?)",
+                (chunk_hash, self.prompt_version, json.dumps(events, ensure_ascii=False), time.time()),
+            )
+
+    def check(self, url: str, entry: Optional[PageCacheEntry]) -> PageCheck:
+        """
+        Verifica (de forma síncrona) se a página mudou desde a última raspagem.
+
+        Args:
+            url (str): A URL da página.
+            entry (Optional[PageCacheEntry]): A entrada em cache da URL, se houver.
+
+        Returns:
+            PageCheck: `unchanged=True` se a extração guardada pode ser reaproveitada. Os validadores
+                       e o hash retornados devem ser gravados junto com a nova extração.
+        """
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"AVISO: Não foi possível verificar se {url} mudou ({e}). A página será raspada.")
+            return PageCheck(unchanged=False)
+
+        if response.status_code == 304 and entry is not None:
+            return PageCheck(True, entry.etag, entry.last_modified, entry.content_hash)
+        if response.status_code != 200:
+            return PageCheck(unchanged=False)
+
+        page_hash = content_hash(response.text)
+        return PageCheck(
+            unchanged=entry is not None and entry.content_hash == page_hash,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            content_hash=page_hash,
+            html=response.text,
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
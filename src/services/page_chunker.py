@@ -0,0 +1,228 @@
+# src/services/page_chunker.py
+
+import datetime
+import hashlib
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import html2text
+from bs4 import BeautifulSoup, Tag
+
+from src.services.normalization import normalize_text, parse_event_dates
+from src.services.rate_limiter import estimate_tokens
+
+# Elementos que nunca contêm eventos e só ocupam tokens.
+_BOILERPLATE_TAGS = [
+    "script", "style", "noscript", "template", "svg", "iframe", "canvas",
+    "nav", "aside", "form", "button", "input", "select", "textarea",
+]
+# Cabeçalhos e rodapés da página (os que ficam dentro de um card de evento são mantidos).
+_PAGE_SECTION_TAGS = ["header", "footer"]
+_BOILERPLATE_ROLES = {"navigation", "banner", "contentinfo", "search", "complementary", "dialog"}
+# Classes e ids típicos de menus, anúncios, avisos de cookies, compartilhamento etc.
+_BOILERPLATE_ATTR_PATTERN = re.compile(
+    r'(?:^|[-_\s])(?:nav|navbar|menu|footer|cookies?|lgpd|newsletter|ads?|advert\w*|publicidade|anuncios?'
+    r'|social|share|compartilh\w*|breadcrumbs?|sidebar|modal|popup)(?:$|[-_\s])',
+    re.IGNORECASE,
+)
+_KEEP_TAGS = {"html", "body", "main"}
+
+
+def _is_boilerplate(tag: Tag) -> bool:
+    if tag.name in _KEEP_TAGS:
+        return False
+    if tag.get("role") in _BOILERPLATE_ROLES or tag.get("aria-hidden") == "true":
+        return True
+    attributes = " ".join(tag.get("class", [])) + " " + (tag.get("id") or "")
+    return bool(_BOILERPLATE_ATTR_PATTERN.search(attributes))
+
+
+def reduce_html(html: str) -> BeautifulSoup:
+    """
+    Remove do HTML o que não é conteúdo: scripts, estilos, navegação, cabeçalho e rodapé da página,
+    formulários, anúncios, avisos de cookies e botões de compartilhamento.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    removable = soup(_BOILERPLATE_TAGS)
+    removable += [tag for tag in soup(_PAGE_SECTION_TAGS) if tag.find_parent(["article", "li"]) is None]
+    removable += [tag for tag in soup.find_all(True) if _is_boilerplate(tag)]
+    for tag in removable:
+        # Elementos dentro de outro já removido foram descartados junto com ele.
+        if not tag.decomposed:
+            tag.decompose()
+    return soup
+
+
+def html_to_markdown(html: str, base_url: str = "") -> str:
+    """Converte HTML em Markdown (mantendo links e imagens, usados nos flyers)."""
+    converter = html2text.HTML2Text(baseurl=base_url)
+    converter.body_width = 0
+    converter.ignore_images = False
+    converter.ignore_links = False
+    return converter.handle(html).strip()
+
+
+def _signature(tag: Tag) -> Tuple[int, str, Tuple[str, ...]]:
+    return id(tag.parent), tag.name, tuple(sorted(tag.get("class", [])))
+
+
+def split_event_chunks(soup: BeautifulSoup, min_repeats: int = 3) -> List[Tag]:
+    """
+    Divide uma página de agenda em blocos, um por evento.
+
+    Procura o maior grupo de elementos irmãos com a mesma tag e as mesmas classes (os "cards" da
+    agenda) em que a maioria contém uma data. Em agendas agrupadas por dia, cada bloco é um dia.
+
+    Returns:
+        List[Tag]: Os blocos encontrados, ou lista vazia se a página não tiver uma estrutura repetida.
+    """
+    groups: Dict[Tuple[int, str, Tuple[str, ...]], List[Tag]] = defaultdict(list)
+    for tag in soup.find_all(True):
+        if tag.parent is not None and tag.name not in _KEEP_TAGS:
+            groups[_signature(tag)].append(tag)
+
+    best, best_score = [], (0, 0)
+    for members in groups.values():
+        if len(members) < min_repeats:
+            continue
+        texts = [member.get_text(" ", strip=True) for member in members]
+        dated = sum(1 for text in texts if parse_event_dates(text))
+        if dated < min_repeats or dated * 2 < len(members):
+            continue
+        score = (dated, sum(len(text) for text in texts))
+        if score > best_score:
+            best, best_score = members, score
+    return best
+
+
+@dataclass
+class PageChunk:
+    """Bloco de uma página enviado à extração: o HTML, o Markdown equivalente e seu hash."""
+    html: str
+    markdown: str
+    hash: str
+    dates: List[datetime.date] = field(default_factory=list)
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.markdown)
+
+
+@dataclass
+class ChunkedPage:
+    """
+    Resultado da divisão de uma página: os blocos na janela de datas, quantos foram descartados,
+    a estimativa de tokens da página inteira e se a lista de eventos foi reconhecida.
+    """
+    chunks: List[PageChunk]
+    dropped: int
+    page_tokens: int
+    structured: bool = True
+
+
+def in_date_window(dates: List[datetime.date], start: datetime.date, end: datetime.date) -> bool:
+    """Indica se um bloco pertence à janela [start, end]. Blocos sem data reconhecida são mantidos."""
+    if not dates:
+        return True
+    if any(start <= d <= end for d in dates):
+        return True
+    # Temporadas que começaram antes e terminam depois da janela.
+    return dates[0] < start and dates[-1] > end
+
+
+def chunk_hash(markdown: str) -> str:
+    """Hash SHA-256 do conteúdo de um bloco, com espaços colapsados."""
+    return hashlib.sha256(re.sub(r"\s+", " ", markdown).strip().encode("utf-8")).hexdigest()
+
+
+def chunk_page(html: str, base_url: str, window_start: datetime.date, window_end: datetime.date,
+               min_repeats: int = 3) -> ChunkedPage:
+    """
+    Reduz uma página de agenda e a divide em blocos de evento dentro da janela de datas.
+
+    Se a página não tiver uma estrutura repetida reconhecível, o conteúdo reduzido inteiro vira
+    um único bloco (ainda assim menor que a página original).
+
+    Args:
+        html (str): O HTML da página.
+        base_url (str): A URL da página, para resolver links relativos.
+        window_start (datetime.date): Início da janela de datas dos eventos.
+        window_end (datetime.date): Fim da janela de datas dos eventos.
+        min_repeats (int): Mínimo de elementos repetidos com data para reconhecer a lista de eventos.
+
+    Returns:
+        ChunkedPage: Os blocos mantidos, quantos foram descartados pela data e a estimativa de
+                     tokens da página inteira convertida em Markdown.
+    """
+    page_tokens = estimate_tokens(html_to_markdown(html, base_url))
+    soup = reduce_html(html)
+    elements = split_event_chunks(soup, min_repeats)
+    if not elements:
+        content = soup.body.decode_contents() if soup.body else str(soup)
+        markdown = html_to_markdown(content, base_url)
+        chunk = PageChunk(content, markdown, chunk_hash(markdown))
+        return ChunkedPage([chunk] if markdown else [], 0, page_tokens, structured=False)
+
+    chunks, dropped = [], 0
+    for element in elements:
+        markdown = html_to_markdown(str(element), base_url)
+        if not markdown:
+            continue
+        dates = parse_event_dates(element.get_text(" ", strip=True), reference=window_start)
+        if not in_date_window(dates, window_start, window_end):
+            dropped += 1
+            continue
+        chunks.append(PageChunk(str(element), markdown, chunk_hash(markdown), dates))
+    return ChunkedPage(chunks, dropped, page_tokens)
+
+
+def pack_chunks(chunks: List[PageChunk], max_tokens: int) -> List[List[PageChunk]]:
+    """
+    Agrupa os blocos, na ordem da página, em lotes de até `max_tokens` tokens de conteúdo, para que
+    cada lote seja extraído em uma única requisição (o prompt e o schema vão uma vez por lote).
+    Um bloco maior que o limite forma um lote sozinho.
+    """
+    packs: List[List[PageChunk]] = []
+    current: List[PageChunk] = []
+    current_tokens = 0
+    for chunk in chunks:
+        if current and current_tokens + chunk.tokens > max_tokens:
+            packs.append(current)
+            current, current_tokens = [], 0
+        current.append(chunk)
+        current_tokens += chunk.tokens
+    if current:
+        packs.append(current)
+    return packs
+
+
+def assign_events_to_chunks(chunks: List[PageChunk], events: List[Any]) -> Optional[List[List[Any]]]:
+    """
+    Distribui os eventos extraídos de um lote entre os blocos de origem, para que cada bloco seja
+    guardado no cache pelo próprio hash. Um evento pertence ao bloco cujo texto contém o seu nome;
+    entre vários, ao que também tem a sua data.
+
+    Returns:
+        Optional[List[List[Any]]]: Os eventos de cada bloco, na ordem dos blocos, ou None se algum
+                                   evento não pôde ser associado a um bloco.
+    """
+    if len(chunks) == 1:
+        return [list(events)]
+    texts = [normalize_text(chunk.markdown) for chunk in chunks]
+    assigned: List[List[Any]] = [[] for _ in chunks]
+    for event in events:
+        name = normalize_text(event.get("nome_do_evento")) if isinstance(event, dict) else ""
+        candidates = [index for index, text in enumerate(texts) if name and f" {name} " in f" {text} "]
+        if not candidates:
+            return None
+        event_dates = set(parse_event_dates(event.get("datas_do_evento")))
+        dated = [index for index in candidates if event_dates & set(chunks[index].dates)]
+        assigned[(dated or candidates)[0]].append(event)
+    return assigned
+
+
+def wrap_chunks_html(chunks: List[PageChunk]) -> str:
+    """Monta um documento HTML completo (`<html><body>`) com os blocos, como o SmartScraperGraph espera de uma fonte local."""
+    return "<html><body>" + "\n".join(chunk.html for chunk in chunks) + "</body></html>"
@@ -0,0 +1,282 @@
+# src/services/rate_limiter.py
+
+import asyncio
+import email.utils
+import logging
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+import requests
+
+from src.services.metrics import get_metrics
+
+try:
+    import httpx
+except ImportError:  # O httpx só está presente com o cliente da OpenAI.
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+# Códigos HTTP que justificam uma nova tentativa. Apenas o 429 reduz a concorrência do provedor.
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Falhas de rede transitórias (conexão recusada ou reiniciada, timeout). As do requests e do httpx
+# não herdam das exceções nativas `ConnectionError`/`TimeoutError` e precisam ser listadas.
+TRANSIENT_ERRORS: Tuple[type, ...] = (
+    TimeoutError, asyncio.TimeoutError, ConnectionError,
+    requests.exceptions.ConnectionError, requests.exceptions.Timeout, requests.exceptions.ChunkedEncodingError,
+)
+if httpx is not None:
+    TRANSIENT_ERRORS += (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)
+
+
+class RetriesExhaustedError(Exception):
+    """Todas as tentativas de uma chamada a um provedor falharam por limite de taxa ou erro transitório."""
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    """Extrai o código HTTP de exceções do requests, da OpenAI (httpx) e do google.api_core."""
+    for candidate in (getattr(exc, "status_code", None), getattr(exc, "code", None)):
+        if isinstance(candidate, int):
+            return candidate
+    response = getattr(exc, "response", None)
+    status = getattr(response, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def _retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """Lê o cabeçalho Retry-After (em segundos ou data HTTP) da resposta associada à exceção."""
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    value = headers.get("Retry-After") if headers is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        parsed = email.utils.parsedate_to_datetime(value)
+    except (ValueError, TypeError):
+        # Cabeçalho malformado: usa o backoff padrão sem esconder o erro original.
+        return None
+    return max(0.0, parsed.timestamp() - time.time()) if parsed else None
+
+
+def classify_error(exc: BaseException) -> Tuple[bool, bool, Optional[float]]:
+    """
+    Classifica uma exceção de um provedor.
+
+    Returns:
+        Tuple[bool, bool, Optional[float]]: (pode tentar de novo, é limitação de taxa, Retry-After em segundos).
+    """
+    message = str(exc).lower()
+    # Falta de créditos na OpenAI também chega como 429, mas esperar não resolve.
+    if "insufficient_quota" in message:
+        return False, False, None
+    status = _status_code(exc)
+    if status is None:
+        if "429" in message or "rate limit" in message or "resource has been exhausted" in message:
+            status = 429
+        elif isinstance(exc, TRANSIENT_ERRORS):
+            return True, False, None
+    if status not in RETRYABLE_STATUS_CODES:
+        return False, False, None
+    return True, status == 429, _retry_after_seconds(exc)
+
+
+def backoff_delay(attempt: int, base_delay: float = 1.0, max_delay: float = 60.0,
+                  retry_after: Optional[float] = None) -> float:
+    """
+    Calcula a espera antes da próxima tentativa: backoff exponencial com jitter ("equal jitter"),
+    nunca menor que o Retry-After informado pelo provedor.
+    """
+    ceiling = min(max_delay, base_delay * (2 ** attempt))
+    delay = ceiling / 2 + random.uniform(0, ceiling / 2)
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+class TokenBucket:
+    """
+    Balde de fichas com reposição contínua, para limites "por minuto".
+
+    Usa reserva: quem chega desconta as fichas imediatamente (o saldo pode ficar negativo) e
+    dorme o tempo necessário para o saldo voltar a zero. Assim não precisa de travas e
+    preserva a ordem de chegada.
+    """
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self._tokens = float(per_minute)
+        self._updated_at = time.monotonic()
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        amount = min(float(amount), self.capacity)
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+        self._tokens -= amount
+        if self._tokens < 0:
+            await asyncio.sleep(-self._tokens / self.rate)
+
+
+class ProviderLimiter:
+    """
+    Controle de taxa de um provedor (OpenAI, Gemini, Brasil API).
+
+    Combina um balde de requisições por minuto, um balde opcional de tokens por minuto e um
+    limite adaptativo de chamadas simultâneas: a cada limitação (429) a concorrência cai pela
+    metade e, a cada sequência de sucessos, volta a subir uma unidade (AIMD). `call` aplica
+    tudo isso e repete a chamada com backoff exponencial com jitter, respeitando o Retry-After.
+    """
+    def __init__(self, name: str, requests_per_minute: float, tokens_per_minute: Optional[float] = None,
+                 max_concurrency: int = 8, min_concurrency: int = 1, max_retries: int = 5,
+                 base_delay: float = 1.0, max_delay: float = 60.0):
+        """
+        Inicializa o limitador.
+
+        Args:
+            name (str): Nome do provedor, usado nos logs.
+            requests_per_minute (float): Máximo de requisições por minuto.
+            tokens_per_minute (Optional[float]): Máximo de tokens por minuto (None = sem limite de tokens).
+            max_concurrency (int): Máximo de chamadas simultâneas (e valor inicial do limite adaptativo).
+            min_concurrency (int): Mínimo de chamadas simultâneas sob limitação.
+            max_retries (int): Número máximo de novas tentativas por chamada.
+            base_delay (float): Espera base (segundos) do backoff exponencial.
+            max_delay (float): Espera máxima (segundos) entre tentativas.
+        """
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.concurrency_limit = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.throttled = 0
+        self.retries = 0
+        self._in_use = 0
+        self._successes_since_change = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    async def _enter(self) -> None:
+        while self._in_use >= self.concurrency_limit:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        self._in_use += 1
+
+    def _exit(self) -> None:
+        self._in_use -= 1
+        self._wake_waiters()
+
+    def _wake_waiters(self) -> None:
+        free_slots = self.concurrency_limit - self._in_use
+        while free_slots > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free_slots -= 1
+
+    def record_throttle(self) -> None:
+        """Registra uma limitação (429) e reduz a concorrência pela metade."""
+        self.throttled += 1
+        get_metrics().increment("rate_limiter_throttled_total", provider=self.name)
+        self._successes_since_change = 0
+        new_limit = max(self.min_concurrency, self.concurrency_limit // 2)
+        if new_limit != self.concurrency_limit:
+            logger.warning(f"AVISO: {self.name} limitando requisições. Concorrência reduzida para {new_limit}.")
+            self.concurrency_limit = new_limit
+
+    def record_success(self) -> None:
+        """Registra um sucesso; após `concurrency_limit` sucessos seguidos a concorrência sobe uma unidade."""
+        self._successes_since_change += 1
+        if self.concurrency_limit < self.max_concurrency and self._successes_since_change >= self.concurrency_limit:
+            self.concurrency_limit += 1
+            self._successes_since_change = 0
+            self._wake_waiters()
+
+    async def call(self, func: Callable[..., Awaitable[Any]], *args: Any, tokens: float = 0, **kwargs: Any) -> Any:
+        """
+        Executa `await func(*args, **kwargs)` respeitando os limites do provedor e repetindo a
+        chamada em caso de limitação de taxa ou erro transitório.
+
+        Args:
+            func (Callable[..., Awaitable[Any]]): A função assíncrona a ser chamada (ex.: `asyncio.to_thread`).
+            tokens (float): Estimativa de tokens consumidos pela chamada, para o limite de tokens por minuto.
+
+        Raises:
+            RetriesExhaustedError: Se todas as tentativas falharem por limitação ou erro transitório.
+            Exception: Erros não transitórios são propagados imediatamente.
+        """
+        for attempt in range(self.max_retries + 1):
+            await self.requests.acquire()
+            if self.tokens is not None and tokens:
+                await self.tokens.acquire(tokens)
+            await self._enter()
+            try:
+                result = await func(*args, **kwargs)
+            except Exception as e:
+                retryable, throttled, retry_after = classify_error(e)
+                if not retryable:
+                    raise
+                if throttled:
+                    self.record_throttle()
+                if attempt == self.max_retries:
+                    raise RetriesExhaustedError(
+                        f"{self.name}: {self.max_retries + 1} tentativas falharam. Último erro: {e}"
+                    ) from e
+                delay = backoff_delay(attempt, self.base_delay, self.max_delay, retry_after)
+                self.retries += 1
+                get_metrics().increment("rate_limiter_retries_total", provider=self.name)
+                logger.warning(
+                    f"AVISO: {self.name} falhou ({e}). Nova tentativa {attempt + 1}/{self.max_retries} em {delay:.1f}s."
+                )
+            else:
+                self.record_success()
+                return result
+            finally:
+                self._exit()
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency_limit": self.concurrency_limit,
+            "throttled": self.throttled,
+            "retries": self.retries,
+        }
+
+
+_limiters: Dict[str, ProviderLimiter] = {}
+
+# Limites padrão, conservadores, por provedor. Ajuste com `configure_rate_limiters` conforme a cota da conta.
+DEFAULT_LIMITS: Dict[str, Dict[str, Any]] = {
+    "openai": {"requests_per_minute": 60, "tokens_per_minute": 200_000, "max_concurrency": 4},
+    "gemini": {"requests_per_minute": 60, "tokens_per_minute": 1_000_000, "max_concurrency": 8},
+    "brasilapi": {"requests_per_minute": 180, "max_concurrency": 8},
+}
+
+
+def get_rate_limiter(provider: str) -> ProviderLimiter:
+    """Retorna o limitador compartilhado de um provedor ('openai', 'gemini' ou 'brasilapi')."""
+    if provider not in _limiters:
+        _limiters[provider] = ProviderLimiter(provider, **DEFAULT_LIMITS.get(provider, {"requests_per_minute": 60}))
+    return _limiters[provider]
+
+
+def configure_rate_limiters(**limiters: ProviderLimiter) -> None:
+    """Substitui os limitadores compartilhados (ex.: `configure_rate_limiters(gemini=ProviderLimiter(...))`)."""
+    _limiters.update(limiters)
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa grosseira de tokens de um texto (~4 caracteres por token)."""
+    return max(1, len(text) // 4)
@@ -0,0 +1,137 @@
+# src/services/rule_enricher.py
+
+import logging
+import re
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from src.models.Evento import Evento
+from src.models.Local import LocalDoEvento
+from src.models.Promotor import Promotor
+from src.services.cnpj_lookup import get_cnpj_service
+
+logger = logging.getLogger(__name__)
+
+# CNPJ formatado (00.000.000/0000-00) ou apenas com os 14 dígitos.
+CNPJ_PATTERN = re.compile(r'(?<!\d)(\d{2}\.?\d{3}\.?\d{3}/?\d{4}-?\d{2})(?!\d)')
+
+_NON_DIGIT_PATTERN = re.compile(r'\D')
+
+# Indícios de que o texto menciona um CNPJ, mesmo que não esteja em um formato reconhecível.
+CNPJ_HINT_PATTERN = re.compile(r'cnpj|\d{2}\.\d{3}\.\d{3}|\d{3,}/\d{4}', re.IGNORECASE)
+
+_CNPJ_WEIGHTS_1 = (5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2)
+_CNPJ_WEIGHTS_2 = (6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2)
+
+
+def _check_digit(digits: str, weights: Tuple[int, ...]) -> int:
+    remainder = sum(int(d) * w for d, w in zip(digits, weights)) % 11
+    return 0 if remainder < 2 else 11 - remainder
+
+
+def is_valid_cnpj(cnpj: Optional[str]) -> bool:
+    """Valida um CNPJ (com ou sem formatação) pelos dígitos verificadores."""
+    if not cnpj:
+        return False
+    digits = _NON_DIGIT_PATTERN.sub('', cnpj)
+    if len(digits) != 14 or digits == digits[0] * 14:
+        return False
+    return (
+        int(digits[12]) == _check_digit(digits[:12], _CNPJ_WEIGHTS_1)
+        and int(digits[13]) == _check_digit(digits[:13], _CNPJ_WEIGHTS_2)
+    )
+
+
+def find_cnpjs(text: Optional[str]) -> List[str]:
+    """Retorna os CNPJs válidos (apenas dígitos, sem repetição) encontrados em um texto."""
+    if not text:
+        return []
+    found = (_NON_DIGIT_PATTERN.sub('', match) for match in CNPJ_PATTERN.findall(text))
+    return list(dict.fromkeys(cnpj for cnpj in found if is_valid_cnpj(cnpj)))
+
+
+def apply_cnpj_data(target: Union[Promotor, LocalDoEvento], cnpj: str, data: Dict[str, Any]) -> None:
+    """
+    Preenche um `Promotor` ou `LocalDoEvento` com os dados da Brasil API.
+    Apenas campos vazios são preenchidos; dados já existentes são mantidos.
+    """
+    target.cnpj = cnpj
+    if not target.nome:
+        target.nome = data.get('nome_fantasia') or data.get('razao_social')
+    if isinstance(target, Promotor):
+        if not target.telefone:
+            target.telefone = data.get('ddd_telefone_1') or data.get('ddd_telefone_2') or None
+        if not target.email:
+            target.email = data.get('email') or None
+
+
+class RuleBasedEnricher:
+    """
+    Enriquecimento determinístico de eventos, sem LLM.
+
+    Procura CNPJs válidos (com dígitos verificadores) no promotor e no local do evento,
+    consulta a Brasil API e preenche `cnpj`, `telefone` e `email` diretamente nos modelos.
+    Um evento é considerado resolvido quando não há nada a enriquecer ou quando todos os
+    CNPJs encontrados tiveram os dados obtidos na Brasil API; caso contrário (inclusive se a
+    consulta falhar), deve seguir para o Gemini.
+    """
+    def __init__(self):
+        self.resolved = 0
+        self.unresolved = 0
+
+    async def enrich(self, event: Evento) -> Tuple[Evento, bool]:
+        """
+        Aplica as regras a um evento.
+
+        Returns:
+            Tuple[Evento, bool]: O evento (uma cópia, se alterado) e se ele foi resolvido pelas regras.
+                                 Eventos não resolvidos devem ser enviados ao Gemini.
+        """
+        targets = [
+            target for target in (event.promotor, event.local_do_evento)
+            if target is not None and (target.nome or target.cnpj)
+        ]
+        if not any(self._needs_work(target) for target in targets):
+            # Caminho rápido: nenhum CNPJ ou indício de CNPJ no evento, nada a enriquecer.
+            self.resolved += 1
+            return event, True
+
+        enriched_event = event.model_copy(deep=True)
+        resolved = True
+        for target in (enriched_event.promotor, enriched_event.local_do_evento):
+            if target is None or not self._needs_work(target):
+                continue
+            candidates = find_cnpjs(target.cnpj) or find_cnpjs(target.nome)
+            if not candidates:
+                # Há indício de CNPJ, mas nenhum número válido: as regras não conseguem resolver.
+                resolved = False
+                continue
+            cnpj = candidates[0]
+            data = await get_cnpj_service().lookup_async(cnpj)
+            if data:
+                apply_cnpj_data(target, cnpj, data)
+            else:
+                # CNPJ válido, porém sem dados (falha na consulta ou CNPJ não encontrado na Brasil API):
+                # guarda ao menos o número e deixa o evento para o Gemini, que pode consultar de novo.
+                target.cnpj = cnpj
+                resolved = False
+
+        if resolved:
+            self.resolved += 1
+        else:
+            self.unresolved += 1
+        return enriched_event, resolved
+
+    @staticmethod
+    def _needs_work(target: Union[Promotor, LocalDoEvento]) -> bool:
+        """Indica se o promotor/local menciona um CNPJ que ainda precisa ser tratado."""
+        if target.cnpj:
+            if not is_valid_cnpj(target.cnpj):
+                return True
+            if isinstance(target, Promotor):
+                return not (target.telefone and target.email)
+            return False
+        return bool(target.nome and CNPJ_HINT_PATTERN.search(target.nome))
+
+    def stats(self) -> Dict[str, int]:
+        """Retorna quantos eventos foram resolvidos pelas regras e quantos precisaram do Gemini."""
+        return {"resolved": self.resolved, "unresolved": self.unresolved}
@@ -0,0 +1,71 @@
+# src/services/url_scheduler.py
+
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+
+def get_domain(url: str) -> str:
+    """Retorna o domínio (sem 'www.') de uma URL, usado como chave do limite por domínio."""
+    netloc = urlparse(url).netloc.lower()
+    return netloc[4:] if netloc.startswith("www.") else netloc
+
+
+class UrlScheduler:
+    """
+    Agenda a execução concorrente de uma tarefa assíncrona para cada URL alvo,
+    respeitando um limite global de concorrência e um limite por domínio.
+
+    Falhas são isoladas por URL: uma exceção em uma URL é registrada no log
+    e não interrompe as demais.
+    """
+    def __init__(self, max_concurrency: int = 4, max_per_domain: int = 1):
+        """
+        Inicializa o agendador.
+
+        Args:
+            max_concurrency (int): Número máximo de URLs processadas simultaneamente.
+            max_per_domain (int): Número máximo de URLs do mesmo domínio processadas simultaneamente.
+        """
+        if max_concurrency < 1 or max_per_domain < 1:
+            raise ValueError("max_concurrency e max_per_domain devem ser maiores ou iguais a 1.")
+        self.max_concurrency = max_concurrency
+        self.max_per_domain = max_per_domain
+        self._global_semaphore = asyncio.Semaphore(max_concurrency)
+        self._domain_semaphores: Dict[str, asyncio.Semaphore] = defaultdict(
+            lambda: asyncio.Semaphore(self.max_per_domain)
+        )
+
+    async def _run_one(self, url: str, task: Callable[[str], Awaitable[Any]]) -> Any:
+        # O semáforo do domínio é adquirido primeiro para que URLs de um mesmo domínio
+        # aguardando a vez não ocupem vagas globais que outros domínios poderiam usar.
+        async with self._domain_semaphores[get_domain(url)]:
+            async with self._global_semaphore:
+                try:
+                    return await task(url)
+                except Exception as e:
+                    logger.error(f"ERRO isolado ao processar a URL {url}: {e}", exc_info=True)
+                    return e
+
+    async def run(self, urls: Iterable[str], task: Callable[[str], Awaitable[Any]]) -> List[Any]:
+        """
+        Executa `task(url)` para cada URL de forma concorrente.
+
+        Args:
+            urls (Iterable[str]): URLs a serem processadas. Duplicatas são ignoradas.
+            task (Callable[[str], Awaitable[Any]]): Corrotina a ser executada para cada URL.
+
+        Returns:
+            List[Any]: Os resultados de cada tarefa, na ordem das URLs. URLs que falharam
+                       têm a exceção correspondente como resultado.
+        """
+        unique_urls = list(dict.fromkeys(urls))
+        logger.info(
+            f"Agendando {len(unique_urls)} URLs (concorrência global: {self.max_concurrency}, "
+            f"por domínio: {self.max_per_domain})."
+        )
+        return await asyncio.gather(*(self._run_one(url, task) for url in unique_urls))
@@ -0,0 +1,70 @@
+# tests/test_deduplicator.py
+
+from src.models.Evento import Evento
+from src.services.deduplicator import EventDeduplicator
+
+
+def _event(nome, data=None, local=None, fonte="Fonte A"):
+    return Evento(
+        nome_do_evento=nome,
+        datas_do_evento=data,
+        local_do_evento={"nome": local} if local else None,
+        fonte_de_divulgacao=fonte,
+    )
+
+
+def _is_new_after(first, second):
+    deduplicator = EventDeduplicator()
+    deduplicator.add(first)
+    return deduplicator.add(second)[1]
+
+
+def test_merges_same_event_from_two_sources():
+    first = _event("Coldplay - Music of the Spheres", "20/11/2026", "Allianz Parque")
+    second = _event("Coldplay: Music of the Spheres", "20/11/2026", "Allianz Parque - São Paulo", fonte="Fonte B")
+    deduplicator = EventDeduplicator()
+    deduplicator.add(first)
+    canonical, is_new = deduplicator.add(second)
+    assert not is_new
+    assert canonical.fonte_de_divulgacao == "Fonte A, Fonte B"
+
+
+def test_short_name_contained_in_longer_name_is_not_merged():
+    assert _is_new_after(
+        _event("Show de Rock", "20/11/2026", "Allianz Parque"),
+        _event("Rock in Rio", "20/11/2026", "Allianz Parque", fonte="Fonte B"),
+    )
+
+
+def test_events_without_date_or_venue_are_not_merged():
+    assert _is_new_after(_event("Jazz"), _event("Noite de Jazz com Ana", fonte="Fonte B"))
+    assert _is_new_after(_event("Jazz"), _event("Jazz", fonte="Fonte B"))
+
+
+def test_missing_venue_on_one_side_is_not_merged():
+    assert _is_new_after(
+        _event("Samba da Vela", "20/11/2026", "Sesc Pompeia"),
+        _event("Samba da Vela", "20/11/2026", fonte="Fonte B"),
+    )
+
+
+def test_different_branches_of_the_same_venue_chain_are_not_merged():
+    assert _is_new_after(
+        _event("Samba", "20/11/2026", "Sesc Pompeia"),
+        _event("Samba da Vela", "20/11/2026", "Sesc Pinheiros", fonte="Fonte B"),
+    )
+    assert _is_new_after(
+        _event("Samba da Vela", "20/11/2026", "Sesc Pompeia"),
+        _event("Samba da Vela", "20/11/2026", "Sesc Pinheiros", fonte="Fonte B"),
+    )
+
+
+def test_names_or_venues_differing_only_by_number_are_not_merged():
+    assert _is_new_after(
+        _event("Festival de Inverno 1", "20/11/2026", "Casa de Shows 1"),
+        _event("Festival de Inverno 2", "20/11/2026", "Casa de Shows 1", fonte="Fonte B"),
+    )
+    assert _is_new_after(
+        _event("Samba da Vela", "20/11/2026", "Casa de Shows 0"),
+        _event("Samba da Vela", "20/11/2026", "Casa de Shows 30", fonte="Fonte B"),
+    )
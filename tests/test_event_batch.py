@@ -0,0 +1,28 @@
+# tests/test_event_batch.py
+
+import json
+
+from src.models.Evento import Evento
+from src.services.event_batch import dump_events_jsonl, iter_validated_events, validate_events
+
+
+def test_invalid_records_do_not_discard_the_batch():
+    records = [{"nome_do_evento": "A"}, {"ingressos": "esgotado"}, 5, {"nome_do_evento": "B"}]
+    events, failures = validate_events(records)
+    assert [event.nome_do_evento if event else None for event in events] == ["A", None, None, "B"]
+    assert [failure.index for failure in failures] == [1, 2]
+    assert failures[0].message.startswith("ingressos:")
+
+
+def test_iter_validated_events_reports_global_indexes():
+    records = [{"nome_do_evento": str(i)} if i % 3 else {"interpretes": "x"} for i in range(7)]
+    failed = []
+    events = list(iter_validated_events(records, batch_size=2, on_error=lambda failure: failed.append(failure.index)))
+    assert failed == [0, 3, 6]
+    assert [event.nome_do_evento for event in events] == ["1", "2", "4", "5"]
+
+
+def test_dump_events_jsonl_matches_model_dump():
+    event = Evento(nome_do_evento="Show", flyers_e_materiais_promocionais=["https://exemplo.com/flyer.jpg"])
+    line = dump_events_jsonl([event]).decode("utf-8").strip()
+    assert json.loads(line) == event.model_dump(mode="json", exclude_none=True)
@@ -0,0 +1,39 @@
+# tests/test_event_store.py
+
+import datetime
+
+from src.models.Evento import Evento
+from src.services.event_store import CHANGED, NEW, EventStore
+
+
+def _event(cnpj=None, fonte="Guiadasemana", valor="R$ 50,00"):
+    return Evento(
+        nome_do_evento="Samba da Vela",
+        datas_do_evento="20/11/2026",
+        local_do_evento={"nome": "Sesc Pompeia", "cnpj": cnpj},
+        ingressos=[{"setor": "Pista", "valor": valor}],
+        fonte_de_divulgacao=fonte,
+    )
+
+
+def test_enriched_venue_cnpj_keeps_the_identity():
+    store = EventStore(":memory:")
+    assert store.upsert(_event()) == NEW
+    assert store.upsert(_event(cnpj="03.709.814/0001-98")) == CHANGED
+    since, until = store.pending_changes("export")
+    assert len(list(store.iter_changes(since, until))) == 1
+
+
+def test_query_by_source_matches_merged_events():
+    store = EventStore(":memory:")
+    store.upsert(_event(fonte="Guiadasemana, Sympla"))
+    assert len(list(store.query(fonte="Sympla"))) == 1
+    assert len(list(store.query(fonte="guiadasemana"))) == 1
+    assert list(store.query(fonte="Ticketmaster")) == []
+
+
+def test_query_by_date_and_price():
+    store = EventStore(":memory:")
+    store.upsert(_event(valor="R$ 80,00"))
+    assert len(list(store.query(start=datetime.date(2026, 11, 1), end=datetime.date(2026, 11, 30)))) == 1
+    assert list(store.query(max_price=50)) == []
@@ -0,0 +1,23 @@
+# tests/test_excel_generator.py
+
+from src.services.excel_generator import LIST_SEPARATOR, flatten_events
+
+
+def test_ingresso_columns_keep_one_entry_per_ticket():
+    record = {
+        "nome_do_evento": "Show",
+        "ingressos": [
+            {"setor": "Pista", "lote": "1º lote", "valor": "R$ 50,00"},
+            {"setor": None, "lote": None, "valor": "R$ 80,00"},
+            {"setor": "Camarote", "lote": "Único", "valor": None},
+        ],
+    }
+    row = flatten_events([record]).iloc[0]
+    assert row["ingresso_setor"].split(LIST_SEPARATOR) == ["Pista", "", "Camarote"]
+    assert row["ingresso_lote"].split(LIST_SEPARATOR) == ["1º lote", "", "Único"]
+    assert row["ingresso_valor"].split(LIST_SEPARATOR) == ["R$ 50,00", "R$ 80,00", ""]
+
+
+def test_interpretes_skip_empty_values():
+    row = flatten_events([{"nome_do_evento": "Show", "interpretes": ["Ana", None, "Bia"]}]).iloc[0]
+    assert row["interpretes"] == LIST_SEPARATOR.join(["Ana", "Bia"])
@@ -0,0 +1,62 @@
+# tests/test_gemini_enricher.py
+
+import asyncio
+import json
+
+from src.models.Evento import Evento
+from src.services.gemini_enricher import GeminiEnricher
+from src.services.rate_limiter import RetriesExhaustedError
+
+
+class _FakeRules:
+    """Regras que resolvem apenas os eventos cujo nome começa com "Resolvido"."""
+
+    async def enrich(self, event):
+        resolved = event.nome_do_evento.startswith("Resolvido")
+        return event.model_copy(update={"capacidade_do_local": "500"}), resolved
+
+
+def _enricher(monkeypatch, response=None, error=None):
+    enricher = GeminiEnricher("chave-de-teste")
+    enricher.rules = _FakeRules()
+
+    async def generate(prompt):
+        if error is not None:
+            raise error
+        return response
+
+    monkeypatch.setattr(enricher, "_generate_with_tools", generate)
+    return enricher
+
+
+def test_failed_batch_call_keeps_rule_results_and_reports_failures(monkeypatch):
+    enricher = _enricher(monkeypatch, error=RetriesExhaustedError("429"))
+    events = [Evento(nome_do_evento=name) for name in ("Resolvido", "Show A", "Show B")]
+    results, failures = asyncio.run(enricher.enrich_events(events))
+    assert [event.nome_do_evento for event in results] == ["Resolvido", "Show A", "Show B"]
+    assert all(event.capacidade_do_local == "500" for event in results)
+    assert sorted(failures) == [1, 2]
+
+
+def test_failed_single_call_is_reported_like_a_batch(monkeypatch):
+    enricher = _enricher(monkeypatch, error=ConnectionError("sem rede"))
+    results, failures = asyncio.run(enricher.enrich_events([Evento(nome_do_evento="Show A")]))
+    assert results[0].capacidade_do_local == "500"
+    assert failures == {0: "sem rede"}
+    assert asyncio.run(enricher.enrich_event_data(Evento(nome_do_evento="Show A"))).capacidade_do_local == "500"
+
+
+def test_unparseable_single_response_is_not_a_failure(monkeypatch):
+    enricher = _enricher(monkeypatch, response="não é JSON")
+    results, failures = asyncio.run(enricher.enrich_events([Evento(nome_do_evento="Show A")]))
+    assert results[0].nome_do_evento == "Show A"
+    assert failures == {}
+
+
+def test_batch_response_is_matched_by_position(monkeypatch):
+    response = json.dumps([{"nome_do_evento": "Show A", "tipo_do_evento": "Show"}, {"nome_do_evento": "Show B"}])
+    enricher = _enricher(monkeypatch, response=response)
+    results, failures = asyncio.run(enricher.enrich_events([Evento(nome_do_evento="Show A"), Evento(nome_do_evento="Show B")]))
+    assert [event.nome_do_evento for event in results] == ["Show A", "Show B"]
+    assert results[0].tipo_do_evento == "Show"
+    assert failures == {}
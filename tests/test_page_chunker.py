@@ -0,0 +1,30 @@
+# tests/test_page_chunker.py
+
+import datetime
+
+from src.services.page_chunker import PageChunk, assign_events_to_chunks, chunk_hash
+
+
+def _chunk(markdown, *dates):
+    return PageChunk(f"<div>{markdown}</div>", markdown, chunk_hash(markdown), list(dates))
+
+
+def test_events_are_assigned_to_the_chunk_with_their_name():
+    chunks = [_chunk("**Samba da Vela** 20/11"), _chunk("**Baile do Simonal** 21/11"), _chunk("Fechado para reforma")]
+    events = [{"nome_do_evento": "Baile do Simonal"}, {"nome_do_evento": "Samba da Vela"}]
+    assert assign_events_to_chunks(chunks, events) == [[events[1]], [events[0]], []]
+
+
+def test_repeated_names_are_told_apart_by_date():
+    chunks = [
+        _chunk("Samba da Vela 20/11", datetime.date(2026, 11, 20)),
+        _chunk("Samba da Vela 27/11", datetime.date(2026, 11, 27)),
+    ]
+    event = {"nome_do_evento": "Samba da Vela", "datas_do_evento": "27/11/2026"}
+    assert assign_events_to_chunks(chunks, [event]) == [[], [event]]
+
+
+def test_unmatched_event_prevents_caching_the_pack():
+    chunks = [_chunk("Samba da Vela"), _chunk("Baile do Simonal")]
+    assert assign_events_to_chunks(chunks, [{"nome_do_evento": "Outro show"}]) is None
+    assert assign_events_to_chunks(chunks[:1], [{"nome_do_evento": "Outro show"}]) == [[{"nome_do_evento": "Outro show"}]]
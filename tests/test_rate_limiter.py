@@ -0,0 +1,51 @@
+# tests/test_rate_limiter.py
+
+import asyncio
+
+import pytest
+import requests
+
+from src.services.rate_limiter import classify_error
+
+
+@pytest.mark.parametrize("exc", [
+    requests.exceptions.ConnectionError("Connection reset by peer"),
+    requests.exceptions.ConnectTimeout("connect timeout"),
+    requests.exceptions.ReadTimeout("read timeout"),
+    requests.exceptions.Timeout("timeout"),
+    requests.exceptions.ChunkedEncodingError("connection broken"),
+    ConnectionResetError("reset"),
+    TimeoutError("timeout"),
+    asyncio.TimeoutError(),
+])
+def test_network_errors_are_transient(exc):
+    assert classify_error(exc) == (True, False, None)
+
+
+@pytest.mark.parametrize("exc_name", ["ConnectError", "ReadTimeout", "RemoteProtocolError"])
+def test_httpx_network_errors_are_transient(exc_name):
+    httpx = pytest.importorskip("httpx")
+    assert classify_error(getattr(httpx, exc_name)("falha")) == (True, False, None)
+
+
+def test_http_errors_are_classified_by_status():
+    def http_error(status):
+        response = requests.Response()
+        response.status_code = status
+        return requests.exceptions.HTTPError(f"{status}", response=response)
+
+    assert classify_error(http_error(429))[:2] == (True, True)
+    assert classify_error(http_error(503))[:2] == (True, False)
+    assert classify_error(http_error(400))[:2] == (False, False)
+
+
+def test_other_request_errors_are_not_retried():
+    assert classify_error(requests.exceptions.InvalidURL("url inválida")) == (False, False, None)
+
+
+@pytest.mark.parametrize("retry_after, expected", [("7", 7.0), ("amanhã cedo", None), ("Mon, 99 Foo 2026 25:61:00 GMT", None)])
+def test_retry_after_header(retry_after, expected):
+    response = requests.Response()
+    response.status_code = 429
+    response.headers["Retry-After"] = retry_after
+    assert classify_error(requests.exceptions.HTTPError("429", response=response)) == (True, True, expected)
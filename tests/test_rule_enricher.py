@@ -0,0 +1,40 @@
+# tests/test_rule_enricher.py
+
+import asyncio
+
+import pytest
+
+from benchmarks.fakes import make_cnpj
+from src.models.Evento import Evento
+from src.services import rule_enricher
+from src.services.rule_enricher import RuleBasedEnricher
+
+CNPJ = make_cnpj(1)
+
+
+class _FakeCnpjService:
+    def __init__(self, data):
+        self.data = data
+
+    async def lookup_async(self, cnpj):
+        return self.data
+
+
+def _enrich(monkeypatch, data):
+    monkeypatch.setattr(rule_enricher, "get_cnpj_service", lambda: _FakeCnpjService(data))
+    event = Evento(nome_do_evento="Show", promotor={"nome": f"Produtora XYZ - CNPJ {CNPJ}"})
+    return asyncio.run(RuleBasedEnricher().enrich(event))
+
+
+def test_event_with_cnpj_data_is_resolved(monkeypatch):
+    enriched, resolved = _enrich(monkeypatch, {"email": "contato@xyz.com.br", "ddd_telefone_1": "1133334444"})
+    assert resolved
+    assert enriched.promotor.cnpj == CNPJ
+    assert enriched.promotor.email == "contato@xyz.com.br"
+
+
+@pytest.mark.parametrize("data", [None, {}])
+def test_failed_cnpj_lookup_is_not_resolved(monkeypatch, data):
+    enriched, resolved = _enrich(monkeypatch, data)
+    assert not resolved
+    assert enriched.promotor.cnpj == CNPJ